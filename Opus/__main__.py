@@ -7,22 +7,34 @@ from pytgcalls.exceptions import NoActiveGroupCall
 import config
 from Opus import LOGGER, app, userbot
 from Opus.core.call import Signal
+from Opus.core.http import http_client
+from Opus.core.queuestore import queue_store
+from Opus.core.shard import supervisor
 from Opus.misc import sudo
 from Opus.plugins import ALL_MODULES
 from Opus.utils.database import get_banned_users, get_gbanned
+from Opus.utils.extractor import extractor
+from Opus.utils.jobs import jobs
+from Opus.utils.mediacache import media_cache
+from Opus.utils.scraper import scraper
+from Opus.utils.settings import settings
+from Opus.utils.thumbnails import thumb_renderer
 from config import BANNED_USERS
 
 async def init():
-    if (
-        not config.STRING1
-        and not config.STRING2
-        and not config.STRING3
-        and not config.STRING4
-        and not config.STRING5
-    ):
+    if not config.ASSISTANT_SESSIONS:
         LOGGER(__name__).error("⚠️ Aᴄᴛɪᴠᴀᴛɪᴏɴ Fᴀɪʟᴇᴅ » Assɪsᴛᴀɴᴛ sᴇssɪᴏɴs ᴀʀᴇ ᴍɪssɪɴɢ.")
         exit()
+    # process pools fork their workers on start, keep them ahead of anything
+    # that opens mongo, telegram or executor threads
+    await extractor.start()
+    await thumb_renderer.start()
+    await scraper.start()
     await sudo()
+    await settings.start()
+    await queue_store.start()
+    media_cache.rebuild()
+    await http_client.start()
     try:
         users = await get_gbanned()
         for user_id in users:
@@ -48,13 +60,27 @@ async def init():
     except:
         pass
     await Signal.decorators()
+    await jobs.resume()
+    await Signal.restore_queues()
     LOGGER("Opus").info(
         "⚡ sᴛᴏʀᴍ ᴏɴʟɪɴᴇ » Oᴘᴜs ᴍᴜsɪᴄ sᴇǫᴜᴇɴᴄᴇ ᴀᴄᴛɪᴠᴀᴛᴇᴅ.\n☁️ Pᴀʀᴛ ᴏғ Sᴛᴏʀᴍ Sᴇʀᴠᴇʀs × Oᴘᴜs Pʀᴏᴊᴇᴄᴛ."
     )
     await idle()
+    await jobs.stop()
     await app.stop()
     await userbot.stop()
+    await http_client.stop()
+    await extractor.stop()
+    await thumb_renderer.stop()
+    await scraper.stop()
+    await settings.stop()
+    await queue_store.stop()
+    supervisor.stop()
     LOGGER("Opus").info("🌩️ Cʏᴄʟᴇ Cʟᴏsᴇᴅ » Oᴘᴜs sʟᴇᴇᴘs ᴜɴᴅᴇʀ ᴛʜᴇ sᴛᴏʀᴍ.")
 
 if __name__ == "__main__":
+    # call workers fork before the loop runs and before anything else starts
+    # threads or sockets, so they can start an event loop of their own
+    if supervisor.enabled and config.ASSISTANT_SESSIONS:
+        supervisor.spawn(list(config.ASSISTANT_SESSIONS))
     asyncio.get_event_loop().run_until_complete(init())
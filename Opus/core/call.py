@@ -1,7 +1,7 @@
 import os
 import config
 import asyncio
-from typing import Union
+from typing import Dict, Optional, Union
 
 from pyrogram import Client
 from strings import get_string
@@ -25,13 +25,17 @@ from pytgcalls.types.stream import StreamAudioEnded
 from Opus import YouTube, app
 from Opus.misc import db
 from Opus.logging import LOGGER
+from Opus.core.shard import StreamSpec, supervisor
+from Opus.utils.downloader import file_exists
 from Opus.utils.database import (
     add_active_chat,
     add_active_video_chat,
+    get_assistant_number,
     get_lang,
     get_loop,
     group_assistant,
     is_autoend,
+    music_off,
     music_on,
     remove_active_chat,
     remove_active_video_chat,
@@ -41,7 +45,10 @@ from Opus.utils.database import (
 from Opus.utils.exceptions import AssistantErr
 from Opus.utils.formatters import check_duration, seconds_to_min, speed_converter
 from Opus.utils.inline.play import stream_markup
+from Opus.utils.placement import placement
 from Opus.utils.stream.autoclear import auto_clean
+from Opus.utils.stream import position, progressive
+from Opus.utils.stream.prefetch import prefetcher
 from Opus.utils.thumbnails import get_thumb
 
 autoend = {}
@@ -53,7 +60,13 @@ DEFAULT_AQ = AudioQuality.STUDIO
 DEFAULT_VQ = VideoQuality.FHD_1080p
 ELSE_AQ = AudioQuality.HIGH
 
-def dynamic_media_stream(path: str, video: bool = False, ffmpeg_params: str = None) -> MediaStream:
+def dynamic_media_stream(path: str, video: bool = False, ffmpeg_params: str = None):
+    if supervisor.enabled:
+        return StreamSpec(path, video, ffmpeg_params)
+    return build_media_stream(path, video, ffmpeg_params)
+
+
+def build_media_stream(path: str, video: bool = False, ffmpeg_params: str = None) -> MediaStream:
     # Use Flags if available ; otherwise omit video_flags
     flags = getattr(MediaStream, "Flags", None)
     if video:
@@ -80,6 +93,8 @@ def dynamic_media_stream(path: str, video: bool = False, ffmpeg_params: str = No
 
 
 async def _clear_(chat_id):
+    prefetcher.cancel(chat_id)
+    progressive.forget(chat_id)
     try:
         if chat_id in db:
             del db[chat_id]
@@ -90,46 +105,24 @@ async def _clear_(chat_id):
 
 class Call(PyTgCalls):
     def __init__(self):
-        self.userbot1 = Client(
-            name="OpusXAss1",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING1),
-        )
-        self.one = PyTgCalls(self.userbot1, cache_duration=100)
-
-        self.userbot2 = Client(
-            name="OpusXAss2",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING2),
-        )
-        self.two = PyTgCalls(self.userbot2, cache_duration=100)
-
-        self.userbot3 = Client(
-            name="OpusXAss3",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING3),
-        )
-        self.three = PyTgCalls(self.userbot3, cache_duration=100)
-
-        self.userbot4 = Client(
-            name="OpusXAss4",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING4),
-        )
-        self.four = PyTgCalls(self.userbot4, cache_duration=100)
-
-        self.userbot5 = Client(
-            name="OpusXAss5",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING5),
-        )
-        self.five = PyTgCalls(self.userbot5, cache_duration=100)    
+        # assistant number -> userbot client and its call driver
+        self.clients: Dict[int, Client] = {}
+        self.calls: Dict[int, PyTgCalls] = {}
+        if supervisor.enabled:
+            # the drivers are built inside the call workers, see start()
+            return
+        for number, session in config.ASSISTANT_SESSIONS.items():
+            client = Client(
+                name=f"OpusXAss{number}",
+                api_id=config.API_ID,
+                api_hash=config.API_HASH,
+                session_string=str(session),
+            )
+            self.clients[number] = client
+            self.calls[number] = PyTgCalls(client, cache_duration=100)
 
+    def assistant(self, number) -> Optional[PyTgCalls]:
+        return self.calls.get(int(number))
 
     async def pause_stream(self, chat_id: int):
         assistant = await group_assistant(self, chat_id)
@@ -163,7 +156,7 @@ class Call(PyTgCalls):
             pass
 
     async def stop_stream_force(self, chat_id: int):
-        for client in [self.one, self.two, self.three, self.four, self.five]:
+        for client in self.calls.values():
             try:
                 await client.leave_group_call(chat_id)
             except (NoActiveGroupCall, NotInGroupCallError):
@@ -209,7 +202,7 @@ class Call(PyTgCalls):
 
         dur = await loop.run_in_executor(None, check_duration, out)
         dur = int(dur)
-        played, con_seconds = speed_converter(playing[0]["played"], speed)
+        played, con_seconds = speed_converter(position.played(playing[0]), speed)
         duration = seconds_to_min(dur)
 
         stream = dynamic_media_stream(
@@ -228,7 +221,7 @@ class Call(PyTgCalls):
             if not exis:
                 db[chat_id][0]["old_dur"] = db[chat_id][0]["dur"]
                 db[chat_id][0]["old_second"] = db[chat_id][0]["seconds"]
-            db[chat_id][0]["played"] = con_seconds
+            position.seek(db[chat_id][0], con_seconds)
             db[chat_id][0]["dur"] = duration
             db[chat_id][0]["seconds"] = dur
             db[chat_id][0]["speed_path"] = out
@@ -239,9 +232,10 @@ class Call(PyTgCalls):
         try:
             check = db.get(chat_id)
             if check:
-                check.pop(0)
+                check.popleft()
         except:
             pass
+        prefetcher.cancel(chat_id)
         await remove_active_video_chat(chat_id)
         await remove_active_chat(chat_id)
         try:
@@ -300,12 +294,13 @@ class Call(PyTgCalls):
         link,
         video: Union[bool, str] = None,
         image: Union[bool, str] = None,
+        ffmpeg_params: str = None,
     ):
         assistant = await group_assistant(self, chat_id)
         language = await get_lang(chat_id)
         _ = get_string(language)
 
-        stream = dynamic_media_stream(link, video=bool(video))
+        stream = dynamic_media_stream(link, video=bool(video), ffmpeg_params=ffmpeg_params)
 
         try:
             await assistant.join_group_call(chat_id, stream)
@@ -313,13 +308,13 @@ class Call(PyTgCalls):
             raise AssistantErr(_["call_8"])
         except AlreadyJoinedError:
             raise AssistantErr(_["call_9"])
-        except TelegramServerError:
-            raise AssistantErr(_["call_10"])
-        except ConnectionNotFound:
+        except (TelegramServerError, ConnectionNotFound):
+            placement.failed(await get_assistant_number(chat_id))
             raise AssistantErr(_["call_10"])
         except Exception as e:
             if "phone.CreateGroupCall" in str(e):
                 raise AssistantErr(_["call_8"])
+            placement.failed(await get_assistant_number(chat_id))
             raise AssistantErr("Failed to join voice chat due to an unknown error.")
 
         await add_active_chat(chat_id)
@@ -333,6 +328,55 @@ class Call(PyTgCalls):
             if users == 1:
                 autoend[chat_id] = datetime.now() + timedelta(minutes=5)
 
+    async def restore_queues(self):
+        # queues rehydrated from the queue store pick up where playback stopped
+        for chat_id in list(db):
+            try:
+                await self._restore(chat_id)
+            except Exception as e:
+                LOGGER(__name__).warning(f"Cᴏᴜʟᴅ ɴᴏᴛ ʀᴇsᴜᴍᴇ ᴘʟᴀʏʙᴀᴄᴋ ɪɴ {chat_id}: {e}")
+                await _clear_(chat_id)
+
+    async def _restore(self, chat_id):
+        check = db.get(chat_id)
+        if not check:
+            db.pop(chat_id, None)
+            return
+        entry = check[0]
+        file_path = entry.get("speed_path") or entry["file"]
+        videoid = entry.get("vidid")
+        is_video = str(entry["streamtype"]) == "video"
+        offset = int(entry.get("played") or 0)
+        if "live_" in file_path:
+            n, link = await YouTube.video(videoid, True)
+            if n == 0:
+                raise AssistantErr(link)
+            offset = 0
+        elif "index_" in file_path:
+            link = videoid
+        elif "vid_" in file_path or not os.path.exists(file_path):
+            # downloads do not survive /restart, stream the source instead
+            if videoid in (None, "telegram", "soundcloud"):
+                raise AssistantErr(f"{file_path} is gone")
+            link = file_exists(videoid, "video" if is_video else "audio")
+            if not link:
+                n, link = await YouTube.video(videoid, True)
+                if n == 0:
+                    raise AssistantErr(link)
+        else:
+            link = file_path
+        ffmpeg_params = None
+        if offset and int(entry.get("seconds") or 0):
+            ffmpeg_params = f"-ss {seconds_to_min(offset)} -to {entry['dur']}"
+        await self.join_call(chat_id, entry["chat_id"], link, video=is_video, ffmpeg_params=ffmpeg_params)
+        position.start(entry, offset)
+        if entry.get("paused"):
+            await self.pause_stream(chat_id)
+            await music_off(chat_id)
+            position.pause(entry)
+        prefetcher.sync(chat_id)
+        LOGGER(__name__).info(f"Rᴇsᴜᴍᴇᴅ ᴘʟᴀʏʙᴀᴄᴋ ɪɴ {chat_id} ᴀᴛ {seconds_to_min(offset)}.")
+
     async def attempt_stream(self, client, chat_id, stream, retries=1):
         for _ in range(retries):
             try:
@@ -342,6 +386,26 @@ class Call(PyTgCalls):
                 await asyncio.sleep(0.5)
         return False
 
+    async def _local_fallback(self, client, chat_id, entry) -> bool:
+        # a head streamed from a remote url that stalled is finished from its download
+        resumed = await progressive.local_fallback(chat_id, entry)
+        if not resumed:
+            return False
+        path, played = resumed
+        stream = dynamic_media_stream(
+            path,
+            video=str(entry["streamtype"]) == "video",
+            ffmpeg_params=f"-ss {seconds_to_min(played)} -to {entry['dur']}",
+        )
+        if not await self.attempt_stream(client, chat_id, stream):
+            return False
+        entry["file"] = path
+        position.seek(entry, played)
+        if entry.get("paused_at"):
+            await self.pause_stream(chat_id)
+        LOGGER(__name__).info(f"Rᴇᴍᴏᴛᴇ sᴛʀᴇᴀᴍ sᴛᴀʟʟᴇᴅ ɪɴ {chat_id}, ʀᴇsᴜᴍᴇᴅ ғʀᴏᴍ ᴅɪsᴋ ᴀᴛ {seconds_to_min(played)}.")
+        return True
+
     async def check_autoend(self, chat_id):
         if await is_autoend() and chat_id in autoend:
             users = len(await (await group_assistant(self, chat_id)).get_participants(chat_id))
@@ -362,6 +426,9 @@ class Call(PyTgCalls):
             popped = None
             loop_count = await get_loop(chat_id)
 
+            if check and await self._local_fallback(client, chat_id, check[0]):
+                return
+
             try:
                 if not check or len(check) == 0:
                     await _clear_(chat_id)
@@ -372,7 +439,7 @@ class Call(PyTgCalls):
                     return
 
                 if loop_count == 0:
-                    popped = check.pop(0)
+                    popped = check.popleft()
                 else:
                     loop_count = loop_count - 1
                     await set_loop(chat_id, loop_count)
@@ -398,6 +465,7 @@ class Call(PyTgCalls):
             if chat_id not in db or not db.get(chat_id):
                 return
 
+            prefetcher.sync(chat_id)
             queued = check[0].get("file")
             if not queued:
                 await _clear_(chat_id)
@@ -417,7 +485,7 @@ class Call(PyTgCalls):
 
             thumb_mode = await get_thumb_setting(original_chat_id)
 
-            db[chat_id][0]["played"] = 0
+            position.start(db[chat_id][0])
             if exis := (check[0]).get("old_dur"):
                 db[chat_id][0]["dur"] = exis
                 db[chat_id][0]["seconds"] = check[0]["old_second"]
@@ -475,7 +543,9 @@ class Call(PyTgCalls):
                     db[chat_id][0]["markup"] = "tg"
 
             elif "vid_" in queued:
-                mystic = await app.send_message(original_chat_id, _["call_7"])
+                # prefetched tracks start right away, without the downloading notice
+                ready = file_exists(videoid, "video" if is_video else "audio")
+                mystic = None if ready else await app.send_message(original_chat_id, _["call_7"])
                 try:
                     file_path, direct = await YouTube.download(
                         videoid, mystic, videoid=True, video=is_video
@@ -483,7 +553,10 @@ class Call(PyTgCalls):
                     if not os.path.exists(file_path):
                         raise Exception
                 except:
-                    await mystic.edit_text(_["call_6"], disable_web_page_preview=True)
+                    if mystic:
+                        await mystic.edit_text(_["call_6"], disable_web_page_preview=True)
+                    else:
+                        await app.send_message(original_chat_id, _["call_6"])
                     await _clear_(chat_id)
                     return
 
@@ -499,7 +572,8 @@ class Call(PyTgCalls):
 
                 img = await get_thumb(videoid)
                 button = stream_markup(_, chat_id)
-                await mystic.delete()
+                if mystic:
+                    await mystic.delete()
 
                 caption_text = _["stream_1"].format(
                     f"https://t.me/{app.username}?start=info_{videoid}",
@@ -651,57 +725,21 @@ class Call(PyTgCalls):
 
     
     async def ping(self):
-        pings = []
-        if config.STRING1:
-            pings.append(await self.one.ping)
-        if config.STRING2:
-            pings.append(await self.two.ping)
-        if config.STRING3:
-            pings.append(await self.three.ping)
-        if config.STRING4:
-            pings.append(await self.four.ping)
-        if config.STRING5:
-            pings.append(await self.five.ping)
+        pings = [await call.ping for call in self.calls.values()]
         return str(round(sum(pings) / len(pings), 3))
 
     async def start(self):
         LOGGER(__name__).info("Starting PyTgCalls Drivers...")
-        if config.STRING1:
-            await self.one.start()
-        if config.STRING2:
-            await self.two.start()
-        if config.STRING3:
-            await self.three.start()
-        if config.STRING4:
-            await self.four.start()
-        if config.STRING5:
-            await self.five.start()
-
+        if supervisor.enabled:
+            self.calls = await supervisor.start()
+        for call in self.calls.values():
+            await call.start()
+        placement.start(self.calls)
 
     async def decorators(self):
-        @self.one.on_kicked()
-        @self.two.on_kicked()
-        @self.three.on_kicked()
-        @self.four.on_kicked()
-        @self.five.on_kicked()
-        @self.one.on_closed_voice_chat()
-        @self.two.on_closed_voice_chat()
-        @self.three.on_closed_voice_chat()
-        @self.four.on_closed_voice_chat()
-        @self.five.on_closed_voice_chat()
-        @self.one.on_left()
-        @self.two.on_left()
-        @self.three.on_left()
-        @self.four.on_left()
-        @self.five.on_left()
         async def stream_services_handler(_, chat_id: int):
             await self.stop_stream(chat_id)
 
-        @self.one.on_stream_end()
-        @self.two.on_stream_end()
-        @self.three.on_stream_end()
-        @self.four.on_stream_end()
-        @self.five.on_stream_end()
         async def stream_end_handler(client, update: Update):
             if not isinstance(update, StreamAudioEnded):
                 return
@@ -714,5 +752,11 @@ class Call(PyTgCalls):
                 except (NoActiveGroupCall, NotInGroupCallError):
                     pass
 
+        for call in self.calls.values():
+            call.on_kicked()(stream_services_handler)
+            call.on_closed_voice_chat()(stream_services_handler)
+            call.on_left()(stream_services_handler)
+            call.on_stream_end()(stream_end_handler)
+
 
 Signal = Call()
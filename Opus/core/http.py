@@ -0,0 +1,80 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+import config
+
+from ..logging import LOGGER
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/129.0.0.0 Safari/537.36"
+)
+
+
+class HttpClient:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def _build(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=20.0),
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=300.0,
+            ),
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = self._build()
+        LOGGER(__name__).info("Sʜᴀʀᴇᴅ HTTP ᴘᴏᴏʟ sᴛᴀʀᴛᴇᴅ.")
+
+    async def stop(self):
+        if self._client is not None:
+            try:
+                await self._client.aclose()
+            except Exception:
+                pass
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build()
+        return self._client
+
+    def _slot(self, url: str) -> asyncio.Semaphore:
+        host = (urlparse(str(url)).hostname or "").lower()
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = self._hosts[host] = asyncio.Semaphore(config.HTTP_PER_HOST_CONNECTIONS)
+        return slot
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with self._slot(url):
+            return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs):
+        async with self._slot(url):
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+
+http_client = HttpClient()
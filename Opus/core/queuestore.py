@@ -0,0 +1,469 @@
+import asyncio
+import json
+import random
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import ReplaceOne
+
+import config
+from Opus.core.mongo import mongodb
+from Opus.logging import LOGGER
+
+# keys that only mean something to this process
+TRANSIENT = ("mystic", "markup", "started", "paused_at")
+
+
+def _dump(entry: dict) -> dict:
+    from Opus.utils.stream import position
+
+    doc = {k: v for k, v in entry.items() if k not in TRANSIENT}
+    doc["played"] = position.played(entry)
+    doc["paused"] = bool(entry.get("paused_at"))
+    return doc
+
+
+def _apply(queue: list, op: str, index: Optional[int], entries: List[dict]):
+    if op == "put":
+        if index is None:
+            queue.append(entries[0])
+        else:
+            queue.insert(index, entries[0])
+    elif op == "pop":
+        if 0 <= index < len(queue):
+            queue.pop(index)
+    elif op == "set":
+        queue[:] = entries
+    elif op == "skip":
+        del queue[:index]
+    elif op == "clear":
+        queue.clear()
+    elif op == "head":
+        if queue:
+            queue[0] = entries[0]
+
+
+class ChatQueue(deque):
+    # a chat's queue; the head is popped and pushed on every track change, so
+    # it is a deque, and every change is reported to the store as an op
+    __slots__ = ("owner", "chat_id")
+
+    def __init__(self, owner: "QueueDB", chat_id: int, items=()):
+        super().__init__(items)
+        self.owner = owner
+        self.chat_id = chat_id
+
+    def _record(self, op: str, index: Optional[int] = None, payload=None):
+        self.owner.store.record(self.chat_id, op, index, payload)
+
+    def _changed(self):
+        self._record("set", payload=list(self))
+
+    def _replace(self, items):
+        super().clear()
+        super().extend(items)
+        self._changed()
+
+    def _index(self, index: int) -> int:
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("queue index out of range")
+        return index
+
+    def append(self, entry):
+        super().append(entry)
+        self._record("put", None, entry)
+
+    def appendleft(self, entry):
+        super().appendleft(entry)
+        self._record("put", 0, entry)
+
+    def insert(self, index: int, entry):
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        if index == 0:
+            super().appendleft(entry)
+        else:
+            super().insert(index, entry)
+        self._record("put", index, entry)
+
+    def pop(self, index: int = -1):
+        index = self._index(index)
+        if index == 0:
+            entry = super().popleft()
+        elif index == len(self) - 1:
+            entry = super().pop()
+        else:
+            entry = self[index]
+            super().__delitem__(index)
+        self._record("pop", index)
+        return entry
+
+    def popleft(self):
+        return self.pop(0)
+
+    def skip(self, count: int) -> List:
+        # drops the first `count` entries as one op and hands them back for cleanup
+        count = min(max(count, 0), len(self))
+        dropped = [super(ChatQueue, self).popleft() for _ in range(count)]
+        if dropped:
+            self._record("skip", count)
+        return dropped
+
+    def shuffle(self, start: int = 1):
+        items = list(self)
+        rest = items[start:]
+        random.shuffle(rest)
+        self._replace(items[:start] + rest)
+
+    def remove(self, entry):
+        self.pop(self.index(entry))
+
+    def clear(self):
+        super().clear()
+        self._record("clear")
+
+    def extend(self, entries):
+        super().extend(entries)
+        self._changed()
+
+    def extendleft(self, entries):
+        super().extendleft(entries)
+        self._changed()
+
+    def __iadd__(self, entries):
+        super().extend(entries)
+        self._changed()
+        return self
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        return super().__getitem__(index)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            items = list(self)
+            items[index] = value
+            self._replace(items)
+            return
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            items = list(self)
+            del items[index]
+            self._replace(items)
+            return
+        self.pop(index)
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+    def rotate(self, n: int = 1):
+        super().rotate(n)
+        self._changed()
+
+
+class QueueDB(dict):
+    # chat_id -> ChatQueue, the `db` every plugin imports from Opus.misc
+    def __init__(self, store: "QueueStore"):
+        super().__init__()
+        self.store = store
+        store.queues = self
+
+    def __setitem__(self, chat_id, entries):
+        queue = ChatQueue(self, chat_id, entries)
+        super().__setitem__(chat_id, queue)
+        self.store.record(chat_id, "set", None, list(queue))
+
+    def __delitem__(self, chat_id):
+        super().__delitem__(chat_id)
+        self.store.record(chat_id, "clear")
+
+    def pop(self, chat_id, *default):
+        if chat_id not in self:
+            return super().pop(chat_id, *default)
+        queue = super().pop(chat_id)
+        self.store.record(chat_id, "clear")
+        return queue
+
+    def restore(self, chat_id, entries: List[dict]):
+        super().__setitem__(chat_id, ChatQueue(self, chat_id, entries))
+
+
+class QueueStore:
+    # keeps queues in memory only, a restart drops them
+    persistent = False
+
+    def __init__(self):
+        self.queues: Optional[QueueDB] = None
+
+    def record(self, chat_id, op: str, index: Optional[int] = None, payload=None):
+        pass
+
+    async def start(self):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class LogStore(QueueStore):
+    # queue changes go to an append-only op log on top of per-chat snapshots;
+    # every snapshot carries the seq it covers, so replay never applies an op twice
+    persistent = True
+
+    def __init__(self, flush_interval: float, compact_ops: int):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self.compact_ops = compact_ops
+        self.seq = 0
+        self._pending: List[Tuple[int, Any, str, Optional[int], Any]] = []
+        self._logged = 0
+        self._known: Set[Any] = set()
+        self._heads: Dict[Any, tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, chat_id, op: str, index: Optional[int] = None, payload=None):
+        self._known.add(chat_id)
+        last = self._pending[-1] if self._pending else None
+        if op == "set" and last and last[1] == chat_id and last[2] == "set":
+            # shuffle swaps items one by one, only the final order matters
+            self._pending[-1] = (last[0], chat_id, op, index, payload)
+            return
+        self.seq += 1
+        self._pending.append((self.seq, chat_id, op, index, payload))
+
+    def _track_heads(self):
+        from Opus.utils.stream import position
+
+        for chat_id, queue in self.queues.items():
+            if not queue or queue[0].get("started") is None:
+                continue
+            head = queue[0]
+            mark = (id(head), position.played(head), bool(head.get("paused_at")), head.get("speed"))
+            if self._heads.get(chat_id) != mark:
+                self._heads[chat_id] = mark
+                self.record(chat_id, "head", None, head)
+        for chat_id in list(self._heads):
+            if chat_id not in self.queues:
+                del self._heads[chat_id]
+
+    @staticmethod
+    def _entries(op: str, payload) -> List[dict]:
+        if op in ("put", "head"):
+            return [_dump(payload)]
+        if op == "set":
+            return [_dump(e) for e in payload]
+        return []
+
+    async def start(self):
+        try:
+            snapshots, ops = await self._read()
+        except Exception as e:
+            # without the old seqs the log can't be appended to, stay in memory this run
+            LOGGER(__name__).warning(f"Qᴜᴇᴜᴇ sᴛᴏʀᴇ ʀᴇᴀᴅ ғᴀɪʟᴇᴅ, ǫᴜᴇᴜᴇs sᴛᴀʏ ɪɴ ᴍᴇᴍᴏʀʏ: {e}")
+            self.queues.store = QueueStore()
+            self._pending = []
+            return
+        state: Dict[Any, list] = {}
+        covered: Dict[Any, int] = {}
+        for chat_id, (seq, entries) in snapshots.items():
+            state[chat_id] = list(entries)
+            covered[chat_id] = seq
+            self.seq = max(self.seq, seq)
+        for seq, chat_id, op, index, entries in ops:
+            self.seq = max(self.seq, seq)
+            if seq <= covered.get(chat_id, 0):
+                continue
+            _apply(state.setdefault(chat_id, []), op, index, entries)
+        from Opus.utils.stream.entry import QueueEntry
+
+        self._known = set(state)
+        for chat_id, entries in state.items():
+            if entries:
+                self.queues.restore(chat_id, [QueueEntry.from_dict(e) for e in entries])
+        await self._compact()
+        if self._task is None:
+            self._task = asyncio.create_task(self._flusher())
+        LOGGER(__name__).info(f"Rᴇsᴛᴏʀᴇᴅ ǫᴜᴇᴜᴇs ᴏғ {len(self.queues)} ᴄʜᴀᴛs.")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if self.queues.store is not self:
+            return
+        self._track_heads()
+        if self._logged + len(self._pending) >= self.compact_ops:
+            await self._compact()
+            return
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        records = [(seq, chat_id, op, index, self._entries(op, payload)) for seq, chat_id, op, index, payload in pending]
+        try:
+            await self._append(records)
+            self._logged += len(records)
+        except Exception as e:
+            self._pending = pending + self._pending
+            LOGGER(__name__).warning(f"Qᴜᴇᴜᴇ ᴏᴘ ʟᴏɢ ᴡʀɪᴛᴇ ғᴀɪʟᴇᴅ: {e}")
+
+    async def _compact(self):
+        # the snapshot already holds whatever is pending, so those ops are never written
+        pending, self._pending = self._pending, []
+        last = self.seq
+        state = {chat_id: [_dump(e) for e in queue] for chat_id, queue in self.queues.items() if queue}
+        gone = self._known - set(state)
+        self._known = set(state)
+        try:
+            await self._snapshot(state, gone, last)
+            self._logged = 0
+        except Exception as e:
+            self._pending = pending + self._pending
+            self._known |= gone
+            LOGGER(__name__).warning(f"Qᴜᴇᴜᴇ sɴᴀᴘsʜᴏᴛ ғᴀɪʟᴇᴅ: {e}")
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                LOGGER(__name__).warning(f"Qᴜᴇᴜᴇ ғʟᴜsʜ ғᴀɪʟᴇᴅ: {e}")
+
+    async def _read(self) -> Tuple[Dict[Any, Tuple[int, List[dict]]], List[tuple]]:
+        raise NotImplementedError
+
+    async def _append(self, records: List[tuple]):
+        raise NotImplementedError
+
+    async def _snapshot(self, state: Dict[Any, List[dict]], gone: Set[Any], last: int):
+        raise NotImplementedError
+
+
+class MongoQueueStore(LogStore):
+    def __init__(self, flush_interval: float, compact_ops: int):
+        super().__init__(flush_interval, compact_ops)
+        self.opsdb = mongodb.queueops
+        self.snapdb = mongodb.queues
+
+    async def _read(self):
+        snapshots = {}
+        async for doc in self.snapdb.find({}):
+            snapshots[doc["_id"]] = (doc.get("seq", 0), doc.get("entries", []))
+        ops = []
+        async for doc in self.opsdb.find({}).sort("_id", 1):
+            ops.append((doc["_id"], doc["chat_id"], doc["op"], doc.get("index"), doc.get("entries", [])))
+        return snapshots, ops
+
+    async def _append(self, records):
+        await self.opsdb.insert_many(
+            [
+                {"_id": seq, "chat_id": chat_id, "op": op, "index": index, "entries": entries}
+                for seq, chat_id, op, index, entries in records
+            ],
+            ordered=True,
+        )
+
+    async def _snapshot(self, state, gone, last):
+        # emptied chats keep a tombstone until the ops before it are deleted
+        ops = [ReplaceOne({"_id": k}, {"seq": last, "entries": v}, upsert=True) for k, v in state.items()]
+        ops += [ReplaceOne({"_id": k}, {"seq": last, "entries": []}, upsert=True) for k in gone]
+        for i in range(0, len(ops), 1000):
+            await self.snapdb.bulk_write(ops[i: i + 1000], ordered=False)
+        await self.opsdb.delete_many({"_id": {"$lte": last}})
+        await self.snapdb.delete_many({"entries": {"$size": 0}, "seq": {"$lte": last}})
+
+
+class SQLiteQueueStore(LogStore):
+    def __init__(self, path: str, flush_interval: float, compact_ops: int):
+        super().__init__(flush_interval, compact_ops)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite stays on one thread, off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="queuestore")
+
+    def _run(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ops "
+                "(seq INTEGER PRIMARY KEY, chat_id INTEGER, op TEXT, idx INTEGER, entries TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS queues (chat_id INTEGER PRIMARY KEY, seq INTEGER, entries TEXT)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _read_sync(self):
+        conn = self._db()
+        snapshots = {
+            chat_id: (seq, json.loads(entries))
+            for chat_id, seq, entries in conn.execute("SELECT chat_id, seq, entries FROM queues")
+        }
+        ops = [
+            (seq, chat_id, op, idx, json.loads(entries))
+            for seq, chat_id, op, idx, entries in conn.execute(
+                "SELECT seq, chat_id, op, idx, entries FROM ops ORDER BY seq"
+            )
+        ]
+        return snapshots, ops
+
+    def _append_sync(self, records):
+        conn = self._db()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ops VALUES (?, ?, ?, ?, ?)",
+                [
+                    (seq, chat_id, op, index, json.dumps(entries, default=str))
+                    for seq, chat_id, op, index, entries in records
+                ],
+            )
+
+    def _snapshot_sync(self, state, gone, last):
+        conn = self._db()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO queues VALUES (?, ?, ?)",
+                [(k, last, json.dumps(v, default=str)) for k, v in state.items()],
+            )
+            conn.executemany("DELETE FROM queues WHERE chat_id = ?", [(k,) for k in gone])
+            conn.execute("DELETE FROM ops WHERE seq <= ?", (last,))
+
+    async def _read(self):
+        return await self._run(self._read_sync)
+
+    async def _append(self, records):
+        await self._run(self._append_sync, records)
+
+    async def _snapshot(self, state, gone, last):
+        await self._run(self._snapshot_sync, state, gone, last)
+
+
+def build_store(kind: str) -> QueueStore:
+    if kind == "mongo":
+        return MongoQueueStore(config.QUEUE_FLUSH_INTERVAL, config.QUEUE_COMPACT_OPS)
+    if kind == "sqlite":
+        return SQLiteQueueStore(config.QUEUE_SQLITE_PATH, config.QUEUE_FLUSH_INTERVAL, config.QUEUE_COMPACT_OPS)
+    return QueueStore()
+
+
+queue_store = build_store(config.QUEUE_STORE)
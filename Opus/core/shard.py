@@ -0,0 +1,316 @@
+import asyncio
+import itertools
+import multiprocessing
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import config
+from Opus.logging import LOGGER
+
+# seconds a worker gets to answer one call operation
+REQUEST_TIMEOUT = 60
+
+
+class StreamSpec(NamedTuple):
+    # what dynamic_media_stream was asked for, the worker builds the MediaStream
+    path: str
+    video: bool = False
+    ffmpeg_params: Optional[str] = None
+
+
+def _error(name: str, text: str) -> Exception:
+    import ntgcalls
+    from pytgcalls import exceptions
+
+    cls = getattr(exceptions, name, None) or getattr(ntgcalls, name, None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        try:
+            return cls(text) if text else cls()
+        except TypeError:
+            return cls()
+    return Exception(text or name)
+
+
+class RemoteCall:
+    # stands in for the PyTgCalls of an assistant that lives in a worker process
+    def __init__(self, shard: "Shard", number: int):
+        self.shard = shard
+        self.number = number
+        self.handlers: Dict[str, List[Callable]] = {}
+
+    def _on(self, event: str):
+        def decorator(func):
+            self.handlers.setdefault(event, []).append(func)
+            return func
+
+        return decorator
+
+    def on_kicked(self):
+        return self._on("service")
+
+    def on_closed_voice_chat(self):
+        return self._on("service")
+
+    def on_left(self):
+        return self._on("service")
+
+    def on_stream_end(self):
+        return self._on("stream_end")
+
+    def _request(self, op: str, *args):
+        return self.shard.request(self.number, op, args)
+
+    async def start(self):
+        pass
+
+    @property
+    def ping(self):
+        return self._request("ping")
+
+    async def join_group_call(self, chat_id: int, stream: StreamSpec):
+        return await self._request("join_group_call", chat_id, tuple(stream))
+
+    async def change_stream(self, chat_id: int, stream: StreamSpec):
+        return await self._request("change_stream", chat_id, tuple(stream))
+
+    async def leave_group_call(self, chat_id: int):
+        return await self._request("leave_group_call", chat_id)
+
+    async def pause_stream(self, chat_id: int):
+        return await self._request("pause_stream", chat_id)
+
+    async def resume_stream(self, chat_id: int):
+        return await self._request("resume_stream", chat_id)
+
+    async def mute_stream(self, chat_id: int):
+        return await self._request("mute_stream", chat_id)
+
+    async def unmute_stream(self, chat_id: int):
+        return await self._request("unmute_stream", chat_id)
+
+    async def get_participants(self, chat_id: int):
+        # only the user ids cross the pipe, callers just count them
+        return await self._request("get_participants", chat_id)
+
+
+class Shard:
+    def __init__(self, index: int, numbers: List[int]):
+        self.index = index
+        self.numbers = numbers
+        self.calls: Dict[int, RemoteCall] = {n: RemoteCall(self, n) for n in numbers}
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ready: Optional[asyncio.Future] = None
+        self.conn = None
+        self.process = None
+
+    def spawn(self):
+        ctx = multiprocessing.get_context("fork")
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(self.numbers, child),
+            name=f"OpusCalls{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._ready = loop.create_future()
+        loop.add_reader(self.conn.fileno(), self._readable)
+        await self._ready
+        LOGGER(__name__).info(f"Cᴀʟʟ ᴡᴏʀᴋᴇʀ {self.index} ʀᴇᴀᴅʏ ᴡɪᴛʜ ᴀssɪsᴛᴀɴᴛs {self.numbers}.")
+
+    def stop(self):
+        if self.conn is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self.conn.fileno())
+            except Exception:
+                pass
+            self.conn.close()
+            self.conn = None
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+
+    def _readable(self):
+        try:
+            while self.conn.poll():
+                self._dispatch(self.conn.recv())
+        except (EOFError, OSError):
+            LOGGER(__name__).error(f"Cᴀʟʟ ᴡᴏʀᴋᴇʀ {self.index} ᴅɪᴇᴅ.")
+            asyncio.get_running_loop().remove_reader(self.conn.fileno())
+            self.conn.close()
+            # later requests get the ConnectionError from request(), not a broken pipe
+            self.conn = None
+            gone = ConnectionError(f"call worker {self.index} is gone")
+            if self._ready is not None and not self._ready.done():
+                # died before "ready", startup is waiting on it
+                self._ready.set_exception(gone)
+            for fut in self._pending.values():
+                if not fut.done():
+                    fut.set_exception(gone)
+            self._pending.clear()
+
+    def _dispatch(self, msg):
+        kind = msg[0]
+        if kind == "result":
+            _, req_id, ok, value = msg
+            fut = self._pending.pop(req_id, None)
+            if fut is None or fut.done():
+                return
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(_error(*value))
+        elif kind == "event":
+            _, event, number, chat_id = msg
+            asyncio.create_task(self._event(event, number, chat_id))
+        elif kind == "ready":
+            if not self._ready.done():
+                self._ready.set_result(True)
+        elif kind == "failed":
+            if not self._ready.done():
+                self._ready.set_exception(RuntimeError(msg[1]))
+
+    async def _event(self, event: str, number: int, chat_id: int):
+        from pytgcalls.types.stream import StreamAudioEnded
+
+        call = self.calls[number]
+        arg = StreamAudioEnded(chat_id) if event == "stream_end" else chat_id
+        for handler in call.handlers.get(event, []):
+            try:
+                await handler(call, arg)
+            except Exception as e:
+                LOGGER(__name__).warning(f"Cᴀʟʟ ᴇᴠᴇɴᴛ {event} ɪɴ {chat_id} ғᴀɪʟᴇᴅ: {e}")
+
+    async def request(self, number: int, op: str, args: tuple):
+        if self.conn is None:
+            raise ConnectionError(f"call worker {self.index} is not running")
+        req_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = fut
+        self.conn.send(("call", req_id, number, op, args))
+        try:
+            return await asyncio.wait_for(fut, REQUEST_TIMEOUT)
+        finally:
+            self._pending.pop(req_id, None)
+
+
+def plan(numbers: List[int], workers: int) -> List[List[int]]:
+    workers = max(1, min(workers, len(numbers)))
+    return [numbers[i::workers] for i in range(workers) if numbers[i::workers]]
+
+
+def _worker_main(numbers: List[int], conn):
+    # forked before the bot's loop runs, so a fresh one can be started here
+    try:
+        asyncio.run(_serve(numbers, conn))
+    except Exception as e:
+        try:
+            conn.send(("failed", str(e)))
+        except Exception:
+            pass
+
+
+async def _serve(numbers: List[int], conn):
+    from pyrogram import Client
+    from pytgcalls import PyTgCalls
+    from pytgcalls.types.stream import StreamAudioEnded
+
+    from Opus.core.call import build_media_stream
+
+    loop = asyncio.get_running_loop()
+    calls: Dict[int, PyTgCalls] = {}
+    for number in numbers:
+        client = Client(
+            name=f"OpusXAss{number}",
+            api_id=config.API_ID,
+            api_hash=config.API_HASH,
+            session_string=str(config.ASSISTANT_SESSIONS[number]),
+        )
+        calls[number] = PyTgCalls(client, cache_duration=100)
+
+    def forward(number: int):
+        async def service(_, chat_id: int):
+            conn.send(("event", "service", number, chat_id))
+
+        async def stream_end(_, update):
+            if isinstance(update, StreamAudioEnded):
+                conn.send(("event", "stream_end", number, update.chat_id))
+
+        return service, stream_end
+
+    for number, call in calls.items():
+        service, stream_end = forward(number)
+        call.on_kicked()(service)
+        call.on_closed_voice_chat()(service)
+        call.on_left()(service)
+        call.on_stream_end()(stream_end)
+        await call.start()
+
+    async def handle(req_id: int, number: int, op: str, args: tuple):
+        call = calls[number]
+        try:
+            if op == "ping":
+                value = await call.ping
+            elif op in ("join_group_call", "change_stream"):
+                chat_id, spec = args
+                await getattr(call, op)(chat_id, build_media_stream(*spec))
+                value = None
+            elif op == "get_participants":
+                participants = await call.get_participants(*args) or []
+                value = [p.user_id for p in participants]
+            else:
+                await getattr(call, op)(*args)
+                value = None
+            conn.send(("result", req_id, True, value))
+        except Exception as e:
+            conn.send(("result", req_id, False, (type(e).__name__, str(e))))
+
+    closed = loop.create_future()
+
+    def readable():
+        try:
+            while conn.poll():
+                msg = conn.recv()
+                if msg[0] == "call":
+                    loop.create_task(handle(*msg[1:]))
+        except (EOFError, OSError):
+            loop.remove_reader(conn.fileno())
+            if not closed.done():
+                closed.set_result(True)
+
+    loop.add_reader(conn.fileno(), readable)
+    conn.send(("ready", numbers))
+    # the front-end going away closes the pipe, which ends this worker
+    await closed
+
+
+class Supervisor:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.shards: List[Shard] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def spawn(self, numbers: List[int]):
+        self.shards = [Shard(i, part) for i, part in enumerate(plan(numbers, self.workers))]
+        for shard in self.shards:
+            shard.spawn()
+
+    async def start(self) -> Dict[int, RemoteCall]:
+        await asyncio.gather(*(shard.start() for shard in self.shards))
+        calls: Dict[int, RemoteCall] = {}
+        for shard in self.shards:
+            calls.update(shard.calls)
+        return calls
+
+    def stop(self):
+        for shard in self.shards:
+            shard.stop()
+
+
+supervisor = Supervisor(config.CALL_WORKERS)
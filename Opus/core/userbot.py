@@ -1,3 +1,5 @@
+from typing import Dict, Optional
+
 from pyrogram import Client
 import config
 from ..logging import LOGGER
@@ -8,41 +10,20 @@ assistantids = []
 
 class Userbot(Client):
     def __init__(self):
-        self.one = Client(
-            name="OpusXAss1",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING1),
-            no_updates=True,
-        )
-        self.two = Client(
-            name="OpusXAss2",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING2),
-            no_updates=True,
-        )
-        self.three = Client(
-            name="OpusXAss3",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING3),
-            no_updates=True,
-        )
-        self.four = Client(
-            name="OpusXAss4",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING4),
-            no_updates=True,
-        )
-        self.five = Client(
-            name="OpusXAss5",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING5),
-            no_updates=True,
-        )
+        # assistant number -> client, numbers match the STRING_SESSION<n> they came from
+        self.clients: Dict[int, Client] = {
+            number: Client(
+                name=f"OpusXAss{number}",
+                api_id=config.API_ID,
+                api_hash=config.API_HASH,
+                session_string=str(session),
+                no_updates=True,
+            )
+            for number, session in config.ASSISTANT_SESSIONS.items()
+        }
+
+    def assistant(self, number) -> Optional[Client]:
+        return self.clients.get(int(number))
 
     async def start(self):
         LOGGER(__name__).info("🚀 Initializing assistants...")
@@ -73,31 +54,15 @@ class Userbot(Client):
 
             LOGGER(__name__).info(f"Assistant {number} is active as {client.name}")
 
-        if config.STRING1:
-            await setup_assistant(self.one, 1)
-        if config.STRING2:
-            await setup_assistant(self.two, 2)
-        if config.STRING3:
-            await setup_assistant(self.three, 3)
-        if config.STRING4:
-            await setup_assistant(self.four, 4)
-        if config.STRING5:
-            await setup_assistant(self.five, 5)
+        for number, client in self.clients.items():
+            await setup_assistant(client, number)
 
         LOGGER(__name__).info("All 🟢 available assistants are up now.")
 
     async def stop(self):
         LOGGER(__name__).info("providing rest 🔴 to assistants...")
-        try:
-            if config.STRING1:
-                await self.one.stop()
-            if config.STRING2:
-                await self.two.stop()
-            if config.STRING3:
-                await self.three.stop()
-            if config.STRING4:
-                await self.four.stop()
-            if config.STRING5:
-                await self.five.stop()
-        except Exception as e:
-            LOGGER(__name__).warning(f"⚠️ Error while stopping assistants: {e}")
+        for number, client in self.clients.items():
+            try:
+                await client.stop()
+            except Exception as e:
+                LOGGER(__name__).warning(f"⚠️ Error while stopping assistant {number}: {e}")
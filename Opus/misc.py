@@ -6,6 +6,7 @@ from pyrogram import filters
 
 import config
 from Opus.core.mongo import mongodb
+from Opus.core.queuestore import QueueDB, queue_store
 
 from .logging import LOGGER
 
@@ -38,7 +39,7 @@ XCB = [
 
 def dbb():
     global db
-    db = {}
+    db = QueueDB(queue_store)
     LOGGER(__name__).info(f"ᴅᴀᴛᴀʙᴀsᴇ ʟᴏᴀᴅᴇᴅ sᴜᴄᴄᴇssғᴜʟʟʏ💗")
 
 
@@ -1,9 +1,7 @@
 import re
 from typing import Union
 
-import aiohttp
-from bs4 import BeautifulSoup
-from youtubesearchpython.future import VideosSearch
+from Opus.utils.scraper import every, first, scraper
 
 
 class AppleAPI:
@@ -18,30 +16,20 @@ class AppleAPI:
             return False
 
     async def track(self, url, playid: Union[bool, str] = None):
+        from Opus import YouTube
+
         if playid:
             url = self.base + url
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return False
-                html = await response.text()
-        soup = BeautifulSoup(html, "html.parser")
-        search = None
-        for tag in soup.find_all("meta"):
-            if tag.get("property", None) == "og:title":
-                search = tag.get("content", None)
+        meta = await scraper.meta(url)
+        if meta is None:
+            return False
+        search = first(meta, "og:title")
         if search is None:
             return False
-        results = VideosSearch(search, limit=1)
-        for result in (await results.next())["result"]:
-            title = result["title"]
-            ytlink = result["link"]
-            vidid = result["id"]
-            duration_min = result["duration"]
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
+        title, duration_min, _, thumbnail, vidid = await YouTube.details(search, False)
         track_details = {
             "title": title,
-            "link": ytlink,
+            "link": f"https://www.youtube.com/watch?v={vidid}",
             "vidid": vidid,
             "duration_min": duration_min,
             "thumb": thumbnail,
@@ -52,20 +40,14 @@ class AppleAPI:
         if playid:
             url = self.base + url
         playlist_id = url.split("playlist/")[1]
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return False
-                html = await response.text()
-        soup = BeautifulSoup(html, "html.parser")
-        applelinks = soup.find_all("meta", attrs={"property": "music:song"})
+        meta = await scraper.meta(url)
+        if meta is None:
+            return False
         results = []
-        for item in applelinks:
+        for content in every(meta, "music:song"):
             try:
-                xx = (((item["content"]).split("album/")[1]).split("/")[0]).replace(
-                    "-", " "
-                )
+                xx = ((content.split("album/")[1]).split("/")[0]).replace("-", " ")
             except:
-                xx = ((item["content"]).split("album/")[1]).split("/")[0]
+                continue
             results.append(xx)
         return results, playlist_id
@@ -1,9 +1,7 @@
 import re
 from typing import Union
 
-import aiohttp
-from bs4 import BeautifulSoup
-from youtubesearchpython.future import VideosSearch
+from Opus.utils.scraper import first, scraper
 
 
 class RessoAPI:
@@ -18,35 +16,21 @@ class RessoAPI:
             return False
 
     async def track(self, url, playid: Union[bool, str] = None):
+        from Opus import YouTube
+
         if playid:
             url = self.base + url
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return False
-                html = await response.text()
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup.find_all("meta"):
-            if tag.get("property", None) == "og:title":
-                title = tag.get("content", None)
-            if tag.get("property", None) == "og:description":
-                des = tag.get("content", None)
-                try:
-                    des = des.split("·")[0]
-                except:
-                    pass
-        if des == "":
+        meta = await scraper.meta(url)
+        if meta is None:
+            return False
+        title = first(meta, "og:title")
+        des = (first(meta, "og:description") or "").split("·")[0]
+        if des == "" or not title:
             return
-        results = VideosSearch(title, limit=1)
-        for result in (await results.next())["result"]:
-            title = result["title"]
-            ytlink = result["link"]
-            vidid = result["id"]
-            duration_min = result["duration"]
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
+        title, duration_min, _, thumbnail, vidid = await YouTube.details(title, False)
         track_details = {
             "title": title,
-            "link": ytlink,
+            "link": f"https://www.youtube.com/watch?v={vidid}",
             "vidid": vidid,
             "duration_min": duration_min,
             "thumb": thumbnail,
@@ -1,20 +1,10 @@
 from os import path
 
-from yt_dlp import YoutubeDL
-
+from Opus.utils.extractor import extractor
 from Opus.utils.formatters import seconds_to_min
 
 
 class SoundAPI:
-    def __init__(self):
-        self.opts = {
-            "outtmpl": "downloads/%(id)s.%(ext)s",
-            "format": "best",
-            "retries": 3,
-            "nooverwrites": False,
-            "continuedl": True,
-        }
-
     async def valid(self, link: str):
         if "soundcloud" in link:
             return True
@@ -22,9 +12,8 @@ class SoundAPI:
             return False
 
     async def download(self, url):
-        d = YoutubeDL(self.opts)
         try:
-            info = d.extract_info(url)
+            info = await extractor.soundcloud(url)
         except:
             return False
         xyz = path.join("downloads", f"{info['id']}.{info['ext']}")
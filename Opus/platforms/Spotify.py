@@ -1,10 +1,39 @@
+import asyncio
 import re
+from functools import partial
+from typing import List, NamedTuple, Optional, Tuple, Union
 
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
-from youtubesearchpython.future import VideosSearch
 
 import config
+from Opus.utils.metadata import track_map
+
+# spotify's cap for one /tracks request
+TRACKS_BATCH = 50
+
+
+class SpotifyTrack(NamedTuple):
+    query: str
+    id: Optional[str] = None
+    isrc: Optional[str] = None
+
+    @property
+    def keys(self) -> List[str]:
+        return [f"isrc:{self.isrc}" if self.isrc else None, f"sp:{self.id}" if self.id else None]
+
+
+def _query(track: dict) -> str:
+    info = track["name"]
+    for artist in track["artists"]:
+        fetched = f' {artist["name"]}'
+        if "Various Artists" not in fetched:
+            info += fetched
+    return info
+
+
+def _track(track: dict) -> SpotifyTrack:
+    return SpotifyTrack(_query(track), track.get("id"), (track.get("external_ids") or {}).get("isrc"))
 
 
 class SpotifyAPI:
@@ -22,77 +51,91 @@ class SpotifyAPI:
         else:
             self.spotify = None
 
+    async def _call(self, method: str, *args, **kwargs):
+        # spotipy is blocking, keep it off the event loop
+        func = partial(getattr(self.spotify, method), *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(None, func)
+
+    async def _pages(self, page: dict, limit: int) -> List[dict]:
+        items = []
+        while page:
+            items.extend(page.get("items") or [])
+            if len(items) >= limit or not page.get("next"):
+                break
+            page = await self._call("next", page)
+        return items[:limit]
+
+    async def _with_isrc(self, tracks: List[dict]) -> List[dict]:
+        # simplified track objects (albums) carry no external ids, fetch them in batches
+        ids = [t["id"] for t in tracks if t.get("id") and not t.get("external_ids")]
+        full = {}
+        batches = [ids[i: i + TRACKS_BATCH] for i in range(0, len(ids), TRACKS_BATCH)]
+        for result in await asyncio.gather(*(self._call("tracks", b) for b in batches), return_exceptions=True):
+            if isinstance(result, Exception):
+                continue
+            for t in result.get("tracks") or []:
+                if t:
+                    full[t["id"]] = t
+        return [full.get(t.get("id"), t) for t in tracks]
+
+    async def _tracks(self, tracks: List[dict]) -> List[SpotifyTrack]:
+        out = [_track(t) for t in tracks if t and t.get("name")]
+        await track_map.warm(k for t in out for k in t.keys)
+        return out
+
     async def valid(self, link: str):
         if re.search(self.regex, link):
             return True
         else:
             return False
 
+    async def resolve(self, item: Union[SpotifyTrack, str]) -> Tuple[str, Optional[str], int, str, str]:
+        # YouTube.details() for a track, skipping the search when it was mapped before
+        from Opus import YouTube
+
+        if isinstance(item, str):
+            return await YouTube.details(item, False)
+        vidid = await track_map.get(item.keys)
+        if vidid:
+            try:
+                return await YouTube.details(vidid, vidid)
+            except Exception:
+                await track_map.drop(item.keys)
+        details = await YouTube.details(item.query, False)
+        await track_map.set(item.keys, details[4])
+        return details
+
     async def track(self, link: str):
-        track = self.spotify.track(link)
-        info = track["name"]
-        for artist in track["artists"]:
-            fetched = f' {artist["name"]}'
-            if "Various Artists" not in fetched:
-                info += fetched
-        results = VideosSearch(info, limit=1)
-        for result in (await results.next())["result"]:
-            ytlink = result["link"]
-            title = result["title"]
-            vidid = result["id"]
-            duration_min = result["duration"]
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
+        track = await self._call("track", link)
+        title, duration_min, _, thumbnail, vidid = await self.resolve(_track(track))
         track_details = {
             "title": title,
-            "link": ytlink,
+            "link": f"https://www.youtube.com/watch?v={vidid}",
             "vidid": vidid,
             "duration_min": duration_min,
             "thumb": thumbnail,
         }
         return track_details, vidid
 
-    async def playlist(self, url):
-        playlist = self.spotify.playlist(url)
-        playlist_id = playlist["id"]
-        results = []
-        for item in playlist["tracks"]["items"]:
-            music_track = item["track"]
-            info = music_track["name"]
-            for artist in music_track["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
-        return results, playlist_id
-
-    async def album(self, url):
-        album = self.spotify.album(url)
-        album_id = album["id"]
-        results = []
-        for item in album["tracks"]["items"]:
-            info = item["name"]
-            for artist in item["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
-
-        return (
-            results,
-            album_id,
+    async def playlist(self, url, limit: int = None):
+        limit = limit or config.PLAYLIST_FETCH_LIMIT
+        playlist = await self._call(
+            "playlist", url, fields="id,tracks(items(track(id,name,artists(name),external_ids)),next)"
         )
+        items = await self._pages(playlist["tracks"], limit)
+        results = await self._tracks([item.get("track") for item in items])
+        return results, playlist["id"]
+
+    async def album(self, url, limit: int = None):
+        limit = limit or config.PLAYLIST_FETCH_LIMIT
+        album = await self._call("album", url)
+        items = await self._pages(album["tracks"], limit)
+        results = await self._tracks(await self._with_isrc(items))
+        return results, album["id"]
 
     async def artist(self, url):
-        artistinfo = self.spotify.artist(url)
-        artist_id = artistinfo["id"]
-        results = []
-        artisttoptracks = self.spotify.artist_top_tracks(url)
-        for item in artisttoptracks["tracks"]:
-            info = item["name"]
-            for artist in item["artists"]:
-                fetched = f' {artist["name"]}'
-                if "Various Artists" not in fetched:
-                    info += fetched
-            results.append(info)
-
-        return results, artist_id
+        artistinfo, toptracks = await asyncio.gather(
+            self._call("artist", url), self._call("artist_top_tracks", url)
+        )
+        results = await self._tracks(toptracks["tracks"])
+        return results, artistinfo["id"]
@@ -1,10 +1,5 @@
-import os
 import re
-import json
 
-import httpx
-import yt_dlp
-import asyncio
 import aiofiles
 from config import API_URL
 
@@ -21,55 +16,19 @@ from Opus.utils.downloader import (
     download_video,
     download_song_audio,
     download_song_video,
+    extract_video_id,
 )
+from Opus.utils.extractor import extractor
+from Opus.utils.metadata import metadata_cache, normalize_query
 
-COOKIE_PATH = "Opus/assets/cookies.txt"
 DOWNLOAD_DIR = "downloads"
 CHUNK_SIZE = 8 * 1024 * 1024
 
 
-def _cookiefile_path() -> Optional[str]:
-    path = str(COOKIE_PATH)
-    try:
-        if path and os.path.exists(path) and os.path.getsize(path) > 0:
-            return path
-    except Exception:
-        pass
-    return None
-
-
-def _cookies_args() -> List[str]:
-    p = _cookiefile_path()
-    return ["--cookies", p] if p else []
-
-
-async def _exec_proc(*args: str) -> Tuple[bytes, bytes]:
-    proc = await asyncio.create_subprocess_exec(
-        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
-    try:
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=60)
-    except asyncio.TimeoutError:
-        try:
-            proc.kill()
-        except ProcessLookupError:
-            pass
-        return b"", b""
-    return stdout, stderr
-
-
 def _safe_filename(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]+', "_", (name or "").strip())[:200]
 
 
-async def _http_client() -> httpx.AsyncClient:
-    return httpx.AsyncClient(
-        timeout=httpx.Timeout(60, connect=20.0, read=60.0),
-        limits=httpx.Limits(max_keepalive_connections=None, max_connections=None, keepalive_expiry=300.0),
-        follow_redirects=True,
-    )
-
-
 class YouTubeAPI:
     def __init__(self) -> None:
         self.base_url = "https://www.youtube.com/watch?v="
@@ -114,11 +73,21 @@ class YouTubeAPI:
                     return ent.url
         return None
 
+    def _cache_key(self, prepared: str) -> str:
+        if self._url_pattern.search(prepared):
+            return f"id:{extract_video_id(prepared)}"
+        return f"q:{normalize_query(prepared)}"
+
     async def _fetch_video_info(self, query: str) -> Optional[Dict]:
         try:
             prepared = self._prepare_link(query)
         except ValueError:
             prepared = (query or "").strip()
+        return await metadata_cache.get(
+            self._cache_key(prepared), lambda: self._lookup_video_info(prepared)
+        )
+
+    async def _lookup_video_info(self, prepared: str) -> Optional[Dict]:
         try:
             data = await VideosSearch(prepared, limit=1).next()
             result = data.get("result", [])
@@ -131,19 +100,18 @@ class YouTubeAPI:
         except Exception:
             pass
         if self._url_pattern.search(prepared):
-            stdout, _ = await _exec_proc("yt-dlp", *(_cookies_args()), "--dump-json", prepared)
-            if not stdout:
-                return None
             try:
-                info = json.loads(stdout.decode())
-                if isinstance(info.get("duration"), int):
-                    info["duration"] = seconds_to_min(info["duration"]) if info.get("duration") else None
-                if "thumbnails" not in info:
-                    info["thumbnails"] = [{"url": info.get("thumbnail", "")}]
-                info["webpage_url"] = info.get("webpage_url", prepared)
-                return info
-            except json.JSONDecodeError:
+                info = await extractor.info(prepared)
+            except Exception:
                 return None
+            if not info:
+                return None
+            if isinstance(info.get("duration"), (int, float)):
+                info["duration"] = seconds_to_min(int(info["duration"])) if info.get("duration") else None
+            if not info.get("thumbnails"):
+                info["thumbnails"] = [{"url": info.get("thumbnail", "")}]
+            info["webpage_url"] = info.get("webpage_url") or prepared
+            return info
         else:
             try:
                 data = await VideosSearch(prepared, limit=1).next()
@@ -158,16 +126,16 @@ class YouTubeAPI:
             except Exception:
                 return None
 
+    async def info(self, link: str, videoid: Union[str, bool, None] = None) -> Optional[Dict]:
+        return await self._fetch_video_info(self._prepare_link(link, videoid))
+
     async def is_live(self, link: str) -> bool:
         prepared = self._prepare_link(link)
-        stdout, _ = await _exec_proc("yt-dlp", *(_cookies_args()), "--dump-json", prepared)
-        if not stdout:
-            return False
         try:
-            info = json.loads(stdout.decode())
-            return bool(info.get("is_live"))
-        except json.JSONDecodeError:
+            info = await extractor.info(prepared)
+        except Exception:
             return False
+        return bool(info.get("is_live"))
 
     async def details(self, link: str, videoid: Union[str, bool, None] = None) -> Tuple[str, Optional[str], int, str, str]:
         info = await self._fetch_video_info(self._prepare_link(link, videoid))
@@ -192,15 +160,11 @@ class YouTubeAPI:
 
     async def video(self, link: str, videoid: Union[str, bool, None] = None) -> Tuple[int, str]:
         link = self._prepare_link(link, videoid)
-        stdout, stderr = await _exec_proc(
-            "yt-dlp",
-            *(_cookies_args()),
-            "-g",
-            "-f",
-            "best[height<=?720][width<=?1280]",
-            link,
-        )
-        return (1, stdout.decode().split("\n")[0]) if stdout else (0, stderr.decode())
+        try:
+            url = await extractor.stream_url(link, "best[height<=?720][width<=?1280]")
+        except Exception as e:
+            return 0, str(e)
+        return (1, url) if url else (0, "No stream url found")
 
     async def playlist(self, link: str, limit: int, user_id, videoid: Union[str, bool, None] = None) -> List[str]:
         if videoid:
@@ -210,19 +174,10 @@ class YouTubeAPI:
             limit = 1
         if limit > 100:
             limit = 100
-        stdout, _ = await _exec_proc(
-            "yt-dlp",
-            *(_cookies_args()),
-            "-i",
-            "--get-id",
-            "--flat-playlist",
-            "--playlist-end",
-            str(limit),
-            "--skip-download",
-            link,
-        )
-        items = stdout.decode().strip().split("\n") if stdout else []
-        return [i for i in items if i]
+        try:
+            return await extractor.playlist(link, limit)
+        except Exception:
+            return []
 
     async def track(self, link: str, videoid: Union[str, bool, None] = None) -> Tuple[Dict, str]:
         info = await self._fetch_video_info(self._prepare_link(link, videoid))
@@ -240,33 +195,7 @@ class YouTubeAPI:
 
     async def formats(self, link: str, videoid: Union[str, bool, None] = None) -> Tuple[List[Dict], str]:
         link = self._prepare_link(link, videoid)
-        opts = {"quiet": True}
-        cf = _cookiefile_path()
-        if cf:
-            opts["cookiefile"] = cf
-        out: List[Dict] = []
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(link, download=False)
-            for fmt in info.get("formats", []):
-                if "dash" in str(fmt.get("format", "")).lower():
-                    continue
-                if not any(k in fmt for k in ("filesize", "filesize_approx")):
-                    continue
-                if not all(k in fmt for k in ("format", "format_id", "ext", "format_note")):
-                    continue
-                size = fmt.get("filesize") or fmt.get("filesize_approx")
-                if not size:
-                    continue
-                out.append(
-                    {
-                        "format": fmt["format"],
-                        "filesize": size,
-                        "format_id": fmt["format_id"],
-                        "ext": fmt["ext"],
-                        "format_note": fmt["format_note"],
-                        "yturl": link,
-                    }
-                )
+        out = await extractor.formats(link)
         return out, link
 
     async def slider(self, link: str, query_type: int, videoid: Union[str, bool, None] = None) -> Tuple[str, Optional[str], str, str]:
@@ -7,8 +7,6 @@ from Opus import YouTube, app
 from Opus.core.call import Signal
 from Opus.misc import SUDOERS, db
 from Opus.utils.database import (
-    get_active_chats,
-    get_lang,
     get_upvote_count,
     is_active_chat,
     is_music_playing,
@@ -19,9 +17,11 @@ from Opus.utils.database import (
     get_thumb_setting,
 )
 from Opus.utils.decorators.language import languageCB
-from Opus.utils.formatters import seconds_to_min
-from Opus.utils.inline import close_markup, stream_markup, stream_markup_timer
+from Opus.utils.inline import close_markup, stream_markup
 from Opus.utils.stream.autoclear import auto_clean
+from Opus.utils.stream import position
+from Opus.utils.stream.progress import progress_updater
+from Opus.utils.stream.prefetch import prefetcher
 from Opus.utils.thumbnails import get_thumb
 from config import (
     BANNED_USERS,
@@ -34,9 +34,7 @@ from config import (
     confirmer,
     votemode,
 )
-from strings import get_string
 
-checker = {}
 upvoters = {}
 
 async def delete_after_delay(message, delay=10):
@@ -213,7 +211,7 @@ async def del_back_playlist(client, CallbackQuery, _):
             txt = f"> ᴛʀᴀᴄᴋ sᴋɪᴩᴩᴇᴅ\n•ʙʏ : {mention} 🛸"
             popped = None
             try:
-                popped = check.pop(0)
+                popped = check.popleft()
                 if popped:
                     await auto_clean(popped)
                 if not check:
@@ -264,6 +262,7 @@ async def del_back_playlist(client, CallbackQuery, _):
         await CallbackQuery.answer()
         if not check:
              return
+        prefetcher.sync(chat_id)
         queued = check[0]["file"]
         title = (check[0]["title"]).title()
         user = check[0]["by"]
@@ -271,7 +270,7 @@ async def del_back_playlist(client, CallbackQuery, _):
         streamtype = check[0]["streamtype"]
         videoid = check[0]["vidid"]
         status = True if str(streamtype) == "video" else None
-        db[chat_id][0]["played"] = 0
+        position.start(db[chat_id][0])
         exis = check[0].get("old_dur")
         if exis:
             db[chat_id][0]["dur"] = exis
@@ -470,46 +469,4 @@ async def del_back_playlist(client, CallbackQuery, _):
             if sec and sec > 0:
                 asyncio.create_task(delete_after_delay(run, sec + 2))
 
-async def markup_timer():
-    while not await asyncio.sleep(7):
-        active_chats = await get_active_chats()
-        for chat_id in active_chats:
-            try:
-                if not await is_music_playing(chat_id):
-                    continue
-                playing = db.get(chat_id)
-                if not playing or not playing:
-                    continue
-                duration_seconds = int(playing[0]["seconds"])
-                if duration_seconds == 0:
-                    continue
-                mystic = playing[0].get("mystic")
-                if not mystic:
-                    continue
-                try:
-                    check = checker[chat_id][mystic.id]
-                    if check is False:
-                        continue
-                except:
-                    pass
-                try:
-                    language = await get_lang(chat_id)
-                    _ = get_string(language)
-                except:
-                    _ = get_string("en")
-                try:
-                    buttons = stream_markup_timer(
-                        _,
-                        chat_id,
-                        seconds_to_min(playing[0]["played"]),
-                        playing[0]["dur"],
-                    )
-                    await mystic.edit_reply_markup(
-                        reply_markup=InlineKeyboardMarkup(buttons)
-                    )
-                except:
-                    continue
-            except:
-                continue
-
-asyncio.create_task(markup_timer())
+asyncio.create_task(progress_updater.run())
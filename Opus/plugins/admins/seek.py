@@ -5,6 +5,8 @@ from Opus import YouTube, app
 from Opus.core.call import Signal
 from Opus.misc import db
 from Opus.utils import AdminRightsCheck, seconds_to_min
+from Opus.utils.downloader import file_exists
+from Opus.utils.stream import position
 from Opus.utils.inline import close_markup
 from config import BANNED_USERS
 
@@ -28,7 +30,7 @@ async def seek_comm(cli, message: Message, _, chat_id):
     if duration_seconds == 0:
         return await message.reply_text(_["admin_22"])
     file_path = playing[0]["file"]
-    duration_played = int(playing[0]["played"])
+    duration_played = position.played(playing[0])
     duration_to_skip = int(query)
     duration = playing[0]["dur"]
     if message.command[0][-2] == "c":
@@ -47,9 +49,16 @@ async def seek_comm(cli, message: Message, _, chat_id):
         to_seek = duration_played + duration_to_skip + 1
     mystic = await message.reply_text(_["admin_24"])
     if "vid_" in file_path:
-        n, file_path = await YouTube.video(playing[0]["vidid"], True)
-        if n == 0:
-            return await message.reply_text(_["admin_22"])
+        cached = file_exists(
+            playing[0]["vidid"],
+            "video" if str(playing[0]["streamtype"]) == "video" else "audio",
+        )
+        if cached:
+            file_path = cached
+        else:
+            n, file_path = await YouTube.video(playing[0]["vidid"], True)
+            if n == 0:
+                return await message.reply_text(_["admin_22"])
     check = (playing[0]).get("speed_path")
     if check:
         file_path = check
@@ -65,10 +74,7 @@ async def seek_comm(cli, message: Message, _, chat_id):
         )
     except:
         return await mystic.edit_text(_["admin_26"], reply_markup=close_markup(_))
-    if message.command[0][-2] == "c":
-        db[chat_id][0]["played"] -= duration_to_skip
-    else:
-        db[chat_id][0]["played"] += duration_to_skip
+    position.seek(db[chat_id][0], to_seek)
     await mystic.edit_text(
         text=_["admin_25"].format(seconds_to_min(to_seek), message.from_user.mention),
         reply_markup=close_markup(_),
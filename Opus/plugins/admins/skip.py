@@ -8,7 +8,9 @@ from Opus.misc import db
 from Opus.utils.database import get_loop
 from Opus.utils.decorators import AdminRightsCheck
 from Opus.utils.inline import close_markup, stream_markup
-from Opus.utils.stream.autoclear import auto_clean
+from Opus.utils.stream.autoclear import auto_clean, auto_clean_many
+from Opus.utils.stream import position
+from Opus.utils.stream.prefetch import prefetcher
 from Opus.utils.thumbnails import get_thumb
 from config import BANNED_USERS
 
@@ -31,27 +33,24 @@ async def skip(cli, message: Message, _, chat_id):
                 if count > 2:
                     count = int(count - 1)
                     if 1 <= state <= count:
-                        for x in range(state):
-                            popped = None
+                        try:
+                            popped = check.skip(state)
+                        except:
+                            return await message.reply_text(_["admin_12"])
+                        await auto_clean_many(popped)
+                        if not check:
                             try:
-                                popped = check.pop(0)
+                                await message.reply_text(
+                                    text=_["admin_6"].format(
+                                        message.from_user.mention,
+                                        message.chat.title,
+                                    ),
+                                    reply_markup=close_markup(_),
+                                )
+                                await Signal.stop_stream(chat_id)
                             except:
-                                return await message.reply_text(_["admin_12"])
-                            if popped:
-                                await auto_clean(popped)
-                            if not check:
-                                try:
-                                    await message.reply_text(
-                                        text=_["admin_6"].format(
-                                            message.from_user.mention,
-                                            message.chat.title,
-                                        ),
-                                        reply_markup=close_markup(_),
-                                    )
-                                    await Signal.stop_stream(chat_id)
-                                except:
-                                    return
-                                break
+                                pass
+                            return
                     else:
                         return await message.reply_text(_["admin_11"].format(count))
                 else:
@@ -64,7 +63,7 @@ async def skip(cli, message: Message, _, chat_id):
         check = db.get(chat_id)
         popped = None
         try:
-            popped = check.pop(0)
+            popped = check.popleft()
             if popped:
                 await auto_clean(popped)
             if not check:
@@ -89,13 +88,14 @@ async def skip(cli, message: Message, _, chat_id):
                 return await Signal.stop_stream(chat_id)
             except:
                 return
+    prefetcher.sync(chat_id)
     queued = check[0]["file"]
     title = (check[0]["title"]).title()
     user = check[0]["by"]
     streamtype = check[0]["streamtype"]
     videoid = check[0]["vidid"]
     status = True if str(streamtype) == "video" else None
-    db[chat_id][0]["played"] = 0
+    position.start(db[chat_id][0])
     exis = (check[0]).get("old_dur")
     if exis:
         db[chat_id][0]["dur"] = exis
@@ -2,148 +2,82 @@ import asyncio
 
 from pyrogram import filters
 from pyrogram.enums import ChatMembersFilter
-from pyrogram.errors import FloodWait
 
 from Opus import app
 from Opus.misc import SUDOERS
-from Opus.utils.database import (
-    get_active_chats,
-    get_authuser_names,
-    get_client,
-    get_served_chats,
-    get_served_users,
-)
+from Opus.utils.database import get_active_chats, get_authuser_names, get_lang
 from Opus.utils.decorators.language import language
 from Opus.utils.formatters import alpha_to_int
+from Opus.utils.jobs import JobKind, jobs
 from config import adminlist
 
-IS_BROADCASTING = False
+
+async def _deliver(client, chat_id, source, params):
+    if "text" in params:
+        m = await client.send_message(chat_id, text=params["text"])
+    else:
+        m = await client.forward_messages(chat_id, params["from_chat"], params["message_id"])
+    if params.get("pin") and source == "chats":
+        try:
+            await m.pin(disable_notification=params["pin"] != "loud")
+            return "pinned"
+        except:
+            pass
+
+
+def _footer(job, _):
+    text = _["broad_10"].format(job.counts.get("pinned", 0)) if job.params.get("pin") else ""
+    if job.assistants:
+        text += "\n\n" + _["broad_6"]
+        for num, state in job.assistants.items():
+            text += _["broad_7"].format(num, state["done"]) + "\n"
+    return text
+
+
+jobs.register("broadcast", JobKind(_deliver, "broad_9", footer=_footer))
 
 
 @app.on_message(filters.command("broadcast") & SUDOERS)
 @language
 async def braodcast_message(client, message, _):
-    global IS_BROADCASTING
     if message.reply_to_message:
-        x = message.reply_to_message.id
-        y = message.chat.id
+        params = {"from_chat": message.chat.id, "message_id": message.reply_to_message.id}
     else:
         if len(message.command) < 2:
             return await message.reply_text(_["broad_2"])
         query = message.text.split(None, 1)[1]
-        if "-pin" in query:
-            query = query.replace("-pin", "")
-        if "-nobot" in query:
-            query = query.replace("-nobot", "")
-        if "-pinloud" in query:
-            query = query.replace("-pinloud", "")
-        if "-assistant" in query:
-            query = query.replace("-assistant", "")
-        if "-user" in query:
-            query = query.replace("-user", "")
+        for flag in ("-pinloud", "-pin", "-nobot", "-assistant", "-user"):
+            query = query.replace(flag, "")
+        query = query.strip()
         if query == "":
             return await message.reply_text(_["broad_8"])
+        params = {"text": query}
 
-    IS_BROADCASTING = True
-    await message.reply_text(_["broad_1"])
+    if "-pinloud" in message.text:
+        params["pin"] = "loud"
+    elif "-pin" in message.text:
+        params["pin"] = "silent"
 
+    sources = []
     if "-nobot" not in message.text:
-        sent = 0
-        pin = 0
-        chats = []
-        schats = await get_served_chats()
-        for chat in schats:
-            chats.append(int(chat["chat_id"]))
-        for i in chats:
-            try:
-                m = (
-                    await app.forward_messages(i, y, x)
-                    if message.reply_to_message
-                    else await app.send_message(i, text=query)
-                )
-                if "-pin" in message.text:
-                    try:
-                        await m.pin(disable_notification=True)
-                        pin += 1
-                    except:
-                        continue
-                elif "-pinloud" in message.text:
-                    try:
-                        await m.pin(disable_notification=False)
-                        pin += 1
-                    except:
-                        continue
-                sent += 1
-                await asyncio.sleep(0.2)
-            except FloodWait as fw:
-                flood_time = int(fw.value)
-                if flood_time > 200:
-                    continue
-                await asyncio.sleep(flood_time)
-            except:
-                continue
-        try:
-            await message.reply_text(_["broad_3"].format(sent, pin))
-        except:
-            pass
-
+        sources.append("chats")
     if "-user" in message.text:
-        susr = 0
-        served_users = []
-        susers = await get_served_users()
-        for user in susers:
-            served_users.append(int(user["user_id"]))
-        for i in served_users:
-            try:
-                m = (
-                    await app.forward_messages(i, y, x)
-                    if message.reply_to_message
-                    else await app.send_message(i, text=query)
-                )
-                susr += 1
-                await asyncio.sleep(0.2)
-            except FloodWait as fw:
-                flood_time = int(fw.value)
-                if flood_time > 200:
-                    continue
-                await asyncio.sleep(flood_time)
-            except:
-                pass
-        try:
-            await message.reply_text(_["broad_4"].format(susr))
-        except:
-            pass
-
+        sources.append("users")
+    helpers = []
     if "-assistant" in message.text:
-        aw = await message.reply_text(_["broad_5"])
-        text = _["broad_6"]
         from Opus.core.userbot import assistants
 
-        for num in assistants:
-            sent = 0
-            client = await get_client(num)
-            async for dialog in client.get_dialogs():
-                try:
-                    await client.forward_messages(
-                        dialog.chat.id, y, x
-                    ) if message.reply_to_message else await client.send_message(
-                        dialog.chat.id, text=query
-                    )
-                    sent += 1
-                    await asyncio.sleep(3)
-                except FloodWait as fw:
-                    flood_time = int(fw.value)
-                    if flood_time > 200:
-                        continue
-                    await asyncio.sleep(flood_time)
-                except:
-                    continue
-            text += _["broad_7"].format(num, sent)
-        try:
-            await aw.edit_text(text)
-        except:
-            pass
-    IS_BROADCASTING = False
+        helpers = list(assistants)
+
+    mystic = await message.reply_text(_["broad_1"])
+    await jobs.start(
+        "broadcast",
+        sources,
+        params,
+        mystic,
+        lang=await get_lang(message.chat.id),
+        assistants=helpers,
+    )
 
 
 async def auto_clean():
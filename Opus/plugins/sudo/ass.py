@@ -7,10 +7,23 @@ from pyrogram.types import Message
 from Opus import app
 from Opus.misc import SUDOERS
 from Opus.utils.database import get_client
+from Opus.utils.placement import placement
 
 ASSISTANT_PREFIX = "."
 
 
+@app.on_message(filters.command("assistants") & SUDOERS)
+async def assistant_load(client, message: Message):
+    from Opus.core.userbot import assistants
+
+    text = "<b>ᴀssɪsᴛᴀɴᴛ ʟᴏᴀᴅ :</b>\n\n"
+    for row in placement.stats(assistants):
+        ping = f"{row['ping']:.1f}ᴍs" if row["ping"] is not None else "-"
+        state = "🟢" if row["healthy"] else "🔴"
+        text += f"{state} <b>{row['number']}</b> » ᴄᴀʟʟs : {row['calls']} | ᴇʀʀᴏʀs : {row['errors']} | ᴘɪɴɢ : {ping}\n"
+    await message.reply_text(text)
+
+
 @app.on_message(filters.command("setdp", prefixes=ASSISTANT_PREFIX) & SUDOERS)
 async def set_pfp(client, message):
     from Opus.core.userbot import assistants
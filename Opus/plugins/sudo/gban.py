@@ -1,9 +1,8 @@
-import asyncio
-
 from pyrogram import filters
-from pyrogram.errors import FloodWait
+from pyrogram.errors import InputUserDeactivated, UserDeactivated, UserIdInvalid
 from pyrogram.types import Message
 
+import config
 from Opus import app
 from Opus.misc import SUDOERS
 from Opus.utils import get_readable_time
@@ -11,13 +10,81 @@ from Opus.utils.database import (
     add_banned_user,
     get_banned_count,
     get_banned_users,
-    get_served_chats,
+    get_lang,
     is_banned_user,
     remove_banned_user,
+    served_chats_count,
 )
 from Opus.utils.decorators.language import language
 from Opus.utils.extraction import extract_user
+from Opus.utils.jobs import CHAT_GONE, JobKind, jobs
 from config import BANNED_USERS
+from strings import get_string
+
+
+async def _ban(client, chat_id, source, params):
+    await client.ban_chat_member(chat_id, params["user_id"])
+
+
+async def _unban(client, chat_id, source, params):
+    await client.unban_chat_member(chat_id, params["user_id"])
+
+
+def _footer(job, _):
+    return _["gban_15"].format(job.params["mention"])
+
+
+async def _banned(job):
+    if not job.status:
+        return
+    _ = get_string(job.lang)
+    p = job.params
+    await app.send_message(
+        job.status[0],
+        _["gban_6"].format(
+            app.mention,
+            p["chat_title"],
+            p["chat_id"],
+            p["mention"],
+            p["user_id"],
+            p["by"],
+            job.counts.get("done", 0),
+        ),
+    )
+
+
+async def _unbanned(job):
+    if not job.status:
+        return
+    _ = get_string(job.lang)
+    await app.send_message(
+        job.status[0], _["gban_9"].format(job.params["mention"], job.counts.get("done", 0))
+    )
+
+
+# user errors describe the banned account, not the chat, so they end the job
+# instead of pruning every served chat
+TARGET_GONE = (InputUserDeactivated, UserDeactivated, UserIdInvalid)
+
+jobs.register(
+    "gban",
+    JobKind(_ban, "gban_13", footer=_footer, finish=_banned, rate=config.GBAN_RATE, gone=CHAT_GONE, abort=TARGET_GONE),
+)
+jobs.register(
+    "ungban",
+    JobKind(_unban, "gban_14", footer=_footer, finish=_unbanned, rate=config.GBAN_RATE, gone=CHAT_GONE, abort=TARGET_GONE),
+)
+
+
+def _running(user_id: int) -> bool:
+    return any(
+        job.params.get("user_id") == user_id
+        for job in jobs.running("gban") + jobs.running("ungban")
+    )
+
+
+async def _expected() -> str:
+    return get_readable_time(int(await served_chats_count() / max(config.GBAN_RATE, 1)))
 
 
 @app.on_message(filters.command(["gban", "globalban"]) & SUDOERS)
@@ -36,36 +103,26 @@ async def global_ban(client, message: Message, _):
     is_gbanned = await is_banned_user(user.id)
     if is_gbanned:
         return await message.reply_text(_["gban_4"].format(user.mention))
+    if _running(user.id):
+        return await message.reply_text(_["gban_16"].format(user.mention))
     if user.id not in BANNED_USERS:
         BANNED_USERS.add(user.id)
-    served_chats = []
-    chats = await get_served_chats()
-    for chat in chats:
-        served_chats.append(int(chat["chat_id"]))
-    time_expected = get_readable_time(len(served_chats))
-    mystic = await message.reply_text(_["gban_5"].format(user.mention, time_expected))
-    number_of_chats = 0
-    for chat_id in served_chats:
-        try:
-            await app.ban_chat_member(chat_id, user.id)
-            number_of_chats += 1
-        except FloodWait as fw:
-            await asyncio.sleep(int(fw.value))
-        except:
-            continue
+    # recorded up front so the ban holds even if the job is interrupted
     await add_banned_user(user.id)
-    await message.reply_text(
-        _["gban_6"].format(
-            app.mention,
-            message.chat.title,
-            message.chat.id,
-            user.mention,
-            user.id,
-            message.from_user.mention,
-            number_of_chats,
-        )
+    mystic = await message.reply_text(_["gban_5"].format(user.mention, await _expected()))
+    await jobs.start(
+        "gban",
+        ["chats"],
+        {
+            "user_id": user.id,
+            "mention": user.mention,
+            "chat_title": message.chat.title,
+            "chat_id": message.chat.id,
+            "by": message.from_user.mention,
+        },
+        mystic,
+        lang=await get_lang(message.chat.id),
     )
-    await mystic.delete()
 
 
 @app.on_message(filters.command(["ungban"]) & SUDOERS)
@@ -78,26 +135,19 @@ async def global_un(client, message: Message, _):
     is_gbanned = await is_banned_user(user.id)
     if not is_gbanned:
         return await message.reply_text(_["gban_7"].format(user.mention))
+    if _running(user.id):
+        return await message.reply_text(_["gban_16"].format(user.mention))
     if user.id in BANNED_USERS:
         BANNED_USERS.remove(user.id)
-    served_chats = []
-    chats = await get_served_chats()
-    for chat in chats:
-        served_chats.append(int(chat["chat_id"]))
-    time_expected = get_readable_time(len(served_chats))
-    mystic = await message.reply_text(_["gban_8"].format(user.mention, time_expected))
-    number_of_chats = 0
-    for chat_id in served_chats:
-        try:
-            await app.unban_chat_member(chat_id, user.id)
-            number_of_chats += 1
-        except FloodWait as fw:
-            await asyncio.sleep(int(fw.value))
-        except:
-            continue
     await remove_banned_user(user.id)
-    await message.reply_text(_["gban_9"].format(user.mention, number_of_chats))
-    await mystic.delete()
+    mystic = await message.reply_text(_["gban_8"].format(user.mention, await _expected()))
+    await jobs.start(
+        "ungban",
+        ["chats"],
+        {"user_id": user.id, "mention": user.mention},
+        mystic,
+        lang=await get_lang(message.chat.id),
+    )
 
 
 @app.on_message(filters.command(["gbannedusers", "gbanlist"]) & SUDOERS)
@@ -0,0 +1,27 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from Opus import app
+from Opus.misc import SUDOERS
+from Opus.utils.decorators.language import language
+from Opus.utils.jobs import jobs
+
+
+@app.on_message(filters.command(["jobs", "broadcaststatus"]) & SUDOERS)
+@language
+async def running_jobs(client, message: Message, _):
+    running = jobs.running()
+    if not running:
+        return await message.reply_text(_["job_2"])
+    await message.reply_text("\n\n".join(jobs.render(job, _) for job in running))
+
+
+@app.on_message(filters.command("canceljob") & SUDOERS)
+@language
+async def cancel_job(client, message: Message, _):
+    if len(message.command) != 2:
+        return await message.reply_text(_["job_5"])
+    job_id = message.command[1].strip()
+    if not await jobs.cancel(job_id):
+        return await message.reply_text(_["job_4"].format(job_id))
+    await message.reply_text(_["job_3"].format(job_id))
@@ -11,6 +11,7 @@ from pyrogram import filters
 
 import config
 from Opus import app
+from Opus.core.queuestore import queue_store
 from Opus.misc import HAPP, SUDOERS, XCB
 from Opus.utils.database import (
     get_active_chats,
@@ -106,6 +107,7 @@ async def update_(client, message, _):
             )
     else:
         os.system("pip3 install -r requirements.txt")
+        await queue_store.flush()
         os.system(f"kill -9 {os.getpid()} && bash start")
         exit()
 
@@ -134,4 +136,5 @@ async def restart_(_, message):
     await response.edit_text(
         "» ʀᴇsᴛᴀʀᴛ ᴘʀᴏᴄᴇss sᴛᴀʀᴛᴇᴅ, ᴘʟᴇᴀsᴇ ᴡᴀɪᴛ ғᴏʀ ғᴇᴡ sᴇᴄᴏɴᴅs ᴜɴᴛɪʟ ᴛʜᴇ ʙᴏᴛ sᴛᴀʀᴛs..."
     )
+    await queue_store.flush()
     os.system(f"kill -9 {os.getpid()} && bash start")
@@ -4,7 +4,8 @@ from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from config import LOGGER_ID
 from Opus import app
 from Opus.core.userbot import Userbot
-from Opus.utils.ndatabase import delete_served_chat, add_served_chat, get_assistant
+from Opus.utils.database import get_assistant
+from Opus.utils.ndatabase import delete_served_chat, add_served_chat
 from strings.__init__ import LOGGERS
 
 
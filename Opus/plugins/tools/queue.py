@@ -1,5 +1,4 @@
 import asyncio
-import os
 
 from pyrogram import filters
 from pyrogram.errors import FloodWait
@@ -12,16 +11,15 @@ from Opus.utils import SignalBin, get_channeplayCB, seconds_to_min
 from Opus.utils.database import get_cmode, is_active_chat, is_music_playing
 from Opus.utils.decorators.language import language, languageCB
 from Opus.utils.inline import queue_back_markup, queue_markup
+from Opus.utils.stream import position
+from Opus.utils.thumbnails import rendered_thumb
 from config import BANNED_USERS
 
 basic = {}
 
 
 def get_image(videoid):
-    if os.path.isfile(f"cache/{videoid}.png"):
-        return f"cache/{videoid}.png"
-    else:
-        return config.YOUTUBE_IMG_URL
+    return rendered_thumb(videoid) or config.YOUTUBE_IMG_URL
 
 
 def get_duration(playing):
@@ -92,7 +90,7 @@ async def get_queue(client, message: Message, _):
             DUR,
             "c" if cplay else "g",
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(position.played(got[0])),
             got[0]["dur"],
         )
     )
@@ -111,7 +109,7 @@ async def get_queue(client, message: Message, _):
                                     DUR,
                                     "c" if cplay else "g",
                                     videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
+                                    seconds_to_min(position.played(db[chat_id][0])),
                                     db[chat_id][0]["dur"],
                                 )
                                 await mystic.edit_reply_markup(reply_markup=buttons)
@@ -232,7 +230,7 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
             DUR,
             cplay,
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(position.played(got[0])),
             got[0]["dur"],
         )
     )
@@ -253,7 +251,7 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
                                     DUR,
                                     cplay,
                                     videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
+                                    seconds_to_min(position.played(db[chat_id][0])),
                                     db[chat_id][0]["dur"],
                                 )
                                 await mystic.edit_reply_markup(reply_markup=buttons)
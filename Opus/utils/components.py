@@ -0,0 +1,83 @@
+from typing import List, NamedTuple
+
+import numpy as np
+
+
+class Component(NamedTuple):
+    area: int
+    min_r: int
+    max_r: int
+    min_c: int
+    max_c: int
+
+
+def _runs(mask: np.ndarray):
+    # horizontal runs of set pixels: row, first column, one past the last column
+    h, w = mask.shape
+    padded = np.zeros((h, w + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask != 0
+    edges = np.diff(padded, axis=1)
+    start_r, start_c = np.nonzero(edges == 1)
+    _, end_c = np.nonzero(edges == -1)
+    return start_r, start_c, end_c
+
+
+def _links(rows: np.ndarray, starts: np.ndarray, ends: np.ndarray, width: int):
+    # runs are in raster order, so row * stride + column keys are sorted; a run
+    # touches the runs of the previous row whose column span overlaps its own
+    stride = width + 1
+    base = (rows - 1) * stride
+    first = np.searchsorted(rows * stride + ends, base + starts, side="right")
+    last = np.searchsorted(rows * stride + starts, base + ends, side="left")
+    count = np.maximum(last - first, 0)
+    total = int(count.sum())
+    cur = np.repeat(np.arange(len(rows)), count)
+    offsets = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+    return np.repeat(first, count) + offsets, cur
+
+
+def _resolve(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # union-find by hooking: every round each root of a linked pair is pointed
+    # at the smaller root, then paths are compressed; labels always decrease,
+    # so every run ends up labelled with the smallest run index of its component
+    labels = np.arange(n)
+    while True:
+        la, lb = labels[a], labels[b]
+        split = la != lb
+        if not split.any():
+            return labels
+        hi = np.maximum(la[split], lb[split])
+        lo = np.minimum(la[split], lb[split])
+        # with repeated targets the last write wins, so write the smallest last
+        order = np.argsort(-lo, kind="stable")
+        labels[hi[order]] = lo[order]
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def label_components(mask: np.ndarray) -> List[Component]:
+    """4-connected components of a 2D mask, in raster order of their first pixel."""
+    rows, starts, ends = _runs(mask)
+    if not len(rows):
+        return []
+    a, b = _links(rows, starts, ends, mask.shape[1])
+    labels = _resolve(len(rows), a, b)
+    roots, index = np.unique(labels, return_inverse=True)
+    k = len(roots)
+
+    area = np.bincount(index, weights=ends - starts, minlength=k).astype(int)
+    min_r = np.full(k, rows.max())
+    max_r = np.zeros(k, dtype=rows.dtype)
+    min_c = np.full(k, mask.shape[1])
+    max_c = np.zeros(k, dtype=ends.dtype)
+    np.minimum.at(min_r, index, rows)
+    np.maximum.at(max_r, index, rows)
+    np.minimum.at(min_c, index, starts)
+    np.maximum.at(max_c, index, ends - 1)
+    return [
+        Component(int(area[i]), int(min_r[i]), int(max_r[i]), int(min_c[i]), int(max_c[i]))
+        for i in range(k)
+    ]
@@ -1,44 +1,31 @@
-import random
 from typing import Dict, List, Union
 
 from Opus import userbot
 from Opus.core.mongo import mongodb
+from Opus.utils.placement import placement
+from Opus.utils.settings import GLOBAL, settings
+from Opus.utils.stream import position
 
-authdb = mongodb.adminauth
 authuserdb = mongodb.authuser
-autoenddb = mongodb.autoend
 assdb = mongodb.assistants
 blacklist_chatdb = mongodb.blacklistChat
 blockeddb = mongodb.blockedusers
 chatsdb = mongodb.chats
-channeldb = mongodb.cplaymode
-countdb = mongodb.upcount
 gbansdb = mongodb.gban
-langdb = mongodb.language
 onoffdb = mongodb.onoffper
-playmodedb = mongodb.playmode
-playtypedb = mongodb.playtypedb
-skipdb = mongodb.skipmode
 sudoersdb = mongodb.sudoers
 usersdb = mongodb.tgusersdb
-thumbdb = mongodb.thumb
+
+# documents per round trip when streaming large collections
+CURSOR_BATCH = 1000
 
 # Shifting to memory [mongo sucks often]
 active = []
 activevideo = []
 assistantdict = {}
-autoend = {}
-count = {}
-channelconnect = {}
-langm = {}
 loop = {}
 maintenance = []
-nonadmin = {}
 pause = {}
-playmode = {}
-playtype = {}
-skipmode = {}
-thumbmode = {}
 
 
 async def get_assistant_number(chat_id: int) -> str:
@@ -47,16 +34,7 @@ async def get_assistant_number(chat_id: int) -> str:
 
 
 async def get_client(assistant: int):
-    if int(assistant) == 1:
-        return userbot.one
-    elif int(assistant) == 2:
-        return userbot.two
-    elif int(assistant) == 3:
-        return userbot.three
-    elif int(assistant) == 4:
-        return userbot.four
-    elif int(assistant) == 5:
-        return userbot.five
+    return userbot.assistant(assistant)
 
 
 async def set_assistant_new(chat_id, number):
@@ -71,7 +49,7 @@ async def set_assistant_new(chat_id, number):
 async def set_assistant(chat_id):
     from Opus.core.userbot import assistants
 
-    ran_assistant = random.choice(assistants)
+    ran_assistant = placement.pick(assistants)
     assistantdict[chat_id] = ran_assistant
     await assdb.update_one(
         {"chat_id": chat_id},
@@ -93,7 +71,7 @@ async def get_assistant(chat_id: int) -> str:
             return userbot
         else:
             got_assis = dbassistant["assistant"]
-            if got_assis in assistants:
+            if got_assis in assistants and not _rebalance(chat_id, got_assis):
                 assistantdict[chat_id] = got_assis
                 userbot = await get_client(got_assis)
                 return userbot
@@ -101,7 +79,7 @@ async def get_assistant(chat_id: int) -> str:
                 userbot = await set_assistant(chat_id)
                 return userbot
     else:
-        if assistant in assistants:
+        if assistant in assistants and not _rebalance(chat_id, assistant):
             userbot = await get_client(assistant)
             return userbot
         else:
@@ -109,10 +87,17 @@ async def get_assistant(chat_id: int) -> str:
             return userbot
 
 
+def _rebalance(chat_id: int, assistant: int) -> bool:
+    # only idle chats move, a live call stays on the assistant that joined it
+    from Opus.core.userbot import assistants
+
+    return chat_id not in active and placement.should_move(assistant, assistants)
+
+
 async def set_calls_assistant(chat_id):
     from Opus.core.userbot import assistants
 
-    ran_assistant = random.choice(assistants)
+    ran_assistant = placement.pick(assistants)
     assistantdict[chat_id] = ran_assistant
     await assdb.update_one(
         {"chat_id": chat_id},
@@ -142,93 +127,46 @@ async def group_assistant(self, chat_id: int) -> int:
             assis = assistant
         else:
             assis = await set_calls_assistant(chat_id)
-    if int(assis) == 1:
-        return self.one
-    elif int(assis) == 2:
-        return self.two
-    elif int(assis) == 3:
-        return self.three
-    elif int(assis) == 4:
-        return self.four
-    elif int(assis) == 5:
-        return self.five
+    return self.assistant(assis)
 
 
 async def get_thumb_setting(chat_id: int):
-    if chat_id in thumbmode:
-        return thumbmode[chat_id]
-    user = await thumbdb.find_one({"chat_id": chat_id})
-    if user:
-        thumbmode[chat_id] = user.get("value", True)
-        return thumbmode[chat_id]
-    thumbmode[chat_id] = True
-    return True
+    return await settings.get(chat_id, "thumb")
 
 async def set_thumb_setting(chat_id: int, value: bool):
-    thumbmode[chat_id] = value
-    await thumbdb.update_one({"chat_id": chat_id}, {"$set": {"value": value}}, upsert=True)
+    await settings.set(chat_id, "thumb", value)
 
 
 async def is_skipmode(chat_id: int) -> bool:
-    mode = skipmode.get(chat_id)
-    if not mode:
-        user = await skipdb.find_one({"chat_id": chat_id})
-        if not user:
-            skipmode[chat_id] = True
-            return True
-        skipmode[chat_id] = False
-        return False
-    return mode
+    return await settings.get(chat_id, "skipmode")
 
 
 async def skip_on(chat_id: int):
-    skipmode[chat_id] = True
-    user = await skipdb.find_one({"chat_id": chat_id})
-    if user:
-        return await skipdb.delete_one({"chat_id": chat_id})
+    await settings.set(chat_id, "skipmode", True)
 
 
 async def skip_off(chat_id: int):
-    skipmode[chat_id] = False
-    user = await skipdb.find_one({"chat_id": chat_id})
-    if not user:
-        return await skipdb.insert_one({"chat_id": chat_id})
+    await settings.set(chat_id, "skipmode", False)
 
 
 async def get_upvote_count(chat_id: int) -> int:
-    mode = count.get(chat_id)
-    if not mode:
-        mode = await countdb.find_one({"chat_id": chat_id})
-        if not mode:
-            return 5
-        count[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return await settings.get(chat_id, "upvotes")
 
 
 async def set_upvotes(chat_id: int, mode: int):
-    count[chat_id] = mode
-    await countdb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await settings.set(chat_id, "upvotes", mode)
 
 
 async def is_autoend() -> bool:
-    chat_id = 1234
-    user = await autoenddb.find_one({"chat_id": chat_id})
-    if not user:
-        return False
-    return True
+    return await settings.get(GLOBAL, "autoend")
 
 
 async def autoend_on():
-    chat_id = 1234
-    await autoenddb.insert_one({"chat_id": chat_id})
+    await settings.set(GLOBAL, "autoend", True)
 
 
 async def autoend_off():
-    chat_id = 1234
-    await autoenddb.delete_one({"chat_id": chat_id})
+    await settings.set(GLOBAL, "autoend", False)
 
 
 async def get_loop(chat_id: int) -> int:
@@ -243,76 +181,35 @@ async def set_loop(chat_id: int, mode: int):
 
 
 async def get_cmode(chat_id: int) -> int:
-    mode = channelconnect.get(chat_id)
-    if not mode:
-        mode = await channeldb.find_one({"chat_id": chat_id})
-        if not mode:
-            return None
-        channelconnect[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return await settings.get(chat_id, "cmode")
 
 
 async def set_cmode(chat_id: int, mode: int):
-    channelconnect[chat_id] = mode
-    await channeldb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await settings.set(chat_id, "cmode", mode)
 
 
 async def get_playtype(chat_id: int) -> str:
-    mode = playtype.get(chat_id)
-    if not mode:
-        mode = await playtypedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playtype[chat_id] = "Everyone"
-            return "Everyone"
-        playtype[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return await settings.get(chat_id, "playtype")
 
 
 async def set_playtype(chat_id: int, mode: str):
-    playtype[chat_id] = mode
-    await playtypedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await settings.set(chat_id, "playtype", mode)
 
 
 async def get_playmode(chat_id: int) -> str:
-    mode = playmode.get(chat_id)
-    if not mode:
-        mode = await playmodedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playmode[chat_id] = "Direct"
-            return "Direct"
-        playmode[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return await settings.get(chat_id, "playmode")
 
 
 async def set_playmode(chat_id: int, mode: str):
-    playmode[chat_id] = mode
-    await playmodedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await settings.set(chat_id, "playmode", mode)
 
 
 async def get_lang(chat_id: int) -> str:
-    mode = langm.get(chat_id)
-    if not mode:
-        lang = await langdb.find_one({"chat_id": chat_id})
-        if not lang:
-            langm[chat_id] = "en"
-            return "en"
-        langm[chat_id] = lang["lang"]
-        return lang["lang"]
-    return mode
+    return await settings.get(chat_id, "lang")
 
 
 async def set_lang(chat_id: int, lang: str):
-    langm[chat_id] = lang
-    await langdb.update_one({"chat_id": chat_id}, {"$set": {"lang": lang}}, upsert=True)
+    await settings.set(chat_id, "lang", lang)
 
 
 async def is_music_playing(chat_id: int) -> bool:
@@ -322,12 +219,22 @@ async def is_music_playing(chat_id: int) -> bool:
     return mode
 
 
+def _clock(chat_id: int, action):
+    from Opus.misc import db
+
+    playing = db.get(chat_id)
+    if playing:
+        action(playing[0])
+
+
 async def music_on(chat_id: int):
     pause[chat_id] = True
+    _clock(chat_id, position.resume)
 
 
 async def music_off(chat_id: int):
     pause[chat_id] = False
+    _clock(chat_id, position.pause)
 
 
 async def get_active_chats() -> list:
@@ -344,11 +251,13 @@ async def is_active_chat(chat_id: int) -> bool:
 async def add_active_chat(chat_id: int):
     if chat_id not in active:
         active.append(chat_id)
+    placement.joined(assistantdict.get(chat_id), chat_id)
 
 
 async def remove_active_chat(chat_id: int):
     if chat_id in active:
         active.remove(chat_id)
+    placement.left(chat_id)
 
 
 async def get_active_video_chats() -> list:
@@ -373,38 +282,19 @@ async def remove_active_video_chat(chat_id: int):
 
 
 async def check_nonadmin_chat(chat_id: int) -> bool:
-    user = await authdb.find_one({"chat_id": chat_id})
-    if not user:
-        return False
-    return True
+    return await settings.get(chat_id, "nonadmin")
 
 
 async def is_nonadmin_chat(chat_id: int) -> bool:
-    mode = nonadmin.get(chat_id)
-    if not mode:
-        user = await authdb.find_one({"chat_id": chat_id})
-        if not user:
-            nonadmin[chat_id] = False
-            return False
-        nonadmin[chat_id] = True
-        return True
-    return mode
+    return await settings.get(chat_id, "nonadmin")
 
 
 async def add_nonadmin_chat(chat_id: int):
-    nonadmin[chat_id] = True
-    is_admin = await check_nonadmin_chat(chat_id)
-    if is_admin:
-        return
-    return await authdb.insert_one({"chat_id": chat_id})
+    await settings.set(chat_id, "nonadmin", True)
 
 
 async def remove_nonadmin_chat(chat_id: int):
-    nonadmin[chat_id] = False
-    is_admin = await check_nonadmin_chat(chat_id)
-    if not is_admin:
-        return
-    return await authdb.delete_one({"chat_id": chat_id})
+    await settings.set(chat_id, "nonadmin", False)
 
 
 async def is_on_off(on_off: int) -> bool:
@@ -471,11 +361,8 @@ async def is_served_user(user_id: int) -> bool:
     return True
 
 
-async def get_served_users() -> list:
-    users_list = []
-    async for user in usersdb.find({"user_id": {"$gt": 0}}):
-        users_list.append(user)
-    return users_list
+async def served_users_count() -> int:
+    return await served_count("users")
 
 
 async def add_served_user(user_id: int):
@@ -485,11 +372,12 @@ async def add_served_user(user_id: int):
     return await usersdb.insert_one({"user_id": user_id})
 
 
-async def get_served_chats() -> list:
-    chats_list = []
-    async for chat in chatsdb.find({"chat_id": {"$lt": 0}}):
-        chats_list.append(chat)
-    return chats_list
+async def remove_served_user(user_id: int):
+    return await usersdb.delete_one({"user_id": user_id})
+
+
+async def served_chats_count() -> int:
+    return await served_count("chats")
 
 
 async def is_served_chat(chat_id: int) -> bool:
@@ -506,6 +394,35 @@ async def add_served_chat(chat_id: int):
     return await chatsdb.insert_one({"chat_id": chat_id})
 
 
+async def remove_served_chat(chat_id: int):
+    return await chatsdb.delete_one({"chat_id": chat_id})
+
+
+SERVED = {
+    "chats": (chatsdb, "chat_id", {"chat_id": {"$lt": 0}}),
+    "users": (usersdb, "user_id", {"user_id": {"$gt": 0}}),
+}
+
+
+async def served_count(kind: str) -> int:
+    collection, _, query = SERVED[kind]
+    return await collection.count_documents(query)
+
+
+async def served_batch(kind: str, after=None, limit: int = CURSOR_BATCH) -> list:
+    # keyset page in _id order, so a saved _id resumes exactly where it stopped
+    collection, field, query = SERVED[kind]
+    if after is not None:
+        query = {**query, "_id": {"$gt": after}}
+    cursor = collection.find(query, {field: 1}).sort("_id", 1).limit(limit)
+    return [(doc["_id"], int(doc[field])) async for doc in cursor]
+
+
+async def remove_served(kind: str, target: int):
+    collection, field, _ = SERVED[kind]
+    return await collection.delete_one({field: target})
+
+
 async def blacklisted_chats() -> list:
     chats_list = []
     async for chat in blacklist_chatdb.find({"chat_id": {"$lt": 0}}):
@@ -637,9 +554,7 @@ async def get_banned_users() -> list:
 
 
 async def get_banned_count() -> int:
-    users = blockeddb.find({"user_id": {"$gt": 0}})
-    users = await users.to_list(length=100000)
-    return len(users)
+    return await blockeddb.count_documents({"user_id": {"$gt": 0}})
 
 
 async def is_banned_user(user_id: int) -> bool:
@@ -12,12 +12,8 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from pyrogram import Client, filters
 from Opus import YouTube, app
 from Opus.misc import SUDOERS
+from Opus.utils.database import get_assistant, get_lang
 from Opus.utils.ndatabase import (
-    get_assistant,
-    get_cmode,
-    get_lang,
-    get_playmode,
-    get_playtype,
     is_active_chat,
     is_maintenance,
 )
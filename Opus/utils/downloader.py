@@ -1,12 +1,17 @@
 import asyncio
 import os
 import re
+import shutil
 from typing import Optional, Dict, Union, List
 
 import aiofiles
 import httpx
 from yt_dlp import YoutubeDL
-from config import API_URL
+from config import API_URL, PREFETCH_BANDWIDTH
+from Opus.core.http import USER_AGENT, http_client
+from Opus.utils.mediacache import media_cache
+from Opus.utils.ratelimit import TokenBucket
+from Opus.utils.singleflight import SingleFlight
 
 cookies_file = "Opus/assets/cookies.txt"
 download_folder = "downloads"
@@ -16,6 +21,15 @@ API_DOWNLOAD_MAX_RETRIES = 1
 CHUNK_SIZE = 4 * 1024 * 1024
 API_TIMEOUT_SECONDS = 120
 
+downloads_inflight = SingleFlight()
+# /play and /song both fetch into downloads/{vid}.<ext>, one api transfer per file
+api_inflight = SingleFlight()
+
+# transfers started by the prefetcher share a bandwidth budget until a
+# foreground request joins them
+background_bandwidth = TokenBucket(PREFETCH_BANDWIDTH, PREFETCH_BANDWIDTH * 2)
+_background = set()
+
 
 def extract_video_id(link: str) -> str:
     if "v=" in link:
@@ -41,17 +55,7 @@ def file_exists(video_id: str, file_type: str = "audio") -> Optional[str]:
         exts = ["mp3", "m4a", "opus", "webm", "mp4", "mkv"]
     else:
         exts = ["mp4", "mkv", "webm"]
-    for ext in exts:
-        path = f"{download_folder}/{video_id}.{ext}"
-        if os.path.exists(path) and os.path.getsize(path) > 0:
-            return path
-    for file in os.listdir(download_folder):
-        for ext in exts:
-            if file.endswith(f".{ext}") and file.startswith(video_id):
-                full = f"{download_folder}/{file}"
-                if os.path.getsize(full) > 0:
-                    return full
-    return None
+    return media_cache.lookup(video_id, exts)
 
 
 def _ext_from_filename(fn: str, default: str) -> str:
@@ -71,70 +75,20 @@ async def api_download(link: str, file_type: str = "audio", audio_format: str =
         video_id = extract_video_id(link)
 
     base_headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/129.0.0.0 Safari/537.36"
-        ),
+        "User-Agent": USER_AGENT,
         "Accept": "application/json",
     }
     file_headers = {
-        "User-Agent": base_headers["User-Agent"],
+        "User-Agent": USER_AGENT,
         "Accept": "*/*",
     }
     timeout = httpx.Timeout(API_TIMEOUT_SECONDS)
 
     try:
-        async with httpx.AsyncClient(
-            timeout=timeout,
-            follow_redirects=True,
-            headers=base_headers,
-        ) as client:
-            if file_type == "audio":
-                fmt = (audio_format or "m4a").lower()
-                api_url = f"{API_URL}?url={link}&format={fmt}"
-                resp = await client.get(api_url)
-                if resp.status_code != 200:
-                    return None
-                ct = resp.headers.get("content-type", "")
-                if "application/json" not in ct:
-                    return None
-                data = resp.json() if resp.content else {}
-                if data.get("status") != "tunnel":
-                    return None
-                download_url = data.get("url")
-                if not download_url:
-                    return None
-                filename = data.get("filename") or ""
-                ext = _ext_from_filename(filename, fmt)
-                path = f"{download_folder}/{video_id}.{ext}"
-
-                for _ in range(API_DOWNLOAD_MAX_RETRIES):
-                    if os.path.exists(path):
-                        os.remove(path)
-                    try:
-                        async with client.stream("GET", download_url, headers=file_headers) as r:
-                            if r.status_code != 200:
-                                continue
-                            async with aiofiles.open(path, "wb") as f:
-                                async for chunk in r.aiter_bytes(CHUNK_SIZE):
-                                    if not chunk:
-                                        break
-                                    await f.write(chunk)
-                    except Exception:
-                        continue
-
-                    if not os.path.exists(path):
-                        continue
-                    if os.path.getsize(path) < 1024 * 100:
-                        os.remove(path)
-                        continue
-                    return path
-
-                return None
-
-            api_url = f"{API_URL}?url={link}&format=mp4"
-            resp = await client.get(api_url)
+        if file_type == "audio":
+            fmt = (audio_format or "m4a").lower()
+            api_url = f"{API_URL}?url={link}&format={fmt}"
+            resp = await http_client.get(api_url, headers=base_headers, timeout=timeout)
             if resp.status_code != 200:
                 return None
             ct = resp.headers.get("content-type", "")
@@ -147,37 +101,111 @@ async def api_download(link: str, file_type: str = "audio", audio_format: str =
             if not download_url:
                 return None
             filename = data.get("filename") or ""
-            ext = _ext_from_filename(filename, "mp4")
+            ext = _ext_from_filename(filename, fmt)
             path = f"{download_folder}/{video_id}.{ext}"
 
+            temp = media_cache.temp_path(path)
             for _ in range(API_DOWNLOAD_MAX_RETRIES):
-                if os.path.exists(path):
-                    os.remove(path)
                 try:
-                    async with client.stream("GET", download_url, headers=file_headers) as r:
+                    async with http_client.stream("GET", download_url, headers=file_headers, timeout=timeout) as r:
                         if r.status_code != 200:
                             continue
-                        async with aiofiles.open(path, "wb") as f:
+                        async with aiofiles.open(temp, "wb") as f:
                             async for chunk in r.aiter_bytes(CHUNK_SIZE):
                                 if not chunk:
                                     break
+                                if (video_id, file_type) in _background:
+                                    await background_bandwidth.acquire(len(chunk))
                                 await f.write(chunk)
                 except Exception:
                     continue
 
-                if not os.path.exists(path):
+                if not os.path.exists(temp):
                     continue
-                if os.path.getsize(path) < 1024 * 100:
-                    os.remove(path)
+                if os.path.getsize(temp) < 1024 * 100:
+                    os.remove(temp)
                     continue
-                return path
+                return media_cache.commit(temp, path)
+
+            return None
 
+        api_url = f"{API_URL}?url={link}&format=mp4"
+        resp = await http_client.get(api_url, headers=base_headers, timeout=timeout)
+        if resp.status_code != 200:
+            return None
+        ct = resp.headers.get("content-type", "")
+        if "application/json" not in ct:
+            return None
+        data = resp.json() if resp.content else {}
+        if data.get("status") != "tunnel":
+            return None
+        download_url = data.get("url")
+        if not download_url:
             return None
+        filename = data.get("filename") or ""
+        ext = _ext_from_filename(filename, "mp4")
+        path = f"{download_folder}/{video_id}.{ext}"
+
+        temp = media_cache.temp_path(path)
+        for _ in range(API_DOWNLOAD_MAX_RETRIES):
+            try:
+                async with http_client.stream("GET", download_url, headers=file_headers, timeout=timeout) as r:
+                    if r.status_code != 200:
+                        continue
+                    async with aiofiles.open(temp, "wb") as f:
+                        async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                            if not chunk:
+                                break
+                            if (video_id, file_type) in _background:
+                                await background_bandwidth.acquire(len(chunk))
+                            await f.write(chunk)
+            except Exception:
+                continue
+
+            if not os.path.exists(temp):
+                continue
+            if os.path.getsize(temp) < 1024 * 100:
+                os.remove(temp)
+                continue
+            return media_cache.commit(temp, path)
+
+        return None
 
     except Exception:
         return None
 
 
+async def api_fetch(link: str, file_type: str = "audio", audio_format: str = "m4a") -> Optional[str]:
+    fmt = (audio_format or "m4a").lower() if file_type == "audio" else "mp4"
+    return await api_inflight.do(
+        (extract_video_id(link), file_type, fmt),
+        lambda: asyncio.wait_for(
+            api_download(link, file_type=file_type, audio_format=fmt),
+            timeout=API_TIMEOUT_SECONDS,
+        ),
+    )
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+async def _song_copy(cached: str, final_path: str) -> str:
+    # the cached file may be streaming in a call, the song gets its own name
+    if cached == final_path:
+        return cached
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, _link_or_copy, cached, final_path)
+        return media_cache.add(final_path) or final_path
+    except Exception:
+        return cached
+
+
 def _download_ytdlp(link: str, opts: Dict) -> Union[None, str, List[str]]:
     try:
         with YoutubeDL(opts) as ydl:
@@ -249,19 +277,47 @@ async def yt_dlp_download(link: str, type: str, format_id: str = None, outtmpl:
         if is_restricted():
             opts["cookiefile"] = cookies_file
 
-    return await loop.run_in_executor(None, _download_ytdlp, link, opts)
+    result = await loop.run_in_executor(None, _download_ytdlp, link, opts)
+    if isinstance(result, list):
+        return [p for p in (media_cache.add(p) for p in result) if p]
+    if result:
+        return media_cache.add(result)
+    return result
 
 
-async def download_audio(link: str) -> Optional[str]:
+async def _track(key, background: bool, factory):
+    slot = key[:2]
+    if not background:
+        _background.discard(slot)
+    elif not downloads_inflight.running(key):
+        _background.add(slot)
+
+    async def run():
+        try:
+            return await factory()
+        finally:
+            _background.discard(slot)
+
+    return await downloads_inflight.do(key, run)
+
+
+async def download_audio(link: str, background: bool = False) -> Optional[str]:
+    vid = extract_video_id(link)
+    existing = file_exists(vid, "audio")
+    if existing:
+        return existing
+    return await _track(
+        (vid, "audio", "m4a"), background, lambda: _download_audio(link)
+    )
+
+
+async def _download_audio(link: str) -> Optional[str]:
     vid = extract_video_id(link)
     existing = file_exists(vid, "audio")
     if existing:
         return existing
     try:
-        api_result = await asyncio.wait_for(
-            api_download(link, file_type="audio", audio_format="m4a"),
-            timeout=API_TIMEOUT_SECONDS,
-        )
+        api_result = await api_fetch(link, file_type="audio", audio_format="m4a")
         if api_result and os.path.exists(api_result) and os.path.getsize(api_result) > 0:
             return api_result
     except Exception:
@@ -278,16 +334,23 @@ async def download_audio(link: str) -> Optional[str]:
         return None
 
 
-async def download_video(link: str, quality: int = 360) -> Optional[str]:
+async def download_video(link: str, quality: int = 360, background: bool = False) -> Optional[str]:
+    vid = extract_video_id(link)
+    existing = file_exists(vid, "video")
+    if existing:
+        return existing
+    return await _track(
+        (vid, "video", "mp4"), background, lambda: _download_video(link, quality)
+    )
+
+
+async def _download_video(link: str, quality: int = 360) -> Optional[str]:
     vid = extract_video_id(link)
     existing = file_exists(vid, "video")
     if existing:
         return existing
     try:
-        api_result = await asyncio.wait_for(
-            api_download(link, file_type="video"),
-            timeout=API_TIMEOUT_SECONDS,
-        )
+        api_result = await api_fetch(link, file_type="video")
         if api_result and os.path.exists(api_result) and os.path.getsize(api_result) > 0:
             return api_result
     except Exception:
@@ -305,25 +368,23 @@ async def download_video(link: str, quality: int = 360) -> Optional[str]:
 
 
 async def download_song_audio(link: str, format_id: Optional[str], title: str) -> Optional[str]:
+    return await downloads_inflight.do(
+        (extract_video_id(link), "song_audio", format_id or ""),
+        lambda: _download_song_audio(link, format_id, title),
+    )
+
+
+async def _download_song_audio(link: str, format_id: Optional[str], title: str) -> Optional[str]:
     safe_title = safe_filename(title or "audio")
     out_path_base = f"{download_folder}/{safe_title}.mp3"
     if os.path.exists(out_path_base) and os.path.getsize(out_path_base) > 0:
         return out_path_base
 
     try:
-        api_result = await asyncio.wait_for(
-            api_download(link, file_type="audio", audio_format="m4a"),
-            timeout=API_TIMEOUT_SECONDS,
-        )
+        api_result = await api_fetch(link, file_type="audio", audio_format="m4a")
         if api_result and os.path.exists(api_result) and os.path.getsize(api_result) > 0:
             ext = os.path.splitext(api_result)[1] or ".mp3"
-            final_path = f"{download_folder}/{safe_title}{ext}"
-            if api_result != final_path:
-                try:
-                    os.replace(api_result, final_path)
-                except Exception:
-                    final_path = api_result
-            return final_path
+            return await _song_copy(api_result, f"{download_folder}/{safe_title}{ext}")
     except Exception:
         pass
 
@@ -341,25 +402,23 @@ async def download_song_audio(link: str, format_id: Optional[str], title: str) -
 
 
 async def download_song_video(link: str, format_id: Optional[str], title: str) -> Optional[str]:
+    return await downloads_inflight.do(
+        (extract_video_id(link), "song_video", format_id or ""),
+        lambda: _download_song_video(link, format_id, title),
+    )
+
+
+async def _download_song_video(link: str, format_id: Optional[str], title: str) -> Optional[str]:
     safe_title = safe_filename(title or "video")
     out_path_base = f"{download_folder}/{safe_title}.mp4"
     if os.path.exists(out_path_base) and os.path.getsize(out_path_base) > 0:
         return out_path_base
 
     try:
-        api_result = await asyncio.wait_for(
-            api_download(link, file_type="video"),
-            timeout=API_TIMEOUT_SECONDS,
-        )
+        api_result = await api_fetch(link, file_type="video")
         if api_result and os.path.exists(api_result) and os.path.getsize(api_result) > 0:
             ext = os.path.splitext(api_result)[1] or ".mp4"
-            final_path = f"{download_folder}/{safe_title}{ext}"
-            if api_result != final_path:
-                try:
-                    os.replace(api_result, final_path)
-                except Exception:
-                    final_path = api_result
-            return final_path
+            return await _song_copy(api_result, f"{download_folder}/{safe_title}{ext}")
     except Exception:
         pass
 
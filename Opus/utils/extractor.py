@@ -0,0 +1,187 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from yt_dlp import YoutubeDL
+
+import config
+from Opus.logging import LOGGER
+
+COOKIE_PATH = "Opus/assets/cookies.txt"
+
+PROFILES = {
+    "info": {"skip_download": True},
+    "flat": {"skip_download": True, "extract_flat": "in_playlist", "ignoreerrors": True},
+    "soundcloud": {
+        "outtmpl": "downloads/%(id)s.%(ext)s",
+        "format": "best",
+        "retries": 3,
+        "nooverwrites": False,
+        "continuedl": True,
+    },
+}
+
+# per worker process: warm YoutubeDL instances, one per profile
+_ydls: Dict[str, YoutubeDL] = {}
+_cookiefile: Optional[str] = None
+
+
+def cookiefile_path() -> Optional[str]:
+    try:
+        if os.path.exists(COOKIE_PATH) and os.path.getsize(COOKIE_PATH) > 0:
+            return COOKIE_PATH
+    except Exception:
+        pass
+    return None
+
+
+def _init_worker(cookiefile: Optional[str]):
+    global _cookiefile
+    _cookiefile = cookiefile
+    for profile in PROFILES:
+        _ydl(profile)
+
+
+def _ydl(profile: str) -> YoutubeDL:
+    ydl = _ydls.get(profile)
+    if ydl is None:
+        opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "geo_bypass": True,
+            "socket_timeout": 20,
+            **PROFILES[profile],
+        }
+        if _cookiefile:
+            opts["cookiefile"] = _cookiefile
+        ydl = _ydls[profile] = YoutubeDL(opts)
+    return ydl
+
+
+def _extract(profile: str, url: str, params: Optional[Dict] = None, download: bool = False) -> Dict:
+    ydl = _ydl(profile)
+    saved = {k: ydl.params.get(k) for k in (params or {})}
+    ydl.params.update(params or {})
+    try:
+        return ydl.extract_info(url, download=download) or {}
+    finally:
+        ydl.params.update(saved)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _info(url: str) -> Dict:
+    info = _extract("info", url)
+    keys = ("id", "title", "duration", "thumbnail", "thumbnails", "webpage_url", "channel", "is_live")
+    out = {k: info.get(k) for k in keys if k in info}
+    if out.get("thumbnails"):
+        out["thumbnails"] = [{"url": out["thumbnails"][0].get("url", "")}]
+    return out
+
+
+def _stream_url(url: str, fmt: str) -> Optional[str]:
+    info = _extract("info", url, {"format": fmt})
+    if info.get("url"):
+        return info["url"]
+    for f in info.get("requested_formats") or []:
+        if f.get("url"):
+            return f["url"]
+    return None
+
+
+def _playlist(url: str, limit: int) -> List[str]:
+    info = _extract("flat", url, {"playlistend": limit})
+    return [e["id"] for e in (info.get("entries") or []) if e and e.get("id")]
+
+
+def _formats(url: str) -> List[Dict]:
+    info = _extract("info", url)
+    out: List[Dict] = []
+    for fmt in info.get("formats", []):
+        if "dash" in str(fmt.get("format", "")).lower():
+            continue
+        if not any(k in fmt for k in ("filesize", "filesize_approx")):
+            continue
+        if not all(k in fmt for k in ("format", "format_id", "ext", "format_note")):
+            continue
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size:
+            continue
+        out.append(
+            {
+                "format": fmt["format"],
+                "filesize": size,
+                "format_id": fmt["format_id"],
+                "ext": fmt["ext"],
+                "format_note": fmt["format_note"],
+                "yturl": url,
+            }
+        )
+    return out
+
+
+def _soundcloud(url: str) -> Dict:
+    info = _extract("soundcloud", url, download=True)
+    keys = ("id", "ext", "title", "duration", "uploader")
+    return {k: info.get(k) for k in keys}
+
+
+class ExtractorPool:
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _ensure(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # fork so workers inherit the already imported modules instead of
+            # re-running the package init
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+                initargs=(cookiefile_path(),),
+            )
+        return self._pool
+
+    async def start(self):
+        await asyncio.gather(*(self._run(_ping) for _ in range(self.workers)))
+        LOGGER(__name__).info(f"Exᴛʀᴀᴄᴛᴏʀ ᴘᴏᴏʟ ᴡᴀʀᴍᴇᴅ ᴜᴘ ᴡɪᴛʜ {self.workers} ᴡᴏʀᴋᴇʀs.")
+
+    async def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, fn, *args, timeout: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._ensure(), fn, *args)
+        try:
+            # on timeout or cancellation a call that has not started yet is dropped,
+            # a running one is bounded by yt-dlp's socket timeout
+            return await asyncio.wait_for(future, timeout or config.EXTRACTOR_TIMEOUT)
+        except BrokenProcessPool:
+            self._pool = None
+            raise
+
+    async def info(self, url: str, timeout: Optional[float] = None) -> Dict:
+        return await self._run(_info, url, timeout=timeout)
+
+    async def stream_url(self, url: str, fmt: str, timeout: Optional[float] = None) -> Optional[str]:
+        return await self._run(_stream_url, url, fmt, timeout=timeout)
+
+    async def playlist(self, url: str, limit: int, timeout: Optional[float] = None) -> List[str]:
+        return await self._run(_playlist, url, limit, timeout=timeout)
+
+    async def formats(self, url: str, timeout: Optional[float] = None) -> List[Dict]:
+        return await self._run(_formats, url, timeout=timeout)
+
+    async def soundcloud(self, url: str, timeout: Optional[float] = None) -> Dict:
+        return await self._run(_soundcloud, url, timeout=timeout or config.EXTRACTOR_TIMEOUT * 5)
+
+
+extractor = ExtractorPool(config.EXTRACTOR_WORKERS)
@@ -0,0 +1,354 @@
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from pyrogram.errors import (
+    ChannelInvalid,
+    ChannelPrivate,
+    ChatIdInvalid,
+    FloodWait,
+    InputUserDeactivated,
+    MessageNotModified,
+    UserDeactivated,
+    UserIsBlocked,
+)
+
+import config
+from Opus.core.mongo import mongodb
+from Opus.logging import LOGGER
+from Opus.utils.database import remove_served, served_batch, served_count
+from Opus.utils.formatters import get_readable_time
+from Opus.utils.ratelimit import AdaptiveRate
+from strings import get_string, languages
+
+jobsdb = mongodb.jobs
+
+# the peer is gone for good, so it is dropped from the served collections;
+# PeerIdInvalid is left out on purpose, a fresh session raises it for everyone
+CHAT_GONE = (ChannelInvalid, ChannelPrivate, ChatIdInvalid)
+GONE = CHAT_GONE + (InputUserDeactivated, UserDeactivated, UserIsBlocked)
+
+MAX_ATTEMPTS = 3
+# targets per checkpoint, a restart repeats at most one batch
+BATCH = 200
+
+
+class JobKind(NamedTuple):
+    # deliver(client, target, source, params) -> optional extra counter to bump
+    deliver: Callable[..., Awaitable[Optional[str]]]
+    title: str
+    # footer(job, _) -> extra status lines
+    footer: Optional[Callable] = None
+    # finish(job) once every target was handled
+    finish: Optional[Callable[..., Awaitable]] = None
+    prune: bool = True
+    # errors that mean the target peer is gone, counted as pruned
+    gone: tuple = GONE
+    # errors about the job itself rather than one target, they stop the run
+    abort: tuple = ()
+    # calls/s for kinds that are not sending messages, they get their own limiter
+    rate: float = 0
+
+
+class Job:
+    def __init__(self, doc: dict):
+        self.id: str = doc["_id"]
+        self.kind: str = doc["kind"]
+        self.params: dict = doc.get("params", {})
+        self.sources: List[str] = doc.get("sources", [])
+        self.stage: int = doc.get("stage", 0)
+        self.cursor = doc.get("cursor")
+        self.counts: Dict[str, int] = doc.get("counts", {})
+        # counts as of the saved cursor, so a half done batch is not counted twice
+        self.committed: Dict[str, int] = dict(self.counts)
+        self.assistants: Dict[str, Dict[str, int]] = doc.get("assistants", {})
+        self.total: int = doc.get("total", 0)
+        self.status: Optional[List[int]] = doc.get("status")
+        self.lang: str = doc.get("lang", "en")
+        self.state: str = doc.get("state", "running")
+        self.cancelled = False
+        self.task: Optional[asyncio.Task] = None
+        # rate and eta only count the work done by this process
+        self.resumed_at = time.monotonic()
+        self.resumed_from = self.processed
+
+    @property
+    def processed(self) -> int:
+        return self.counts.get("done", 0) + self.counts.get("failed", 0) + self.counts.get("pruned", 0)
+
+    def bump(self, counter: str, amount: int = 1):
+        self.counts[counter] = self.counts.get(counter, 0) + amount
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.resumed_at
+        return (self.processed - self.resumed_from) / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[int]:
+        rate = self.rate()
+        left = max(0, self.total - self.processed)
+        return int(left / rate) if rate > 0 else None
+
+    def checkpoint(self) -> dict:
+        return {
+            "stage": self.stage,
+            "cursor": self.cursor,
+            "counts": self.committed,
+            "assistants": self.assistants,
+            "state": self.state,
+            "updated": time.time(),
+        }
+
+
+class JobRunner:
+    def __init__(self):
+        self.kinds: Dict[str, JobKind] = {}
+        self.jobs: Dict[str, Job] = {}
+        # shared by every job so parallel jobs never add up past telegram's limits
+        self._limiters: Dict[object, AdaptiveRate] = {}
+
+    def register(self, kind: str, spec: JobKind):
+        self.kinds[kind] = spec
+
+    def limiter(self, assistant: int = 0, kind: Optional[str] = None) -> AdaptiveRate:
+        key = kind or assistant
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            if kind:
+                rate = self.kinds[kind].rate
+            else:
+                rate = config.ASSISTANT_JOB_RATE if assistant else config.JOB_RATE
+            limiter = self._limiters[key] = AdaptiveRate(rate)
+        return limiter
+
+    async def start(
+        self,
+        kind: str,
+        sources: List[str],
+        params: dict,
+        status,
+        lang: str = "en",
+        assistants: List[int] = (),
+    ) -> Job:
+        total = 0
+        for source in sources:
+            total += await served_count(source)
+        doc = {
+            "_id": uuid.uuid4().hex[:8],
+            "kind": kind,
+            "params": params,
+            "sources": sources,
+            "assistants": {str(num): {"offset": 0, "done": 0} for num in assistants},
+            "total": total,
+            "status": [status.chat.id, status.id] if status else None,
+            "lang": lang,
+            "state": "running",
+            "created": time.time(),
+        }
+        await jobsdb.insert_one(doc)
+        job = Job(doc)
+        self._spawn(job)
+        return job
+
+    async def resume(self):
+        async for doc in jobsdb.find({"state": "running"}):
+            if doc["_id"] in self.jobs:
+                continue
+            if doc.get("kind") not in self.kinds:
+                LOGGER(__name__).warning(f"Sᴋɪᴘᴘɪɴɢ ᴊᴏʙ {doc['_id']} ᴏғ ᴜɴᴋɴᴏᴡɴ ᴋɪɴᴅ {doc.get('kind')}.")
+                continue
+            job = Job(doc)
+            self._spawn(job)
+            LOGGER(__name__).info(f"Rᴇsᴜᴍᴇᴅ {job.kind} ᴊᴏʙ {job.id} ᴀᴛ {job.processed}/{job.total}.")
+
+    async def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancelled = True
+        return True
+
+    async def stop(self):
+        # checkpoints stay "running", so the next start picks them up again
+        for job in list(self.jobs.values()):
+            if job.task:
+                job.task.cancel()
+        for job in list(self.jobs.values()):
+            await self._checkpoint(job)
+
+    def running(self, kind: Optional[str] = None) -> List[Job]:
+        return [job for job in self.jobs.values() if kind is None or job.kind == kind]
+
+    def _spawn(self, job: Job):
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _checkpoint(self, job: Job):
+        try:
+            await jobsdb.update_one({"_id": job.id}, {"$set": job.checkpoint()})
+        except Exception as e:
+            LOGGER(__name__).warning(f"Jᴏʙ {job.id} ᴄʜᴇᴄᴋᴘᴏɪɴᴛ ғᴀɪʟᴇᴅ: {e}")
+
+    async def _run(self, job: Job):
+        spec = self.kinds[job.kind]
+        reporter = asyncio.create_task(self._report(job))
+        try:
+            await asyncio.gather(
+                self._sources(job, spec),
+                *(self._assistant(job, spec, int(num)) for num in job.assistants),
+            )
+            job.state = "cancelled" if job.cancelled else "done"
+            if job.state == "done" and spec.finish:
+                await spec.finish(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.state = "failed"
+            LOGGER(__name__).error(f"Jᴏʙ {job.id} ғᴀɪʟᴇᴅ: {e}")
+        finally:
+            reporter.cancel()
+            if job.state != "running":
+                self.jobs.pop(job.id, None)
+                job.committed = dict(job.counts)
+                await self._checkpoint(job)
+                await self._edit(job)
+
+    async def _sources(self, job: Job, spec: JobKind):
+        limiter = self.limiter(kind=job.kind if spec.rate else None)
+        while job.stage < len(job.sources) and not job.cancelled:
+            source = job.sources[job.stage]
+            batch = await served_batch(source, job.cursor, BATCH)
+            if not batch:
+                job.stage += 1
+                job.cursor = None
+                job.committed = dict(job.counts)
+                await self._checkpoint(job)
+                continue
+            targets = iter(batch)
+
+            async def worker():
+                for _, target in targets:
+                    if job.cancelled:
+                        return
+                    await self._deliver(job, spec, limiter, self._bot(), target, source)
+
+            await asyncio.gather(*(worker() for _ in range(max(1, config.JOB_CONCURRENCY))))
+            if job.cancelled:
+                return
+            job.cursor = batch[-1][0]
+            job.committed = dict(job.counts)
+            await self._checkpoint(job)
+
+    async def _assistant(self, job: Job, spec: JobKind, num: int):
+        from Opus.utils.database import get_client
+
+        state = job.assistants[str(num)]
+        client = await get_client(num)
+        limiter = self.limiter(num)
+        index = 0
+        # dialogs have no stable cursor, so resuming skips the ones already handled
+        async for dialog in client.get_dialogs():
+            if job.cancelled:
+                return
+            index += 1
+            if index <= state["offset"]:
+                continue
+            if await self._deliver(job, spec, limiter, client, dialog.chat.id, "assistant", count=False):
+                state["done"] += 1
+            state["offset"] = index
+            if index % 50 == 0:
+                await self._checkpoint(job)
+
+    def _bot(self):
+        from Opus import app
+
+        return app
+
+    async def _deliver(self, job: Job, spec: JobKind, limiter: AdaptiveRate, client, target, source, count=True) -> bool:
+        for _ in range(MAX_ATTEMPTS):
+            await limiter.acquire()
+            try:
+                extra = await spec.deliver(client, target, source, job.params)
+            except FloodWait as fw:
+                limiter.backoff(int(fw.value))
+                continue
+            except spec.abort as e:
+                if count:
+                    job.bump(f"err_{type(e).__name__}")
+                # every other target would fail the same way
+                job.cancelled = True
+                raise
+            except spec.gone:
+                if count:
+                    job.bump("pruned")
+                    if spec.prune and source != "assistant":
+                        try:
+                            await remove_served(source, target)
+                        except Exception:
+                            pass
+                return False
+            except Exception as e:
+                if count:
+                    job.bump("failed")
+                    # per reason tallies, e.g. how many chats lack ban rights
+                    job.bump(f"err_{type(e).__name__}")
+                return False
+            limiter.recover()
+            if count:
+                job.bump("done")
+            if extra:
+                job.bump(extra)
+            return True
+        if count:
+            job.bump("failed")
+            job.bump("err_FloodWait")
+        return False
+
+    def render(self, job: Job, _) -> str:
+        spec = self.kinds[job.kind]
+        eta = job.eta()
+        text = _["job_1"].format(
+            _[spec.title],
+            job.id,
+            job.processed,
+            job.total,
+            job.counts.get("done", 0),
+            job.counts.get("failed", 0),
+            job.counts.get("pruned", 0),
+            f"{job.rate():.1f}",
+            get_readable_time(eta) if eta else "-",
+        )
+        errors = sorted(
+            ((k[4:], v) for k, v in job.counts.items() if k.startswith("err_")),
+            key=lambda kv: kv[1],
+            reverse=True,
+        )
+        for name, n in errors[:5]:
+            text += _["job_6"].format(name, n)
+        if spec.footer:
+            text += spec.footer(job, _)
+        if job.state != "running":
+            text += "\n\n" + _[f"job_state_{job.state}"]
+        return text
+
+    async def _edit(self, job: Job):
+        if not job.status:
+            return
+        from Opus import app
+
+        try:
+            await app.edit_message_text(job.status[0], job.status[1], self.render(job, get_string(job.lang if job.lang in languages else "en")))
+        except MessageNotModified:
+            pass
+        except FloodWait as fw:
+            await asyncio.sleep(int(fw.value))
+        except Exception:
+            pass
+
+    async def _report(self, job: Job):
+        while True:
+            await asyncio.sleep(config.JOB_STATUS_INTERVAL)
+            await self._edit(job)
+
+
+jobs = JobRunner()
@@ -0,0 +1,175 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import config
+from Opus.logging import LOGGER
+
+TEMP_SUFFIX = ".part"
+STALE_SUFFIXES = (TEMP_SUFFIX, ".ytdl", ".temp")
+
+
+class MediaCache:
+    def __init__(self, folder: str, max_bytes: int):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.total = 0
+        self.loaded = False
+        # file name -> [size, last access], oldest access first
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        # file stem (video id / title) -> {ext: file name}
+        self._stems: Dict[str, Dict[str, str]] = {}
+
+    def rebuild(self):
+        os.makedirs(self.folder, exist_ok=True)
+        self._entries.clear()
+        self._stems.clear()
+        self.total = 0
+        found = []
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(STALE_SUFFIXES) or ".part-Frag" in entry.name:
+                    # left behind by a download that never finished
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                st = entry.stat()
+                if st.st_size == 0:
+                    continue
+                found.append((max(st.st_atime, st.st_mtime), entry.name, st.st_size))
+        for atime, name, size in sorted(found):
+            self._index(name, size, atime)
+        self.loaded = True
+        self.evict()
+        LOGGER(__name__).info(
+            f"Media cache indexed {len(self._entries)} files ({self.total // (1024 * 1024)} MB)."
+        )
+
+    def _ensure(self):
+        if not self.loaded:
+            self.rebuild()
+
+    def _name(self, path: str) -> Optional[str]:
+        if os.path.dirname(os.path.realpath(path)) != os.path.realpath(self.folder):
+            return None
+        return os.path.basename(path)
+
+    def _index(self, name: str, size: int, atime: float):
+        old = self._entries.pop(name, None)
+        if old:
+            self.total -= old[0]
+        self._entries[name] = [size, atime]
+        self.total += size
+        stem, _, ext = name.rpartition(".")
+        self._stems.setdefault(stem or ext, {})[ext] = name
+
+    def _drop(self, name: str):
+        old = self._entries.pop(name, None)
+        if old:
+            self.total -= old[0]
+        stem, _, ext = name.rpartition(".")
+        exts = self._stems.get(stem or ext)
+        if exts:
+            exts.pop(ext, None)
+            if not exts:
+                self._stems.pop(stem or ext, None)
+
+    def path(self, name: str) -> str:
+        return f"{self.folder}/{name}"
+
+    def temp_path(self, path: str) -> str:
+        return path + TEMP_SUFFIX
+
+    def contains(self, path: str) -> bool:
+        self._ensure()
+        name = self._name(path)
+        return bool(name) and name in self._entries
+
+    def lookup(self, stem: str, exts: Iterable[str]) -> Optional[str]:
+        self._ensure()
+        names = self._stems.get(stem)
+        if not names:
+            return None
+        for ext in exts:
+            name = names.get(ext)
+            if not name:
+                continue
+            path = self.path(name)
+            if not os.path.exists(path):
+                self._drop(name)
+                continue
+            self._entries[name][1] = time.time()
+            self._entries.move_to_end(name)
+            return path
+        return None
+
+    def add(self, path: str) -> Optional[str]:
+        self._ensure()
+        name = self._name(path)
+        if not name:
+            return path
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        if size == 0:
+            return None
+        self._index(name, size, time.time())
+        self.evict()
+        return path
+
+    def commit(self, temp: str, path: str) -> Optional[str]:
+        os.replace(temp, path)
+        return self.add(path)
+
+    def discard(self, path: str):
+        name = self._name(path)
+        if name:
+            self._drop(name)
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _pinned(self) -> Tuple[Set[str], Set[str]]:
+        from Opus.misc import db
+
+        names, stems = set(), set()
+        for queue in list(db.values()):
+            for entry in list(queue or []):
+                for key in ("file", "speed_path"):
+                    value = entry.get(key)
+                    if value and isinstance(value, str):
+                        names.add(os.path.basename(value))
+                vidid = entry.get("vidid")
+                if vidid and isinstance(vidid, str):
+                    stems.add(vidid)
+        return names, stems
+
+    def evict(self):
+        if self.max_bytes <= 0 or self.total <= self.max_bytes:
+            return
+        pinned_names, pinned_stems = self._pinned()
+        for name in list(self._entries):
+            if self.total <= self.max_bytes:
+                break
+            if name in pinned_names or name.rpartition(".")[0] in pinned_stems:
+                continue
+            self._drop(name)
+            try:
+                os.remove(self.path(name))
+            except OSError:
+                pass
+
+    def stats(self) -> Tuple[int, int]:
+        self._ensure()
+        return len(self._entries), self.total
+
+
+media_cache = MediaCache("downloads", config.MEDIA_CACHE_SIZE)
@@ -0,0 +1,179 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+import config
+from Opus.core.mongo import mongodb
+from Opus.utils.singleflight import SingleFlight
+
+metadb = mongodb.ytmeta
+trackmapdb = mongodb.trackmap
+
+MISS = object()
+
+INFO_KEYS = (
+    "id",
+    "title",
+    "duration",
+    "thumbnail",
+    "thumbnails",
+    "webpage_url",
+    "link",
+    "channel",
+    "is_live",
+)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+def trim_info(info: Dict) -> Dict:
+    out = {k: info[k] for k in INFO_KEYS if k in info}
+    thumbs = out.get("thumbnails")
+    if isinstance(thumbs, list) and thumbs:
+        out["thumbnails"] = [{"url": (thumbs[0] or {}).get("url", "")}]
+    channel = out.get("channel")
+    if isinstance(channel, dict):
+        out["channel"] = {"name": channel.get("name", "")}
+    return out
+
+
+class TTLCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return MISS
+        value, expires = item
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return MISS
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class MetadataCache:
+    def __init__(self):
+        self.memory = TTLCache(config.META_CACHE_SIZE)
+        self.inflight = SingleFlight()
+        self._indexed = False
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        value = self.memory.get(key)
+        if value is not MISS:
+            return value
+        return await self.inflight.do(key, lambda: self._load(key, fetch))
+
+    async def _load(self, key: str, fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        try:
+            doc = await metadb.find_one({"_id": key})
+        except Exception:
+            doc = None
+        if doc and doc.get("info") and doc.get("expires", datetime.min) > datetime.utcnow():
+            self.memory.set(key, doc["info"], config.META_CACHE_TTL)
+            return doc["info"]
+        info = await fetch()
+        if not info:
+            self.memory.set(key, None, config.META_CACHE_NEGATIVE_TTL)
+            return None
+        info = trim_info(info)
+        keys = {key}
+        if info.get("id"):
+            keys.add(f"id:{info['id']}")
+        for k in keys:
+            self.memory.set(k, info, config.META_CACHE_TTL)
+        await self._persist(keys, info)
+        return info
+
+    async def _persist(self, keys, info: Dict):
+        expires = datetime.utcnow() + timedelta(seconds=config.META_CACHE_TTL)
+        try:
+            if not self._indexed:
+                await metadb.create_index("expires", expireAfterSeconds=0)
+                self._indexed = True
+            for k in keys:
+                await metadb.update_one(
+                    {"_id": k},
+                    {"$set": {"info": info, "expires": expires}},
+                    upsert=True,
+                )
+        except Exception:
+            pass
+
+
+class TrackMap:
+    # streaming service track keys (isrc:..., sp:...) -> youtube video id; a
+    # recording keeps its video, so the mongo side never expires
+    def __init__(self):
+        self.memory = TTLCache(config.META_CACHE_SIZE)
+
+    async def warm(self, keys: Iterable[str]):
+        # one query for a whole playlist instead of one per track
+        missing = list({k for k in keys if k and self.memory.get(k) is MISS})
+        for i in range(0, len(missing), 1000):
+            chunk = missing[i: i + 1000]
+            found = set()
+            try:
+                async for doc in trackmapdb.find({"_id": {"$in": chunk}}):
+                    self.memory.set(doc["_id"], doc["vidid"], config.META_CACHE_TTL)
+                    found.add(doc["_id"])
+            except Exception:
+                continue
+            for k in chunk:
+                if k not in found:
+                    self.memory.set(k, None, config.META_CACHE_NEGATIVE_TTL)
+
+    async def get(self, keys: List[str]) -> Optional[str]:
+        keys = [k for k in keys if k]
+        await self.warm(keys)
+        for k in keys:
+            vidid = self.memory.get(k)
+            if vidid and vidid is not MISS:
+                return vidid
+        return None
+
+    async def set(self, keys: List[str], vidid: str):
+        keys = [k for k in keys if k]
+        if not keys or not vidid:
+            return
+        for k in keys:
+            self.memory.set(k, vidid, config.META_CACHE_TTL)
+        try:
+            await trackmapdb.bulk_write(
+                [UpdateOne({"_id": k}, {"$set": {"vidid": vidid}}, upsert=True) for k in keys],
+                ordered=False,
+            )
+        except Exception:
+            pass
+
+    async def drop(self, keys: List[str]):
+        keys = [k for k in keys if k]
+        for k in keys:
+            self.memory.pop(k)
+        try:
+            await trackmapdb.delete_many({"_id": {"$in": keys}})
+        except Exception:
+            pass
+
+
+metadata_cache = MetadataCache()
+track_map = TrackMap()
@@ -1,20 +1,19 @@
-import aiohttp
+from Opus.core.http import http_client
 
 BASE = "https://batbin.me/"
 
 
 async def post(url: str, *args, **kwargs):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, *args, **kwargs) as resp:
-            try:
-                data = await resp.json()
-            except Exception:
-                data = await resp.text()
-        return data
+    resp = await http_client.post(url, *args, **kwargs)
+    try:
+        data = resp.json()
+    except Exception:
+        data = resp.text
+    return data
 
 
 async def SignalBin(text):
-    resp = await post(f"{BASE}api/v2/paste", data=text)
+    resp = await post(f"{BASE}api/v2/paste", content=text)
     if not resp["success"]:
         return
     link = BASE + resp["message"]
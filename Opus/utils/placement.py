@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+import config
+from Opus.logging import LOGGER
+
+# errors older than this no longer count against an assistant
+ERROR_WINDOW = 600
+
+
+class Placement:
+    def __init__(self, max_errors: int, rebalance_margin: int, probe_interval: int):
+        self.max_errors = max_errors
+        self.rebalance_margin = rebalance_margin
+        self.probe_interval = probe_interval
+        # assistant number -> chats it is streaming in right now
+        self.calls: Dict[int, Set[int]] = defaultdict(set)
+        self.owner: Dict[int, int] = {}
+        self.errors: Dict[int, Deque[float]] = defaultdict(deque)
+        self.pings: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def joined(self, number, chat_id: int):
+        if number is None:
+            return
+        self.left(chat_id)
+        self.calls[int(number)].add(chat_id)
+        self.owner[chat_id] = int(number)
+
+    def left(self, chat_id: int):
+        number = self.owner.pop(chat_id, None)
+        if number is not None:
+            self.calls[number].discard(chat_id)
+
+    def failed(self, number):
+        if number is not None:
+            self.errors[int(number)].append(time.monotonic())
+
+    def recent_errors(self, number: int) -> int:
+        errors = self.errors[number]
+        cutoff = time.monotonic() - ERROR_WINDOW
+        while errors and errors[0] < cutoff:
+            errors.popleft()
+        return len(errors)
+
+    def healthy(self, number: int) -> bool:
+        return self.recent_errors(number) < self.max_errors
+
+    def load(self, number: int) -> int:
+        return len(self.calls[number])
+
+    def _key(self, number: int):
+        # live calls first, then errors, then latency
+        return (self.load(number), self.recent_errors(number), self.pings.get(number, 0.0), number)
+
+    def pick(self, candidates: Iterable[int]) -> int:
+        candidates = list(candidates)
+        pool = [n for n in candidates if self.healthy(n)] or candidates
+        return min(pool, key=self._key)
+
+    def should_move(self, current: int, candidates: Iterable[int]) -> bool:
+        if not self.rebalance_margin:
+            return False
+        if not self.healthy(current):
+            return True
+        best = self.pick(candidates)
+        return best != current and self.load(current) - self.load(best) >= self.rebalance_margin
+
+    def stats(self, candidates: Iterable[int]) -> List[dict]:
+        return [
+            {
+                "number": n,
+                "calls": self.load(n),
+                "errors": self.recent_errors(n),
+                "ping": self.pings.get(n),
+                "healthy": self.healthy(n),
+            }
+            for n in candidates
+        ]
+
+    def start(self, calls: Dict):
+        if self._task is None and self.probe_interval > 0:
+            self._task = asyncio.create_task(self._probe(calls))
+
+    async def _probe(self, calls: Dict):
+        while True:
+            for number, call in list(calls.items()):
+                try:
+                    self.pings[number] = float(await call.ping)
+                except Exception as e:
+                    self.failed(number)
+                    LOGGER(__name__).warning(f"Assistant {number} ping failed: {e}")
+            await asyncio.sleep(self.probe_interval)
+
+
+placement = Placement(
+    config.ASSISTANT_MAX_ERRORS,
+    config.ASSISTANT_REBALANCE_MARGIN,
+    config.ASSISTANT_PROBE_INTERVAL,
+)
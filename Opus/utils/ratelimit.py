@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount: float = 1) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= min(amount, self.capacity):
+            self.tokens -= amount
+            return True
+        return False
+
+    async def acquire(self, amount: float = 1):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                # requests larger than the bucket borrow against future refills
+                need = min(amount, self.capacity)
+                if self.tokens >= need:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((need - self.tokens) / self.rate)
+
+
+class AdaptiveRate(TokenBucket):
+    # AIMD around a ceiling: FloodWait blocks everyone and halves the rate,
+    # every success creeps it back up
+    def __init__(self, rate: float, floor: float = 0.2, step: float = 0.05):
+        super().__init__(rate, max(1.0, rate))
+        self.ceiling = rate
+        self.floor = min(floor, rate)
+        self.step = step
+        self.blocked_until = 0.0
+
+    def backoff(self, seconds: float):
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.rate = max(self.floor, self.rate / 2)
+        self.tokens = 0
+        self.updated = self.blocked_until
+
+    def recover(self):
+        self.rate = min(self.ceiling, self.rate + self.step)
+
+    async def acquire(self, amount: float = 1):
+        if self.ceiling <= 0:
+            return
+        async with self._lock:
+            while True:
+                wait = self.blocked_until - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
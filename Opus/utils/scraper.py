@@ -0,0 +1,138 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+import config
+from Opus.core.http import http_client
+from Opus.logging import LOGGER
+from Opus.utils.metadata import MISS, TTLCache
+from Opus.utils.singleflight import SingleFlight
+
+Meta = List[Tuple[str, str]]
+
+# pages are kept this long for conditional revalidation after they go stale
+KEEP = 7 * 24 * 3600
+
+
+class _MetaParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found: Meta = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            self.found.append((attrs.get("property") or attrs.get("name") or "", attrs.get("content") or ""))
+
+
+def _parse_meta(head: str) -> Meta:
+    # runs in a worker process; lxml when it is installed, the stdlib parser otherwise
+    try:
+        from lxml import html as lxml_html
+
+        doc = lxml_html.fromstring(head)
+        return [(m.get("property") or m.get("name") or "", m.get("content") or "") for m in doc.iter("meta")]
+    except ImportError:
+        pass
+    except Exception:
+        pass
+    parser = _MetaParser()
+    parser.feed(head)
+    parser.close()
+    return parser.found
+
+
+def _head(html: str) -> str:
+    # every tag the platforms read lives in <head>, the body is never parsed
+    end = html.find("</head>")
+    return html[: end + 7] if end != -1 else html
+
+
+class PageScraper:
+    def __init__(self, workers: int, ttl: int):
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.pages = TTLCache(config.META_CACHE_SIZE)
+        self.inflight = SingleFlight()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _ensure(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+        return self._pool
+
+    async def start(self):
+        # fork the workers before the bot starts its threads, not on the first import
+        pool = self._ensure()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(self.workers)))
+        LOGGER(__name__).info(f"Pᴀɢᴇ sᴄʀᴀᴘᴇʀ ʀᴇᴀᴅʏ ᴡɪᴛʜ {self.workers} ᴡᴏʀᴋᴇʀs.")
+
+    async def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _parse(self, html: str) -> Meta:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._ensure(), _parse_meta, _head(html))
+        except BrokenProcessPool:
+            self._pool = None
+            raise
+
+    async def meta(self, url: str) -> Optional[Meta]:
+        # (property, content) of every <meta> in the page head, in page order
+        page = self.pages.get(url)
+        if page is not MISS and page["fresh"] > time.monotonic():
+            return page["meta"]
+        return await self.inflight.do(url, lambda: self._fetch(url, None if page is MISS else page))
+
+    async def _fetch(self, url: str, page: Optional[Dict]) -> Optional[Meta]:
+        headers = {}
+        if page:
+            if page.get("etag"):
+                headers["If-None-Match"] = page["etag"]
+            if page.get("modified"):
+                headers["If-Modified-Since"] = page["modified"]
+        response = await http_client.get(url, headers=headers)
+        if response.status_code == 304 and page:
+            page["fresh"] = time.monotonic() + self.ttl
+            self.pages.set(url, page, KEEP)
+            return page["meta"]
+        if response.status_code != 200:
+            return None
+        meta = await self._parse(response.text)
+        self.pages.set(
+            url,
+            {
+                "meta": meta,
+                "etag": response.headers.get("etag"),
+                "modified": response.headers.get("last-modified"),
+                "fresh": time.monotonic() + self.ttl,
+            },
+            KEEP,
+        )
+        return meta
+
+
+def first(meta: Meta, prop: str) -> Optional[str]:
+    for key, content in meta:
+        if key == prop:
+            return content
+    return None
+
+
+def every(meta: Meta, prop: str) -> List[str]:
+    return [content for key, content in meta if key == prop]
+
+
+scraper = PageScraper(config.SCRAPER_WORKERS, config.SCRAPE_CACHE_TTL)
@@ -0,0 +1,148 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateOne
+
+import config
+from Opus.core.mongo import mongodb
+from Opus.logging import LOGGER
+from Opus.utils.singleflight import SingleFlight
+
+settingsdb = mongodb.chatsettings
+
+GLOBAL = "global"
+META = "meta"
+
+DEFAULTS: Dict[str, Any] = {
+    "lang": "en",
+    "playmode": "Direct",
+    "playtype": "Everyone",
+    "cmode": None,
+    "thumb": True,
+    "skipmode": True,
+    "upvotes": 5,
+    "nonadmin": False,
+}
+
+GLOBAL_DEFAULTS: Dict[str, Any] = {
+    "autoend": False,
+}
+
+# legacy per-setting collections: key -> (collection, field or None when the
+# document's presence is the value, value when present)
+LEGACY = {
+    "lang": ("language", "lang", None),
+    "playmode": ("playmode", "mode", None),
+    "playtype": ("playtypedb", "mode", None),
+    "cmode": ("cplaymode", "mode", None),
+    "thumb": ("thumb", "value", None),
+    "upvotes": ("upcount", "mode", None),
+    "skipmode": ("skipmode", None, False),
+    "nonadmin": ("adminauth", None, True),
+}
+
+
+class SettingsCache:
+    def __init__(self, flush_interval: float = 2.0):
+        self.flush_interval = flush_interval
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        self._dirty: Dict[Any, Dict[str, Any]] = {}
+        self._loading = SingleFlight()
+        self._complete = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        try:
+            await self._migrate()
+            async for doc in settingsdb.find({}):
+                key = doc.pop("_id")
+                if key == META:
+                    continue
+                base = GLOBAL_DEFAULTS if key == GLOBAL else DEFAULTS
+                self._docs[key] = {**base, **doc}
+            # every chat with settings is in memory now, a miss means defaults
+            self._complete = True
+        except Exception as e:
+            LOGGER(__name__).warning(f"Sᴇᴛᴛɪɴɢs ᴘʀᴇʟᴏᴀᴅ ғᴀɪʟᴇᴅ: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._flusher())
+        LOGGER(__name__).info(f"Sᴇᴛᴛɪɴɢs ᴄᴀᴄʜᴇᴅ ғᴏʀ {len(self._docs)} ᴄʜᴀᴛs.")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _migrate(self):
+        if await settingsdb.find_one({"_id": META, "migrated": True}):
+            return
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for key, (name, field, present) in LEGACY.items():
+            async for doc in mongodb[name].find({}):
+                chat_id = doc.get("chat_id")
+                if chat_id is None:
+                    continue
+                value = present if field is None else doc.get(field, DEFAULTS[key])
+                merged.setdefault(chat_id, {})[key] = value
+        ops = [UpdateOne({"_id": k}, {"$set": v}, upsert=True) for k, v in merged.items()]
+        if await mongodb.autoend.find_one({"chat_id": 1234}):
+            ops.append(UpdateOne({"_id": GLOBAL}, {"$set": {"autoend": True}}, upsert=True))
+        for i in range(0, len(ops), 1000):
+            await settingsdb.bulk_write(ops[i: i + 1000], ordered=False)
+        await settingsdb.update_one({"_id": META}, {"$set": {"migrated": True}}, upsert=True)
+        LOGGER(__name__).info(f"Mɪɢʀᴀᴛᴇᴅ sᴇᴛᴛɪɴɢs ᴏғ {len(merged)} ᴄʜᴀᴛs.")
+
+    async def _load(self, key) -> Dict[str, Any]:
+        base = GLOBAL_DEFAULTS if key == GLOBAL else DEFAULTS
+        try:
+            doc = await settingsdb.find_one({"_id": key}) or {}
+        except Exception:
+            return dict(base)
+        doc.pop("_id", None)
+        # misses are cached as defaults too
+        self._docs[key] = {**base, **doc}
+        return self._docs[key]
+
+    async def doc(self, key) -> Dict[str, Any]:
+        doc = self._docs.get(key)
+        if doc is not None:
+            return doc
+        if key is None:
+            return dict(DEFAULTS)
+        if self._complete:
+            base = GLOBAL_DEFAULTS if key == GLOBAL else DEFAULTS
+            doc = self._docs[key] = dict(base)
+            return doc
+        return await self._loading.do(key, lambda: self._load(key))
+
+    async def get(self, chat_id, name: str) -> Any:
+        return (await self.doc(chat_id))[name]
+
+    async def set(self, chat_id, name: str, value: Any):
+        if chat_id is None:
+            return
+        doc = await self.doc(chat_id)
+        doc[name] = value
+        self._dirty.setdefault(chat_id, {})[name] = value
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        ops = [UpdateOne({"_id": k}, {"$set": v}, upsert=True) for k, v in dirty.items()]
+        try:
+            await settingsdb.bulk_write(ops, ordered=False)
+        except Exception as e:
+            # put the batch back unless newer writes already replaced it
+            for k, v in dirty.items():
+                self._dirty[k] = {**v, **self._dirty.get(k, {})}
+            LOGGER(__name__).warning(f"Sᴇᴛᴛɪɴɢs ғʟᴜsʜ ғᴀɪʟᴇᴅ: {e}")
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+settings = SettingsCache(config.SETTINGS_FLUSH_INTERVAL)
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    def running(self, key: Hashable) -> bool:
+        task = self._calls.get(key)
+        return task is not None and not task.done()
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            self._calls.pop(key, None)
+            self._waiters.pop(key, None)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        self._waiters[key] += 1
+        cancelled = False
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if self._calls.get(key) is task:
+                self._waiters[key] -= 1
+                # the last interested caller went away, nobody needs the result
+                if cancelled and self._waiters[key] <= 0 and not task.done():
+                    task.cancel()
@@ -1,27 +1,75 @@
+import asyncio
 import os
+from collections import Counter
+from typing import Iterable
+
 from config import autoclean
+from Opus.utils.mediacache import media_cache
+
+
+def _path(popped):
+    if isinstance(popped, dict):
+        return popped.get("file")
+    if isinstance(popped, str):
+        return popped
+    return getattr(popped, "file", None)
+
+
+def _removable(rem) -> bool:
+    if media_cache.contains(rem):
+        # kept for replays, the cache evicts it by LRU when over budget
+        return False
+    return not any(p in rem for p in ("vid_", "live_", "index_"))
+
+
+def _release(counts: Counter):
+    # autoclean holds one reference per queued entry, drop only the popped ones
+    if not counts:
+        return
+    kept = []
+    for f in autoclean:
+        if counts.get(f):
+            counts[f] -= 1
+        else:
+            kept.append(f)
+    autoclean[:] = kept
+
+
+def _unlink(paths):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
+
 
 async def auto_clean(popped):
     try:
-        if isinstance(popped, dict):
-            rem = popped.get("file")
-        elif isinstance(popped, str):
-            rem = popped
-        else:
-            rem = getattr(popped, "file", None)
+        rem = _path(popped)
         if not rem:
             return
         try:
-            while rem in autoclean:
-                autoclean.remove(rem)
-        except Exception:
+            autoclean.remove(rem)
+        except ValueError:
             pass
-        if rem not in autoclean:
-            if not any(p in rem for p in ("vid_", "live_", "index_")):
-                try:
-                    if os.path.exists(rem):
-                        os.remove(rem)
-                except Exception:
-                    pass
+        if rem not in autoclean and _removable(rem):
+            _unlink([rem])
+    except Exception:
+        pass
+
+
+async def auto_clean_many(popped: Iterable):
+    # one pass over autoclean and one executor hop for a whole /skip N
+    try:
+        counts = Counter(rem for rem in map(_path, popped) if rem)
+        if not counts:
+            return
+        paths = list(counts)
+        _release(counts)
+        live = set(autoclean)
+        doomed = [rem for rem in paths if rem not in live and _removable(rem)]
+        if doomed:
+            await asyncio.get_running_loop().run_in_executor(None, _unlink, doomed)
     except Exception:
         pass
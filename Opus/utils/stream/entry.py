@@ -0,0 +1,132 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# keys every entry (or every playing head) carries; the rare ones such as
+# old_dur/speed_path from /speed land in a dict that is only made when used.
+# older code reads and writes all of them by name, so entries keep a
+# dict-like face on top of the slots
+FIELDS = (
+    "title",
+    "dur",
+    "streamtype",
+    "by",
+    "user_id",
+    "chat_id",
+    "file",
+    "vidid",
+    "seconds",
+    "played",
+    "started",
+    "paused_at",
+    "markup",
+)
+_KEYS = frozenset(FIELDS + ("mystic",))
+
+
+class MessageRef:
+    # what is left of a sent message once only (chat_id, message_id) is kept
+    __slots__ = ("chat_id", "id")
+
+    def __init__(self, chat_id: int, message_id: int):
+        self.chat_id = chat_id
+        self.id = message_id
+
+    @property
+    def _app(self):
+        from Opus import app
+
+        return app
+
+    async def delete(self, revoke: bool = True):
+        return await self._app.delete_messages(self.chat_id, self.id, revoke=revoke)
+
+    async def edit_text(self, text: str, **kwargs):
+        return await self._app.edit_message_text(self.chat_id, self.id, text, **kwargs)
+
+    async def edit_caption(self, caption: str, **kwargs):
+        return await self._app.edit_message_caption(self.chat_id, self.id, caption, **kwargs)
+
+    async def edit_reply_markup(self, reply_markup=None):
+        return await self._app.edit_message_reply_markup(self.chat_id, self.id, reply_markup)
+
+
+class QueueEntry:
+    __slots__ = FIELDS + ("_mystic", "_extra")
+
+    def __init__(self, **fields):
+        for name in FIELDS:
+            setattr(self, name, None)
+        self.played = 0
+        self._mystic: Optional[Tuple[int, int]] = None
+        self._extra: Optional[Dict[str, Any]] = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @property
+    def mystic(self) -> Optional[MessageRef]:
+        return MessageRef(*self._mystic) if self._mystic else None
+
+    @mystic.setter
+    def mystic(self, message):
+        if message is None:
+            self._mystic = None
+        elif isinstance(message, MessageRef):
+            self._mystic = (message.chat_id, message.id)
+        else:
+            self._mystic = (message.chat.id, message.id)
+
+    def __getitem__(self, key: str):
+        if key in _KEYS:
+            return getattr(self, key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key in _KEYS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in _KEYS:
+            setattr(self, key, None)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        # unset slots hold None, which reads the same as a missing key
+        return self.get(key) is not None
+
+    def get(self, key: str, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def keys(self) -> Iterator[str]:
+        for key in FIELDS:
+            if getattr(self, key) is not None:
+                yield key
+        if self._mystic:
+            yield "mystic"
+        if self._extra:
+            yield from self._extra
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self.keys():
+            yield key, self[key]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any]) -> "QueueEntry":
+        return cls(**doc)
+
+    def __repr__(self) -> str:
+        return f"QueueEntry({self.title!r}, file={self.file!r})"
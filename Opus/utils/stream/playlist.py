@@ -0,0 +1,46 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+
+async def resolve_ordered(
+    items: Iterable,
+    fetch: Callable[[Any], Awaitable[Any]],
+    concurrency: int,
+) -> AsyncIterator[Optional[Any]]:
+    # fetch(item) for every item with at most `concurrency` lookups in flight,
+    # yielding results in input order as soon as each prefix is ready; a failed
+    # lookup yields None. closing the generator cancels whatever is still queued
+    concurrency = max(1, concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    items = iter(items)
+    window = deque()
+
+    async def run(item):
+        async with slots:
+            return await fetch(item)
+
+    def fill():
+        # a window wider than the semaphore keeps it busy while the head is awaited
+        while len(window) < concurrency * 2:
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            window.append(asyncio.ensure_future(run(item)))
+
+    try:
+        fill()
+        while window:
+            task = window.popleft()
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                result = None
+            fill()
+            yield result
+    finally:
+        for task in window:
+            task.cancel()
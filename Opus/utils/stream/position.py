@@ -0,0 +1,45 @@
+import time
+
+# Playback position of a queue entry, derived from a monotonic clock:
+#   "played"    offset in seconds at the moment the clock was (re)started
+#   "started"   monotonic time the clock was (re)started, None while not playing
+#   "paused_at" monotonic time of the current pause, None while running
+# A resume shifts "started" by the pause length, so paused time never counts.
+
+
+def start(entry: dict, offset: int = 0):
+    entry["played"] = offset
+    entry["started"] = time.monotonic()
+    entry["paused_at"] = None
+
+
+def seek(entry: dict, offset: int):
+    paused = entry.get("paused_at")
+    start(entry, offset)
+    if paused:
+        entry["paused_at"] = entry["started"]
+
+
+def pause(entry: dict):
+    if entry.get("started") is not None and not entry.get("paused_at"):
+        entry["paused_at"] = time.monotonic()
+
+
+def resume(entry: dict):
+    paused = entry.get("paused_at")
+    if paused:
+        entry["started"] += time.monotonic() - paused
+        entry["paused_at"] = None
+
+
+def played(entry: dict) -> int:
+    offset = entry.get("played") or 0
+    started = entry.get("started")
+    if started is None:
+        return int(offset)
+    now = entry.get("paused_at") or time.monotonic()
+    position = max(0, offset + now - started)
+    seconds = int(entry.get("seconds") or 0)
+    if seconds:
+        position = min(position, seconds)
+    return int(position)
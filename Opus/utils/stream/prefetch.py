@@ -0,0 +1,74 @@
+import asyncio
+from typing import Dict, Set, Tuple
+
+import config
+from Opus.misc import db
+from Opus.utils.downloader import download_audio, download_video, file_exists
+from Opus.utils.thumbnails import thumb_renderer
+
+Key = Tuple[str, bool]
+
+
+class Prefetcher:
+    def __init__(self, depth: int, concurrency: int):
+        self.depth = depth
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._tasks: Dict[int, Dict[Key, asyncio.Task]] = {}
+
+    def _wanted(self, chat_id: int) -> Set[Key]:
+        wanted = set()
+        # the head is included so a prefetch that is about to be played is not
+        # cancelled right before change_stream joins it
+        for entry in list(db.get(chat_id) or [])[: self.depth + 1]:
+            file = entry.get("file")
+            if not isinstance(file, str) or not file.startswith("vid_"):
+                continue
+            wanted.add((entry["vidid"], str(entry.get("streamtype")) == "video"))
+        return wanted
+
+    def sync(self, chat_id: int):
+        if self.depth <= 0:
+            return
+        wanted = self._wanted(chat_id)
+        thumb_renderer.prerender(vidid for vidid, _ in wanted)
+        tasks = self._tasks.setdefault(chat_id, {})
+        for key in list(tasks):
+            if key not in wanted:
+                tasks.pop(key).cancel()
+        for key in wanted:
+            task = tasks.get(key)
+            if task and not task.done():
+                continue
+            vidid, video = key
+            if file_exists(vidid, "video" if video else "audio"):
+                continue
+            tasks[key] = asyncio.create_task(self._fetch(chat_id, key))
+        if not tasks:
+            self._tasks.pop(chat_id, None)
+
+    def cancel(self, chat_id: int):
+        for task in (self._tasks.pop(chat_id, None) or {}).values():
+            task.cancel()
+
+    async def _fetch(self, chat_id: int, key: Key):
+        vidid, video = key
+        link = f"https://www.youtube.com/watch?v={vidid}"
+        try:
+            async with self._slots:
+                if video:
+                    await download_video(link, background=True)
+                else:
+                    await download_audio(link, background=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        finally:
+            tasks = self._tasks.get(chat_id)
+            if tasks and tasks.get(key) is asyncio.current_task():
+                tasks.pop(key, None)
+                if not tasks:
+                    self._tasks.pop(chat_id, None)
+
+
+prefetcher = Prefetcher(config.PREFETCH_DEPTH, config.PREFETCH_CONCURRENCY)
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Dict, List, Set, Tuple
+
+from pyrogram.errors import FloodWait, MessageNotModified
+from pyrogram.types import InlineKeyboardMarkup
+
+import config
+from Opus.logging import LOGGER
+from Opus.misc import db
+from Opus.utils.database import get_active_chats, get_lang, is_music_playing
+from Opus.utils.formatters import seconds_to_min
+from Opus.utils.inline import stream_markup_timer
+from Opus.utils.ratelimit import TokenBucket
+from Opus.utils.stream import position
+from strings import get_string
+
+MAX_PENALTY = 8.0
+
+
+def parse_levels(spec: str) -> List[Tuple[int, float]]:
+    levels = []
+    for part in (spec or "").split(","):
+        try:
+            chats, interval = part.split(":")
+            levels.append((int(chats), float(interval)))
+        except ValueError:
+            continue
+    return sorted(levels) or [(0, 7.0)]
+
+
+class ProgressUpdater:
+    def __init__(self):
+        self.levels = parse_levels(config.PROGRESS_INTERVALS)
+        self.edits = TokenBucket(config.PROGRESS_EDIT_RATE, config.PROGRESS_EDIT_RATE)
+        self.penalty = 1.0
+        self._chats: Dict[int, TokenBucket] = {}
+        self._rendered: Dict[int, Tuple[int, str]] = {}
+        self._blocked: Dict[int, float] = {}
+        self._pending: Set[int] = set()
+
+    def interval(self, load: int) -> float:
+        interval = self.levels[0][1]
+        for chats, seconds in self.levels:
+            if load >= chats:
+                interval = seconds
+        return interval * self.penalty
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = 1 / max(config.PROGRESS_CHAT_INTERVAL, 0.1)
+            bucket = self._chats[chat_id] = TokenBucket(rate, 1)
+        return bucket
+
+    def _prune(self, chats: List[int]):
+        alive = set(chats)
+        for store in (self._chats, self._rendered, self._blocked):
+            for chat_id in [c for c in store if c not in alive]:
+                store.pop(chat_id, None)
+
+    async def run(self):
+        while True:
+            try:
+                chats = [c for c in list(await get_active_chats()) if await is_music_playing(c)]
+                self._prune(chats)
+                interval = self.interval(len(chats))
+                started = time.monotonic()
+                # spread the edits over the whole interval instead of bursting them
+                step = interval / len(chats) if chats else interval
+                for i, chat_id in enumerate(chats):
+                    delay = started + i * step - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if chat_id not in self._pending:
+                        self._pending.add(chat_id)
+                        asyncio.create_task(self._update(chat_id))
+                rest = started + interval - time.monotonic()
+                await asyncio.sleep(max(rest, 1))
+                self.penalty = max(1.0, self.penalty * 0.9)
+            except Exception as e:
+                LOGGER(__name__).warning(f"Pʀᴏɢʀᴇss ᴜᴘᴅᴀᴛᴇʀ: {e}")
+                await asyncio.sleep(5)
+
+    async def _update(self, chat_id: int):
+        try:
+            await self._edit(chat_id)
+        except Exception:
+            pass
+        finally:
+            self._pending.discard(chat_id)
+
+    async def _edit(self, chat_id: int):
+        playing = db.get(chat_id)
+        if not playing:
+            return
+        entry = playing[0]
+        if not int(entry.get("seconds") or 0):
+            return
+        mystic = entry.get("mystic")
+        if not mystic:
+            return
+        played = seconds_to_min(position.played(entry))
+        rendered = (mystic.id, f"{played}/{entry['dur']}")
+        if self._rendered.get(chat_id) == rendered:
+            return
+        now = time.monotonic()
+        if self._blocked.get(chat_id, 0) > now:
+            return
+        if not self._bucket(chat_id).try_acquire() or not self.edits.try_acquire():
+            return
+
+        _ = get_string(await get_lang(chat_id))
+        buttons = stream_markup_timer(_, chat_id, played, entry["dur"])
+        try:
+            await mystic.edit_reply_markup(reply_markup=InlineKeyboardMarkup(buttons))
+            self._rendered[chat_id] = rendered
+        except MessageNotModified:
+            self._rendered[chat_id] = rendered
+        except FloodWait as e:
+            wait = float(e.value or 1)
+            self._blocked[chat_id] = time.monotonic() + wait
+            self.penalty = min(MAX_PENALTY, self.penalty * 2)
+
+
+progress_updater = ProgressUpdater()
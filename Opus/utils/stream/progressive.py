@@ -0,0 +1,143 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+import config
+from config import autoclean
+from Opus.utils.downloader import download_audio, download_video, file_exists
+from Opus.utils.extractor import extractor
+from Opus.utils.stream import position
+
+# input options for remote sources, ffmpeg reconnects on drops and gives up
+# on a stalled socket instead of hanging the call
+REMOTE_FFMPEG_PARAMS = (
+    "-reconnect 1 -reconnect_streamed 1 -reconnect_on_network_error 1 "
+    "-reconnect_delay_max 5 -rw_timeout 15000000"
+)
+
+AUDIO_FORMAT = "bestaudio[ext=m4a]/bestaudio/best"
+VIDEO_FORMAT = "best[height<=?720][width<=?1280]"
+
+# a remote head that ends this many seconds short of its duration stalled
+EARLY_END = 10
+
+# background downloads kept alive after playback switched to the remote source,
+# by (vidid, video) so the queue entry can pick the file up when it lands
+_background: Dict[Tuple[str, bool], asyncio.Task] = {}
+# chat_id -> the head entry currently playing from a remote url
+_remote: Dict[int, dict] = {}
+
+
+def _keep(key: Tuple[str, bool], task: asyncio.Task):
+    _background[key] = task
+    task.add_done_callback(lambda t: _background.pop(key, None) if _background.get(key) is t else None)
+
+
+def _result(task: asyncio.Task) -> Optional[str]:
+    if not task.done() or task.cancelled() or task.exception():
+        return None
+    return task.result()
+
+
+def _drop(task: asyncio.Task):
+    # cancel a lookup nobody needs, or retrieve its error so it is not logged
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
+
+async def open_source(vidid: str, video: bool = False) -> Tuple[Optional[str], bool]:
+    existing = file_exists(vidid, "video" if video else "audio")
+    if existing:
+        return existing, True
+
+    link = f"https://www.youtube.com/watch?v={vidid}"
+    if video:
+        from Opus import YouTube
+
+        # a live video never finishes downloading, stream it without one
+        if await YouTube.is_live(link):
+            return await extractor.stream_url(link, VIDEO_FORMAT), False
+
+    fetch = asyncio.create_task(download_video(link) if video else download_audio(link))
+    if not config.PROGRESSIVE_PLAYBACK:
+        return await fetch, True
+
+    resolve = asyncio.create_task(
+        extractor.stream_url(link, VIDEO_FORMAT if video else AUDIO_FORMAT)
+    )
+    try:
+        # short tracks usually finish within the grace period, play those from disk
+        await asyncio.wait({fetch}, timeout=config.PROGRESSIVE_GRACE)
+        if _result(fetch):
+            return fetch.result(), True
+        try:
+            url = await resolve
+        except Exception:
+            url = None
+    finally:
+        _drop(resolve)
+    if _result(fetch):
+        return fetch.result(), True
+    if url:
+        if not fetch.done():
+            _keep((vidid, video), fetch)
+        return url, False
+    return await fetch, True
+
+
+def _settle(chat_id: int, entry: dict, path: Optional[str]):
+    from Opus.misc import db
+
+    queue = db.get(chat_id)
+    if not path or not queue or queue[0] is not entry or not str(entry["file"]).startswith("vid_"):
+        return
+    # the head now has a local file for /speed, /seek and restarts
+    try:
+        autoclean.remove(entry["file"])
+    except ValueError:
+        pass
+    autoclean.append(path)
+    entry["file"] = path
+
+
+def adopt(chat_id: int, vidid: str, video: bool = False):
+    # called once a remote-sourced track is the head of the chat's queue
+    from Opus.misc import db
+
+    queue = db.get(chat_id)
+    if not queue:
+        return
+    entry = queue[0]
+    _remote[chat_id] = entry
+    fetch = _background.get((vidid, video))
+    if fetch is None:
+        _settle(chat_id, entry, file_exists(vidid, "video" if video else "audio"))
+    else:
+        fetch.add_done_callback(lambda t: _settle(chat_id, entry, _result(t)))
+
+
+def forget(chat_id: int):
+    _remote.pop(chat_id, None)
+
+
+async def local_fallback(chat_id: int, entry: dict) -> Optional[Tuple[str, int]]:
+    # (file, offset) to finish a remote head from disk when its stream died early
+    if _remote.pop(chat_id, None) is not entry or entry.get("speed_path"):
+        return None
+    played = position.played(entry)
+    seconds = int(entry.get("seconds") or 0)
+    if not seconds or played >= seconds - EARLY_END:
+        return None
+    video = str(entry["streamtype"]) == "video"
+    vidid = entry["vidid"]
+    path = file_exists(vidid, "video" if video else "audio")
+    if not path:
+        fetch = _background.get((vidid, video))
+        if fetch is None:
+            return None
+        try:
+            path = await asyncio.shield(fetch)
+        except Exception:
+            return None
+    return (path, played) if path else None
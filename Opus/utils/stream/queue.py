@@ -2,7 +2,10 @@ import asyncio
 from typing import Union
 
 from Opus.misc import db
+from Opus.utils.stream.entry import QueueEntry
 from Opus.utils.formatters import check_duration, seconds_to_min
+from Opus.utils.stream import position
+from Opus.utils.stream.prefetch import prefetcher
 from config import autoclean, time_to_seconds
 
 
@@ -23,28 +26,31 @@ async def put_queue(
         duration_in_seconds = time_to_seconds(duration) - 3
     except:
         duration_in_seconds = 0
-    put = {
-        "title": title,
-        "dur": duration,
-        "streamtype": stream,
-        "by": user,
-        "user_id": user_id,
-        "chat_id": original_chat_id,
-        "file": file,
-        "vidid": vidid,
-        "seconds": duration_in_seconds,
-        "played": 0,
-    }
+    put = QueueEntry(
+        title=title,
+        dur=duration,
+        streamtype=stream,
+        by=user,
+        user_id=user_id,
+        chat_id=original_chat_id,
+        file=file,
+        vidid=vidid,
+        seconds=duration_in_seconds,
+        played=0,
+    )
     if forceplay:
         check = db.get(chat_id)
         if check:
-            check.insert(0, put)
+            check.appendleft(put)
         else:
             db[chat_id] = []
             db[chat_id].append(put)
     else:
         db[chat_id].append(put)
+    if db[chat_id][0] is put:
+        position.start(put)
     autoclean.append(file)
+    prefetcher.sync(chat_id)
 
 
 async def put_queue_index(
@@ -69,23 +75,26 @@ async def put_queue_index(
             dur = 0
     else:
         dur = 0
-    put = {
-        "title": title,
-        "dur": duration,
-        "streamtype": stream,
-        "by": user,
-        "chat_id": original_chat_id,
-        "file": file,
-        "vidid": vidid,
-        "seconds": dur,
-        "played": 0,
-    }
+    put = QueueEntry(
+        title=title,
+        dur=duration,
+        streamtype=stream,
+        by=user,
+        chat_id=original_chat_id,
+        file=file,
+        vidid=vidid,
+        seconds=dur,
+        played=0,
+    )
     if forceplay:
         check = db.get(chat_id)
         if check:
-            check.insert(0, put)
+            check.appendleft(put)
         else:
             db[chat_id] = []
             db[chat_id].append(put)
     else:
         db[chat_id].append(put)
+    if db[chat_id][0] is put:
+        position.start(put)
+    prefetcher.sync(chat_id)
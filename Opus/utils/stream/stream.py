@@ -1,19 +1,27 @@
 import os
+import time
+from contextlib import aclosing
 from random import randint
 from typing import Union
 from pyrogram.types import InlineKeyboardMarkup
 
 import config
-from Opus import Carbon, YouTube, app
+from Opus import Carbon, Spotify, YouTube, app
 from Opus.core.call import Signal
 from Opus.misc import db
 from Opus.utils.database import add_active_video_chat, get_thumb_setting, is_active_chat
 from Opus.utils.exceptions import AssistantErr
 from Opus.utils.inline import aq_markup, close_markup, stream_markup
 from Opus.utils.pastebin import SignalBin
+from Opus.utils.stream.playlist import resolve_ordered
+from Opus.utils.stream import progressive
+from Opus.utils.stream.progressive import REMOTE_FFMPEG_PARAMS, open_source
 from Opus.utils.stream.queue import put_queue, put_queue_index
 from Opus.utils.thumbnails import get_thumb
 
+# seconds between playlist import progress edits
+PROGRESS_INTERVAL = 3
+
 
 async def stream(
     _,
@@ -39,90 +47,104 @@ async def stream(
     if streamtype == "playlist":
         msg = f"{_['play_19']}\n\n"
         count = 0
-        for search in result:
-            if int(count) == config.PLAYLIST_FETCH_LIMIT:
-                continue
-            try:
-                title, duration_min, duration_sec, thumbnail, vidid = await YouTube.details(
-                    search, False if spotify else True
-                )
-            except:
-                continue
-            if str(duration_min) == "None":
-                continue
-            if duration_sec > config.DURATION_LIMIT:
-                continue
+        total = min(len(result), config.PLAYLIST_FETCH_LIMIT)
+        reported = time.monotonic()
+        resolved = resolve_ordered(
+            result,
+            Spotify.resolve if spotify else (lambda search: YouTube.details(search, True)),
+            config.PLAYLIST_CONCURRENCY,
+        )
+        async with aclosing(resolved):
+            async for details in resolved:
+                if int(count) == config.PLAYLIST_FETCH_LIMIT:
+                    break
+                if not details:
+                    continue
+                title, duration_min, duration_sec, thumbnail, vidid = details
+                if str(duration_min) == "None":
+                    continue
+                if duration_sec > config.DURATION_LIMIT:
+                    continue
 
-            if await is_active_chat(chat_id):
-                await put_queue(
-                    chat_id,
-                    original_chat_id,
-                    f"vid_{vidid}",
-                    title,
-                    duration_min,
-                    user_name,
-                    vidid,
-                    user_id,
-                    "video" if is_video else "audio",
-                )
-                position = len(db.get(chat_id)) - 1
-                count += 1
-                msg += f"{count}. {title[:70]}\n"
-                msg += f"{_['play_20']} {position}\n\n"
-            else:
-                if not forceplay:
-                    db[chat_id] = []
-                try:
-                    file_path, direct = await YouTube.download(
-                        vidid, mystic, videoid=True, video=is_video
-                    )
-                except:
-                    raise AssistantErr(_["play_14"])
-                if not file_path:
-                    raise AssistantErr(_["play_14"])
-                await Signal.join_call(
-                    chat_id,
-                    original_chat_id,
-                    file_path,
-                    video=is_video,
-                    image=thumbnail,
-                )
-                await put_queue(
-                    chat_id,
-                    original_chat_id,
-                    file_path if direct else f"vid_{vidid}",
-                    title,
-                    duration_min,
-                    user_name,
-                    vidid,
-                    user_id,
-                    "video" if is_video else "audio",
-                    forceplay=forceplay,
-                )
-                thumb_on = await get_thumb_setting(original_chat_id)
-                button = stream_markup(_, chat_id)
-                caption = _["stream_1"].format(
-                    f"https://t.me/{app.username}?start=info_{vidid}",
-                    title[:23],
-                    duration_min,
-                    user_name,
-                )
-                if thumb_on:
-                    img = await get_thumb(vidid)
-                    run = await app.send_photo(
+                if await is_active_chat(chat_id):
+                    await put_queue(
+                        chat_id,
                         original_chat_id,
-                        photo=img,
-                        caption=caption,
-                        reply_markup=InlineKeyboardMarkup(button),
+                        f"vid_{vidid}",
+                        title,
+                        duration_min,
+                        user_name,
+                        vidid,
+                        user_id,
+                        "video" if is_video else "audio",
                     )
+                    position = len(db.get(chat_id)) - 1
+                    count += 1
+                    msg += f"{count}. {title[:70]}\n"
+                    msg += f"{_['play_20']} {position}\n\n"
                 else:
-                    run = await app.send_message(
+                    if not forceplay:
+                        db[chat_id] = []
+                    try:
+                        file_path, is_file = await open_source(vidid, is_video)
+                    except:
+                        raise AssistantErr(_["play_14"])
+                    if not file_path:
+                        raise AssistantErr(_["play_14"])
+                    await Signal.join_call(
+                        chat_id,
+                        original_chat_id,
+                        file_path,
+                        video=is_video,
+                        image=thumbnail,
+                        ffmpeg_params=None if is_file else REMOTE_FFMPEG_PARAMS,
+                    )
+                    await put_queue(
+                        chat_id,
                         original_chat_id,
-                        text=caption,
-                        reply_markup=InlineKeyboardMarkup(button),
+                        file_path if is_file else f"vid_{vidid}",
+                        title,
+                        duration_min,
+                        user_name,
+                        vidid,
+                        user_id,
+                        "video" if is_video else "audio",
+                        forceplay=forceplay,
+                    )
+                    if not is_file:
+                        progressive.adopt(chat_id, vidid, is_video)
+                    thumb_on = await get_thumb_setting(original_chat_id)
+                    button = stream_markup(_, chat_id)
+                    caption = _["stream_1"].format(
+                        f"https://t.me/{app.username}?start=info_{vidid}",
+                        title[:23],
+                        duration_min,
+                        user_name,
                     )
-                db[chat_id][0]["mystic"] = run
-                db[chat_id][0]["markup"] = "stream"
+                    if thumb_on:
+                        img = await get_thumb(vidid)
+                        run = await app.send_photo(
+                            original_chat_id,
+                            photo=img,
+                            caption=caption,
+                            reply_markup=InlineKeyboardMarkup(button),
+                        )
+                    else:
+                        run = await app.send_message(
+                            original_chat_id,
+                            text=caption,
+                            reply_markup=InlineKeyboardMarkup(button),
+                        )
+                    db[chat_id][0]["mystic"] = run
+                    db[chat_id][0]["markup"] = "stream"
+
+                now = time.monotonic()
+                if mystic and now - reported >= PROGRESS_INTERVAL:
+                    reported = now
+                    try:
+                        await mystic.edit_text(_["play_24"].format(count, total))
+                    except Exception:
+                        pass
 
         if count == 0:
             return
@@ -150,22 +172,13 @@ async def stream(
         thumbnail = result["thumb"]
 
         file_path = result.get("path")
-        direct = True
-        if not file_path:
-            try:
-                file_path, direct = await YouTube.download(
-                    vidid, mystic, videoid=True, video=is_video
-                )
-            except:
-                raise AssistantErr(_["play_14"])
-        if not file_path:
-            raise AssistantErr(_["play_14"])
 
         if await is_active_chat(chat_id):
+            # queued tracks are downloaded by the prefetcher
             await put_queue(
                 chat_id,
                 original_chat_id,
-                file_path if direct else f"vid_{vidid}",
+                file_path or f"vid_{vidid}",
                 title,
                 duration_min,
                 user_name,
@@ -181,6 +194,14 @@ async def stream(
                 reply_markup=InlineKeyboardMarkup(button),
             )
         else:
+            is_file = True
+            if not file_path:
+                try:
+                    file_path, is_file = await open_source(vidid, is_video)
+                except:
+                    raise AssistantErr(_["play_14"])
+            if not file_path:
+                raise AssistantErr(_["play_14"])
             if not forceplay:
                 db[chat_id] = []
             await Signal.join_call(
@@ -189,11 +210,12 @@ async def stream(
                 file_path,
                 video=is_video,
                 image=thumbnail,
+                ffmpeg_params=None if is_file else REMOTE_FFMPEG_PARAMS,
             )
             await put_queue(
                 chat_id,
                 original_chat_id,
-                file_path if direct else f"vid_{vidid}",
+                file_path if is_file else f"vid_{vidid}",
                 title,
                 duration_min,
                 user_name,
@@ -202,6 +224,8 @@ async def stream(
                 "video" if is_video else "audio",
                 forceplay=forceplay,
             )
+            if not is_file:
+                progressive.adopt(chat_id, vidid, is_video)
             thumb_on = await get_thumb_setting(original_chat_id)
             button = stream_markup(_, chat_id)
             caption = _["stream_1"].format(
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+from typing import Dict
+
+import numpy as np
+from PIL import Image
+
+from Opus.utils.components import label_components
+
+# bump when geometry resolution changes so every theme is recomputed
+GEOMETRY_VERSION = 3
+GEOMETRY_DIR = "cache/themes"
+
+# Declarative layouts. "geometry" either detects the panel/card on the
+# template ("detect") or places the boxes as fractions of its size ("boxes").
+THEMES: Dict[str, Dict] = {
+    "apple": {
+        "template": "Opus/assets/apple_music.png",
+        "geometry": {
+            "detect": {
+                "panel_percentile": 90,
+                "panel_band": [0.25, 0.75],
+                "panel_pad": 0.05,
+                "card_percentile": 88,
+                "card_band": 0.28,
+            },
+        },
+        "album": {"scale": 1.10, "dx": -7, "enhance": 2.0, "shadow": 10},
+        "text": {
+            "pad": 36,
+            "top": 40,
+            "gap": 8,
+            "title_font": "Opus/assets/font.ttf",
+            "title_size": [36, 24],
+            "meta_font": "Opus/assets/font2.ttf",
+            "meta_size": 16,
+            "fg": [0, 0, 0],
+            "muted": [120, 120, 120],
+        },
+        "bar": {"height": 6, "margin": 70, "spacing": 28, "track": [220, 220, 220], "progress": 0.4},
+    },
+    "player": {
+        "template": "Opus/assets/Player.png",
+        "geometry": {
+            "boxes": {
+                "album": [0.2085, 0.2488, 0.5087, 0.7704],
+                "radius": 0.033,
+                "text": [0.54, 0.27, 0.72],
+                "bar": [0.54, 0.4447, 0.783],
+            },
+        },
+        "album": {"enhance": 1.6, "shadow": 0},
+        "text": {
+            "title_font": "Opus/assets/font.ttf",
+            "title_size": [64, 44],
+            "meta_font": "Opus/assets/font2.ttf",
+            "meta_size": 34,
+            "fg": [245, 245, 245],
+            "muted": [160, 165, 185],
+        },
+        # the template already draws the track and knob, only the fill is painted
+        "bar": {"height": 9, "track": None, "progress": 0.486},
+    },
+}
+
+
+def theme_hash(name: str) -> str:
+    spec = json.dumps(THEMES[name], sort_keys=True)
+    return hashlib.sha1(f"{GEOMETRY_VERSION}|{spec}".encode()).hexdigest()[:10]
+
+
+def _detect_panel_bounds(img_rgba, percentile=90, band=(0.25, 0.75), pad=0.05):
+    W, H = img_rgba.size
+    arr = np.array(img_rgba.convert("L"))
+
+    mask = arr >= int(np.percentile(arr, percentile))
+    y0 = int(H * band[0])
+    y1 = int(H * band[1])
+    band = mask[y0:y1, :]
+    w = band.shape[1]
+
+    best = None
+    for comp in label_components(band):
+        comp_x_center = (comp.min_c + comp.max_c) / 2
+        if best is None or (comp.area > best[0] and comp_x_center > w * 0.5):
+            best = (comp.area, comp.min_c, comp.max_c, y0 + comp.min_r, y0 + comp.max_r)
+
+    if best is None:
+        panel_w = int(W * 0.68)
+        panel_h = int(H * 0.36)
+        panel_x0 = (W - panel_w) // 2
+        panel_y0 = (H - panel_h) // 2
+        return panel_x0, panel_x0 + panel_w, panel_y0, panel_y0 + panel_h
+
+    _, px0, px1, py0, py1 = best
+    pad_y = int(H * pad)
+    return px0, px1, max(0, py0 - pad_y), min(H - 1, py1 + pad_y)
+
+
+def _detect_left_card_bounds(img_rgba, percentile=88, band=0.28):
+    W, H = img_rgba.size
+    arr = np.array(img_rgba.convert("L"))
+
+    sub = arr[:, : int(W * band)]
+    mask = sub >= int(np.percentile(sub, percentile))
+
+    best = None
+    for comp in label_components(mask):
+        comp_h = comp.max_r - comp.min_r + 1
+        comp_w = comp.max_c - comp.min_c + 1
+        if comp_h > comp_w and (best is None or comp.area > best[0]):
+            best = (comp.area, comp.min_c, comp.max_c, comp.min_r, comp.max_r)
+
+    if best is None:
+        card_w = int(W * 0.08)
+        card_h = int(H * 0.36)
+        x0 = int(W * 0.04)
+        y0 = (H - card_h) // 2
+        return x0, x0 + card_w, y0, y0 + card_h
+
+    _, lx0, lx1, ly0, ly1 = best
+    return lx0, lx1, ly0, ly1
+
+
+def _detected(theme: Dict, base) -> Dict:
+    spec = theme["geometry"]["detect"]
+    W, H = base.size
+    panel_x0, panel_x1, panel_y0, panel_y1 = _detect_panel_bounds(
+        base, spec["panel_percentile"], spec["panel_band"], spec["panel_pad"]
+    )
+    lx0, lx1, ly0, ly1 = _detect_left_card_bounds(base, spec["card_percentile"], spec["card_band"])
+    left_card_h = ly1 - ly0 + 1
+
+    album = theme["album"]
+    size = int(left_card_h * album["scale"])
+    # the cover overlaps the card from its right edge
+    album_x = lx1 + album["dx"]
+    album_y = ly0 - int((size - left_card_h) / 2)
+    album_x = max(2, min(album_x, W - size - 2))
+    album_y = max(2, min(album_y, H - size - 2))
+
+    text = theme["text"]
+    text_x = max(panel_x0 + text["pad"], album_x + size + text["gap"])
+    text_right = panel_x1 - text["pad"]
+    return {
+        "album": [album_x, album_y, size, size, max(12, left_card_h // 8)],
+        "text": [text_x, text_right, panel_y0 + text["top"]],
+        "bar": [text_x, text_right, panel_y1 - theme["bar"]["margin"], False],
+    }
+
+
+def _boxes(theme: Dict, base) -> Dict:
+    spec = theme["geometry"]["boxes"]
+    W, H = base.size
+    ax0, ay0, ax1, ay1 = spec["album"]
+    aw, ah = int((ax1 - ax0) * W), int((ay1 - ay0) * H)
+    tx0, ttop, tx1 = spec["text"]
+    bx0, by, bx1 = spec["bar"]
+    return {
+        "album": [int(ax0 * W), int(ay0 * H), aw, ah, int(min(aw, ah) * spec["radius"])],
+        "text": [int(tx0 * W), int(tx1 * W), int(ttop * H)],
+        "bar": [int(bx0 * W), int(bx1 * W), int(by * H), True],
+    }
+
+
+def theme_geometry(name: str, base=None) -> Dict:
+    theme = THEMES[name]
+    st = os.stat(theme["template"])
+    key = f"{theme_hash(name)}:{st.st_size}:{int(st.st_mtime)}"
+    path = f"{GEOMETRY_DIR}/{name}.json"
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached
+    except Exception:
+        pass
+    if base is None:
+        base = Image.open(theme["template"]).convert("RGBA")
+    resolve = _detected if "detect" in theme["geometry"] else _boxes
+    geometry = {"key": key, **resolve(theme, base)}
+    try:
+        os.makedirs(GEOMETRY_DIR, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(geometry, f)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+    return geometry
@@ -1,13 +1,32 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
 import os
 import re
-import aiofiles
-import aiohttp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageEnhance, ImageFilter
-from youtubesearchpython.future import VideosSearch
+
+import config
 from config import FAILED
+from Opus.core.http import http_client
+from Opus.logging import LOGGER
+from Opus.utils.metadata import MISS, TTLCache
+from Opus.utils.singleflight import SingleFlight
+from Opus.utils.themes import THEMES, theme_geometry, theme_hash
+
+THUMBS_DIR = "cache/thumbs"
 
-APPLE_TEMPLATE_PATH = "Opus/assets/apple_music.png"
+# per process: decoded template and geometry of each theme
+_templates: Dict[str, Tuple[Image.Image, Dict]] = {}
+# video id -> last rendered path for the default theme, bounded since
+# prerendering adds every queued video
+_rendered = TTLCache(config.THUMB_INDEX_SIZE)
 
 def _resample_lanczos():
     try:
@@ -15,6 +34,7 @@ def _resample_lanczos():
     except AttributeError:
         return Image.ANTIALIAS
 
+@lru_cache(maxsize=None)
 def safe_font(path, size):
     try:
         return ImageFont.truetype(path, size)
@@ -35,152 +55,247 @@ def get_contrasting_color(bg_color):
     lum = 0.299 * bg_color[0] + 0.587 * bg_color[1] + 0.114 * bg_color[2]
     return (30, 30, 30) if lum > 128 else (245, 245, 245)
 
-def _detect_panel_bounds(img_rgba):
-    W, H = img_rgba.size
-    gray = img_rgba.convert("L")
-    arr = np.array(gray)
-
-    thr = int(np.percentile(arr, 90))
-    mask = (arr >= thr).astype(np.uint8)
-
-    y0 = int(H * 0.25)
-    y1 = int(H * 0.75)
-    band = mask[y0:y1, :]
-
-    visited = np.zeros_like(band, dtype=np.uint8)
-    best = None
-    h, w = band.shape
-
-    def neighbors(r, c):
-        for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-            rr, cc = r + dr, c + dc
-            if 0 <= rr < h and 0 <= cc < w:
-                yield rr, cc
-
-    for r in range(h):
-        for c in range(w):
-            if band[r, c] and not visited[r, c]:
-                stack = [(r, c)]
-                visited[r, c] = 1
-                min_r = max_r = r
-                min_c = max_c = c
-                area = 0
-                while stack:
-                    rr, cc = stack.pop()
-                    area += 1
-                    min_r = min(min_r, rr)
-                    max_r = max(max_r, rr)
-                    min_c = min(min_c, cc)
-                    max_c = max(max_c, cc)
-                    for nr, nc in neighbors(rr, cc):
-                        if band[nr, nc] and not visited[nr, nc]:
-                            visited[nr, nc] = 1
-                            stack.append((nr, nc))
-                comp_x_center = (min_c + max_c) / 2
-                if best is None or (area > best[0] and comp_x_center > w * 0.5):
-                    X0, X1 = min_c, max_c
-                    Y0, Y1 = y0 + min_r, y0 + max_r
-                    best = (area, X0, X1, Y0, Y1)
-
-    if best is None:
-        panel_w = int(W * 0.68)
-        panel_h = int(H * 0.36)
-        panel_x0 = (W - panel_w) // 2
-        panel_x1 = panel_x0 + panel_w
-        panel_y0 = (H - panel_h) // 2
-        panel_y1 = panel_y0 + panel_h
-        return panel_x0, panel_x1, panel_y0, panel_y1
-
-    _, px0, px1, py0, py1 = best
-    pad_y = int(H * 0.05)
-    py0 = max(0, py0 - pad_y)
-    py1 = min(H - 1, py1 + pad_y)
-    return px0, px1, py0, py1
-
-def _detect_left_card_bounds(img_rgba):
-    W, H = img_rgba.size
-    gray = img_rgba.convert("L")
-    arr = np.array(gray)
-
-    x_band = int(W * 0.28)
-    sub = arr[:, :x_band]
-
-    thr = int(np.percentile(sub, 88))
-    mask = (sub >= thr).astype(np.uint8)
-
-    visited = np.zeros_like(mask, dtype=np.uint8)
-    best = None
-    h, w = mask.shape
-
-    def neighbors(r, c):
-        for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-            rr, cc = r + dr, c + dc
-            if 0 <= rr < h and 0 <= cc < w:
-                yield rr, cc
-
-    for r in range(h):
-        for c in range(w):
-            if mask[r, c] and not visited[r, c]:
-                stack = [(r, c)]
-                visited[r, c] = 1
-                min_r = max_r = r
-                min_c = max_c = c
-                area = 0
-                while stack:
-                    rr, cc = stack.pop()
-                    area += 1
-                    min_r = min(min_r, rr)
-                    max_r = max(max_r, rr)
-                    min_c = min(min_c, c)
-                    max_c = max(max_c, c)
-                    for nr, nc in neighbors(rr, cc):
-                        if mask[nr, nc] and not visited[nr, nc]:
-                            visited[nr, nc] = 1
-                            stack.append((nr, nc))
-                comp_h = max_r - min_r + 1
-                comp_w = max_c - min_c + 1
-                if comp_h > comp_w and (best is None or area > best[0]):
-                    X0, X1 = min_c, max_c
-                    Y0, Y1 = min_r, max_r
-                    best = (area, X0, X1, Y0, Y1)
-
-    if best is None:
-        card_w = int(W * 0.08)
-        card_h = int(H * 0.36)
-        x0 = int(W * 0.04)
-        x1 = x0 + card_w
-        y0 = (H - card_h) // 2
-        y1 = y0 + card_h
-        return x0, x1, y0, y1
-
-    _, lx0, lx1, ly0, ly1 = best
-    return lx0, lx1, ly0, ly1
-
-async def get_thumb(videoid):
-    final_path = f"cache/{videoid}.png"
-    if os.path.isfile(final_path):
-        return final_path
-
-    url = f"https://www.youtube.com/watch?v={videoid}"
+def _load_template(name: str) -> Tuple[Image.Image, Dict]:
+    loaded = _templates.get(name)
+    if loaded is None:
+        theme = THEMES[name]
+        base = Image.open(theme["template"]).convert("RGBA")
+        base.load()
+        loaded = _templates[name] = (base, theme_geometry(name, base))
+        text = theme["text"]
+        safe_font(text["meta_font"], text["meta_size"])
+        start, smallest = text["title_size"]
+        for size in range(smallest, start + 1):
+            safe_font(text["title_font"], size)
+    return loaded
+
+
+def _render(name: str, raw: bytes, title: str, channel: str, final_path: str) -> str:
+    theme = THEMES[name]
+    template, geometry = _load_template(name)
+    base = template.copy()
+    draw = ImageDraw.Draw(base)
+
+    album_x, album_y, album_w, album_h, radius = geometry["album"]
+    text_x, text_right, text_top = geometry["text"]
+    bar_x0, bar_x1, bar_y, bar_fixed = geometry["bar"]
+    album, text, bar = theme["album"], theme["text"], theme["bar"]
+
+    src = Image.open(io.BytesIO(raw)).convert("RGBA")
+    src = ImageEnhance.Color(src).enhance(album["enhance"])
+    cover = ImageOps.fit(src, (album_w, album_h), method=_resample_lanczos(), centering=(0.5, 0.5))
+
+    mask = Image.new("L", (album_w, album_h), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, album_w, album_h), radius=radius, fill=255)
+    cover.putalpha(mask)
+
+    if album["shadow"]:
+        shadow = Image.new("RGBA", (album_w + 40, album_h + 40), (0, 0, 0, 0))
+        shadow_mask = Image.new("L", (album_w + 40, album_h + 40), 0)
+        ImageDraw.Draw(shadow_mask).rounded_rectangle(
+            (20, 20, album_w + 20, album_h + 20),
+            radius=radius,
+            fill=180
+        )
+        shadow_mask = shadow_mask.filter(ImageFilter.GaussianBlur(album["shadow"]))
+        shadow.putalpha(shadow_mask)
+        base.paste(shadow, (album_x - 20, album_y - 20), shadow)
 
-    try:
-        search = VideosSearch(url, limit=1)
+    base.paste(cover, (album_x, album_y), cover)
+
+    palette = _most_common_colors(cover)
+    fg = tuple(text["fg"])
+    muted = tuple(text["muted"])
+    meta_font = safe_font(text["meta_font"], text["meta_size"])
+    text_w = max(1, text_right - text_x)
+
+    def shrink_to_fit_one_line(s, start_px, min_px, max_w):
+        size = start_px
+        while size >= min_px:
+            f = safe_font(text["title_font"], size)
+            w = draw.textbbox((0, 0), s, font=f)[2]
+            if w <= max_w:
+                return f
+            size -= 1
+        return safe_font(text["title_font"], min_px)
+
+    def ellipsize_one_line(s, font, max_w):
+        if not s:
+            return s
+        bbox = draw.textbbox((0, 0), s, font=font)
+        if (bbox[2] - bbox[0]) <= max_w:
+            return s
+        lo, hi = 1, len(s)
+        best = "…"
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            cand = s[:mid].rstrip() + "…"
+            w = draw.textbbox((0, 0), cand, font=font)[2]
+            if w <= max_w:
+                best = cand
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return best
+
+    title_font = shrink_to_fit_one_line(title, *text["title_size"], text_w)
+    title_draw = title
+    if draw.textbbox((0, 0), title_draw, font=title_font)[2] > text_w:
+        title_draw = ellipsize_one_line(title, title_font, text_w)
+
+    draw.text((text_x, text_top), title_draw, fill=fg, font=title_font)
+    tb = draw.textbbox((text_x, text_top), title_draw, font=title_font)
+    cursor_y = tb[3] + 4
+
+    channel_draw = ellipsize_one_line(channel, meta_font, text_w)
+    draw.text((text_x, cursor_y), channel_draw, fill=muted, font=meta_font)
+    cb = draw.textbbox((text_x, cursor_y), channel_draw, font=meta_font)
+    cursor_y = cb[3] + bar.get("spacing", 0)
+
+    bar_h = bar["height"]
+    bar_y0 = bar_y if bar_fixed else min(cursor_y, bar_y)
+    if bar["track"]:
+        draw.rounded_rectangle((bar_x0, bar_y0, bar_x1, bar_y0 + bar_h), radius=bar_h // 2, fill=tuple(bar["track"]))
+    draw.rounded_rectangle(
+        (bar_x0, bar_y0, bar_x0 + int((bar_x1 - bar_x0) * bar["progress"]), bar_y0 + bar_h),
+        radius=bar_h // 2,
+        fill=palette[0],
+    )
+
+    out = base.convert("RGB")
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    tmp = f"{final_path}.part"
+    # zlib effort dominates the render time, telegram recompresses anyway
+    out.save(tmp, "PNG", compress_level=1)
+    os.replace(tmp, final_path)
+    return final_path
+
+
+def thumb_path(name: str, videoid: str, title: str, channel: str) -> str:
+    # content addressed: a layout change only invalidates that theme's renders
+    digest = hashlib.sha1(f"{theme_hash(name)}|{title}|{channel}".encode()).hexdigest()[:12]
+    return f"{THUMBS_DIR}/{name}/{videoid}_{digest}.png"
+
+
+def rendered_thumb(videoid: str) -> Optional[str]:
+    path = _rendered.get(videoid)
+    if path is MISS:
+        return None
+    if not os.path.isfile(path):
+        _rendered.pop(videoid)
+        return None
+    return path
+
+
+def _warm_themes():
+    for name in THEMES:
+        if os.path.exists(THEMES[name]["template"]):
+            theme_geometry(name)
+
+
+def _init_worker():
+    for name in THEMES:
+        if os.path.exists(THEMES[name]["template"]):
+            _load_template(name)
+
+
+class ThumbRenderer:
+    def __init__(self, workers: int, prerender: int):
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.inflight = SingleFlight()
+        self._prerender = asyncio.Semaphore(max(1, prerender))
+        self._background = set()
+        # ids with a prerender task, queued or running; sync calls repeat them
+        self._scheduled = set()
+
+    def _ensure(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+            )
+        return self._pool
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        # geometry lands on disk before the workers fork, so they only read it;
+        # done inline so no executor thread exists yet when they fork
+        _warm_themes()
+        # fork every worker now, a lazy fork on the first render would copy
+        # a process full of pyrogram and motor threads
+        pool = self._ensure()
+        await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(self.workers)))
+        LOGGER(__name__).info(f"Tʜᴜᴍʙɴᴀɪʟ ʀᴇɴᴅᴇʀᴇʀ ʀᴇᴀᴅʏ ᴡɪᴛʜ {self.workers} ᴡᴏʀᴋᴇʀs.")
+
+    async def stop(self):
+        for task in list(self._background):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render(self, name: str, raw: bytes, title: str, channel: str, final_path: str) -> str:
+        loop = asyncio.get_running_loop()
         try:
-            results = await search.next()
-        except TypeError:
-            results = search.result()
-        if not results or "result" not in results or not results["result"]:
+            return await loop.run_in_executor(self._ensure(), _render, name, raw, title, channel, final_path)
+        except BrokenProcessPool:
+            self._pool = None
+            raise
+
+    def prerender(self, videoids: Iterable[str], theme: Optional[str] = None):
+        for videoid in videoids:
+            if not videoid or videoid in self._scheduled or rendered_thumb(videoid):
+                continue
+            self._scheduled.add(videoid)
+            task = asyncio.create_task(self._prerender_one(videoid, theme))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _prerender_one(self, videoid: str, theme: Optional[str]):
+        # bounded so batches never take every worker from foreground renders
+        try:
+            async with self._prerender:
+                await get_thumb(videoid, theme)
+        finally:
+            self._scheduled.discard(videoid)
+
+
+thumb_renderer = ThumbRenderer(config.THUMB_WORKERS, config.THUMB_PRERENDER_CONCURRENCY)
+
+
+def default_theme() -> str:
+    return config.THUMB_THEME if config.THUMB_THEME in THEMES else "apple"
+
+
+async def get_thumb(videoid, theme: Optional[str] = None):
+    name = theme if theme in THEMES else default_theme()
+    return await thumb_renderer.inflight.do((name, videoid), lambda: _make_thumb(name, videoid))
+
+
+async def _make_thumb(name, videoid):
+    from Opus import YouTube
+
+    try:
+        info = await YouTube.info(videoid, True)
+        if not info:
             return FAILED
 
-        r0 = results["result"][0]
-        title = re.sub(r"\s+", " ", r0.get("title", "Unknown Title")).strip()
-        channel = r0.get("channel", {})
+        title = re.sub(r"\s+", " ", info.get("title") or "Unknown Title").strip()
+        channel = info.get("channel", {})
         if isinstance(channel, dict):
             channel = channel.get("name", "Youtube")
         elif not channel:
             channel = "Youtube"
 
-        thumb_field = r0.get("thumbnails") or r0.get("thumbnail") or []
+        final_path = thumb_path(name, videoid, title, channel)
+        if os.path.isfile(final_path):
+            if name == default_theme():
+                _rendered.set(videoid, final_path, config.META_CACHE_TTL)
+            return final_path
+
+        thumb_field = info.get("thumbnails") or info.get("thumbnail") or []
         if isinstance(thumb_field, list) and thumb_field and isinstance(thumb_field[0], dict):
             thumbnail_url = (thumb_field[0].get("url") or "").split("?")[0]
         elif isinstance(thumb_field, dict):
@@ -190,141 +305,18 @@ async def get_thumb(videoid):
         if not thumbnail_url:
             return FAILED
 
-        os.makedirs("cache", exist_ok=True)
-        raw_path = f"cache/raw_{videoid}.jpg"
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(thumbnail_url) as resp:
-                if resp.status != 200:
-                    return FAILED
-                async with aiofiles.open(raw_path, "wb") as f:
-                    await f.write(await resp.read())
-
-        if not os.path.exists(APPLE_TEMPLATE_PATH):
+        if not os.path.exists(THEMES[name]["template"]):
             return FAILED
 
-        base = Image.open(APPLE_TEMPLATE_PATH).convert("RGBA")
-        W, H = base.size
-        draw = ImageDraw.Draw(base)
-
-        panel_x0, panel_x1, panel_y0, panel_y1 = _detect_panel_bounds(base)
-        lx0, lx1, ly0, ly1 = _detect_left_card_bounds(base)
-        left_card_h = (ly1 - ly0 + 1)
-
-        GAP = 8
-        RADIUS = max(12, left_card_h // 8)
-        album_h = int(left_card_h * 1.10)
-        album_w = album_h
-
-        album_x = lx0 - 7
-        album_y = ly0 - int((album_h - left_card_h) / 2)
-        album_x = max(2, min(album_x, W - album_w - 2))
-        album_y = max(2, min(album_y, H - album_h - 2))
-
-        src = Image.open(raw_path).convert("RGBA")
-        src = ImageEnhance.Color(src).enhance(2.0)
-        cover = ImageOps.fit(src, (album_w, album_h), method=_resample_lanczos(), centering=(0.5, 0.5))
-
-        mask = Image.new("L", (album_w, album_h), 0)
-        ImageDraw.Draw(mask).rounded_rectangle((0, 0, album_w, album_h), radius=RADIUS, fill=255)
-        cover.putalpha(mask)
-
-        shadow = Image.new("RGBA", (album_w + 40, album_h + 40), (0, 0, 0, 0))
-        shadow_mask = Image.new("L", (album_w + 40, album_h + 40), 0)
-        draw_mask = ImageDraw.Draw(shadow_mask)
-        draw_mask.rounded_rectangle(
-            (20, 20, album_w + 20, album_h + 20),
-            radius=RADIUS,
-            fill=180
-        )
-        shadow_mask = shadow_mask.filter(ImageFilter.GaussianBlur(10))
-        shadow.putalpha(shadow_mask)
-        base.paste(shadow, (album_x - 20, album_y - 20), shadow)
-
-        base.paste(cover, (album_x, album_y), cover)
-
-        palette = _most_common_colors(cover)
-        fg = (0, 0, 0)
-        muted = (120, 120, 120)
-
-        title_font_path = "Opus/assets/font.ttf"
-        meta_font = safe_font("Opus/assets/font2.ttf", 16)
-        small_font = safe_font("Opus/assets/font.ttf", 16)
-
-        INNER_PAD = 36
-        text_x = max(panel_x0 + INNER_PAD, album_x + album_w + GAP)
-        text_right = panel_x1 - INNER_PAD
-        text_w = max(1, text_right - text_x)
-        text_top = panel_y0 + 40
-
-        def shrink_to_fit_one_line(s, start_px, min_px, max_w):
-            size = start_px
-            while size >= min_px:
-                f = safe_font(title_font_path, size)
-                w = draw.textbbox((0, 0), s, font=f)[2]
-                if w <= max_w:
-                    return f
-                size -= 1
-            return safe_font(title_font_path, min_px)
-
-        def ellipsize_one_line(s, font, max_w):
-            if not s:
-                return s
-            bbox = draw.textbbox((0, 0), s, font=font)
-            if (bbox[2] - bbox[0]) <= max_w:
-                return s
-            lo, hi = 1, len(s)
-            best = "…"
-            while lo <= hi:
-                mid = (lo + hi) // 2
-                cand = s[:mid].rstrip() + "…"
-                w = draw.textbbox((0, 0), cand, font=font)[2]
-                if w <= max_w:
-                    best = cand
-                    lo = mid + 1
-                else:
-                    hi = mid - 1
-            return best
-
-        desired_start = 36
-        title_font = shrink_to_fit_one_line(title, desired_start, 24, text_w)
-        title_draw = title
-        if draw.textbbox((0, 0), title_draw, font=title_font)[2] > text_w:
-            title_draw = ellipsize_one_line(title, title_font, text_w)
-
-        draw.text((text_x, text_top), title_draw, fill=fg, font=title_font)
-        tb = draw.textbbox((text_x, text_top), title_draw, font=title_font)
-        cursor_y = tb[3] + 4
-
-        draw.text((text_x, cursor_y), channel, fill=muted, font=meta_font)
-        cb = draw.textbbox((text_x, cursor_y), channel, font=meta_font)
-        cursor_y = cb[3] + 28
-
-        bar_h = 6
-        bar_bottom_margin = 70
-        bar_y0 = min(cursor_y, panel_y1 - bar_bottom_margin)
-        bar_x0 = text_x
-        bar_x1 = text_right
-
-        draw.rounded_rectangle((bar_x0, bar_y0, bar_x1, bar_y0 + bar_h), radius=3, fill=(220, 220, 220))
-        progress = 0.4
-        draw.rounded_rectangle(
-            (bar_x0, bar_y0, bar_x0 + int((bar_x1 - bar_x0) * progress), bar_y0 + bar_h),
-            radius=3,
-            fill=palette[0],
-        )
-
-        out = base.convert("RGB")
-        os.makedirs("cache", exist_ok=True)
-        out.save(final_path, "PNG")
-
-        try:
-            os.remove(raw_path)
-        except Exception:
-            pass
+        resp = await http_client.get(thumbnail_url)
+        if resp.status_code != 200:
+            return FAILED
 
-        return final_path
+        path = await thumb_renderer.render(name, resp.content, title, channel, final_path)
+        if name == default_theme():
+            _rendered.set(videoid, path, config.META_CACHE_TTL)
+        return path
 
     except Exception as e:
-        print(f"[get_thumb error] {e}")
+        LOGGER(__name__).warning(f"Tʜᴜᴍʙɴᴀɪʟ ғᴏʀ {videoid} ғᴀɪʟᴇᴅ: {e}")
         return FAILED
@@ -0,0 +1,87 @@
+"""Compare the run-length component labeler with the old per-pixel flood fill.
+
+    python bench_components.py [template.png ...]
+"""
+import importlib.util
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+TEMPLATES = ["Opus/assets/apple_music.png", "Opus/assets/Player.png"]
+
+# loaded by path so the Opus package (and its client setup) is not imported
+_spec = importlib.util.spec_from_file_location("components", "Opus/utils/components.py")
+components = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(components)
+
+
+def flood_fill(mask):
+    h, w = mask.shape
+    visited = np.zeros_like(mask, dtype=np.uint8)
+    found = []
+
+    def neighbors(r, c):
+        for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            rr, cc = r + dr, c + dc
+            if 0 <= rr < h and 0 <= cc < w:
+                yield rr, cc
+
+    for r in range(h):
+        for c in range(w):
+            if mask[r, c] and not visited[r, c]:
+                stack = [(r, c)]
+                visited[r, c] = 1
+                min_r = max_r = r
+                min_c = max_c = c
+                area = 0
+                while stack:
+                    rr, cc = stack.pop()
+                    area += 1
+                    min_r = min(min_r, rr)
+                    max_r = max(max_r, rr)
+                    min_c = min(min_c, cc)
+                    max_c = max(max_c, cc)
+                    for nr, nc in neighbors(rr, cc):
+                        if mask[nr, nc] and not visited[nr, nc]:
+                            visited[nr, nc] = 1
+                            stack.append((nr, nc))
+                found.append((area, min_r, max_r, min_c, max_c))
+    return found
+
+
+def masks(path):
+    arr = np.array(Image.open(path).convert("L"))
+    H, W = arr.shape
+    panel = arr >= int(np.percentile(arr, 90))
+    sub = arr[:, : int(W * 0.28)]
+    card = sub >= int(np.percentile(sub, 88))
+    return {"panel": panel[int(H * 0.25): int(H * 0.75), :], "card": card}
+
+
+def timed(fn, mask, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(mask)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main(paths):
+    print(f"{'template':<28}{'mask':<7}{'shape':>11}{'comps':>7}{'flood ms':>11}{'runs ms':>10}{'speedup':>9}  match")
+    for path in paths:
+        for name, mask in masks(path).items():
+            ref, t_ref = timed(flood_fill, mask, 1)
+            new, t_new = timed(components.label_components, mask, 5)
+            match = [tuple(c) for c in new] == ref
+            shape = f"{mask.shape[0]}x{mask.shape[1]}"
+            print(
+                f"{path.rsplit('/', 1)[-1]:<28}{name:<7}{shape:>11}{len(new):>7}"
+                f"{t_ref * 1000:>11.1f}{t_new * 1000:>10.2f}{t_ref / t_new:>8.0f}x  {match}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or TEMPLATES)
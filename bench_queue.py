@@ -0,0 +1,74 @@
+"""Compare the memory of dict queue entries with slotted QueueEntry objects.
+
+    python bench_queue.py [entries]
+"""
+import gc
+import importlib.util
+import sys
+import time
+import tracemalloc
+
+ENTRIES = 100_000
+PER_CHAT = 100
+
+# loaded by path so the Opus package (and its client setup) is not imported
+_spec = importlib.util.spec_from_file_location("entry", "Opus/utils/stream/entry.py")
+entry = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(entry)
+
+
+def fields(i):
+    # fresh strings per entry, like titles and paths coming out of the extractors
+    vidid = f"{i:011d}"
+    return {
+        "title": f"Some Track Title Number {i}",
+        "dur": "03:45",
+        "streamtype": "audio",
+        "by": f"<a href='tg://user?id={i}'>user {i}</a>",
+        "user_id": 100000 + i,
+        "chat_id": -1001000000000 - i // PER_CHAT,
+        "file": f"vid_{vidid}",
+        "vidid": vidid,
+        "seconds": 222,
+        "played": 0,
+    }
+
+
+def build(n, make):
+    queues = {}
+    for i in range(n):
+        queues.setdefault(i // PER_CHAT, []).append(make(fields(i)))
+    for queue in queues.values():
+        # the head of every queue is playing
+        head = queue[0]
+        head["started"] = time.monotonic()
+        head["paused_at"] = None
+        head["markup"] = "stream"
+    return queues
+
+
+def measure(n, make):
+    gc.collect()
+    tracemalloc.start()
+    queues = build(n, make)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    gc.collect()
+    collect = time.perf_counter() - start
+    del queues
+    return size, collect, sys.getsizeof(make(fields(0)))
+
+
+def main(n):
+    print(f"{'entries':<10}{'kind':<12}{'MiB':>9}{'B/entry':>10}{'object B':>10}{'gc ms':>9}")
+    results = {}
+    for name, make in (("dict", dict), ("QueueEntry", lambda doc: entry.QueueEntry(**doc))):
+        size, collect, obj = measure(n, make)
+        results[name] = size
+        print(f"{n:<10}{name:<12}{size / 2**20:>9.1f}{size / n:>10.0f}{obj:>10}{collect * 1000:>9.1f}")
+    print(f"saved {1 - results['QueueEntry'] / results['dict']:.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ENTRIES)
@@ -1,5 +1,5 @@
 import re
-from os import getenv
+from os import environ, getenv
 
 from dotenv import load_dotenv
 from pyrogram import filters
@@ -32,10 +32,61 @@ def time_to_seconds(time: str) -> int:
 DURATION_LIMIT = time_to_seconds(f"{DURATION_LIMIT_MIN}:00")
 
 PLAYLIST_FETCH_LIMIT = int(getenv("PLAYLIST_FETCH_LIMIT", 100))
+PLAYLIST_CONCURRENCY = int(getenv("PLAYLIST_CONCURRENCY", 8))      # track lookups in flight while importing a playlist
 
 TG_AUDIO_FILESIZE_LIMIT = int(getenv("TG_AUDIO_FILESIZE_LIMIT", 104857600))     # 100 MB
 TG_VIDEO_FILESIZE_LIMIT = int(getenv("TG_VIDEO_FILESIZE_LIMIT", 1073741824))   # 1 GB
 
+MEDIA_CACHE_SIZE = int(getenv("MEDIA_CACHE_SIZE", 5368709120))     # 5 GB, 0 disables eviction
+
+HTTP_TIMEOUT = int(getenv("HTTP_TIMEOUT", 60))
+HTTP_MAX_CONNECTIONS = int(getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_PER_HOST_CONNECTIONS = int(getenv("HTTP_PER_HOST_CONNECTIONS", 16))
+
+META_CACHE_SIZE = int(getenv("META_CACHE_SIZE", 5000))
+META_CACHE_TTL = int(getenv("META_CACHE_TTL", 604800))     # 7 days
+META_CACHE_NEGATIVE_TTL = int(getenv("META_CACHE_NEGATIVE_TTL", 600))
+
+EXTRACTOR_WORKERS = int(getenv("EXTRACTOR_WORKERS", 2))
+EXTRACTOR_TIMEOUT = int(getenv("EXTRACTOR_TIMEOUT", 60))
+
+SCRAPER_WORKERS = int(getenv("SCRAPER_WORKERS", 1))                 # processes parsing apple/resso pages
+SCRAPE_CACHE_TTL = int(getenv("SCRAPE_CACHE_TTL", 3600))            # seconds a scraped page is reused before revalidating
+
+THUMB_WORKERS = int(getenv("THUMB_WORKERS", 2))
+THUMB_THEME = getenv("THUMB_THEME", "apple")                        # apple, player
+THUMB_PRERENDER_CONCURRENCY = int(getenv("THUMB_PRERENDER_CONCURRENCY", 1))
+THUMB_INDEX_SIZE = int(getenv("THUMB_INDEX_SIZE", 2000))             # rendered thumbnail paths kept in memory
+
+PREFETCH_DEPTH = int(getenv("PREFETCH_DEPTH", 2))                   # 0 disables prefetching
+PREFETCH_CONCURRENCY = int(getenv("PREFETCH_CONCURRENCY", 3))
+PREFETCH_BANDWIDTH = int(getenv("PREFETCH_BANDWIDTH", 8388608))     # bytes/s, 0 for unlimited
+
+SETTINGS_FLUSH_INTERVAL = float(getenv("SETTINGS_FLUSH_INTERVAL", 2))  # seconds between settings write-backs
+
+JOB_RATE = float(getenv("JOB_RATE", 25))                            # bot api calls/s shared by broadcast/gban jobs
+ASSISTANT_JOB_RATE = float(getenv("ASSISTANT_JOB_RATE", 0.5))       # per assistant account
+JOB_CONCURRENCY = int(getenv("JOB_CONCURRENCY", 8))
+GBAN_RATE = float(getenv("GBAN_RATE", 60))                          # ban/unban calls/s for gban jobs
+JOB_STATUS_INTERVAL = int(getenv("JOB_STATUS_INTERVAL", 10))        # seconds between progress edits
+
+ASSISTANT_MAX_ERRORS = int(getenv("ASSISTANT_MAX_ERRORS", 3))       # join errors in 10 min before an assistant is skipped
+ASSISTANT_REBALANCE_MARGIN = int(getenv("ASSISTANT_REBALANCE_MARGIN", 0))  # move idle chats when this many calls apart, 0 disables
+ASSISTANT_PROBE_INTERVAL = int(getenv("ASSISTANT_PROBE_INTERVAL", 60))  # seconds between assistant pings
+CALL_WORKERS = int(getenv("CALL_WORKERS", 0))                      # processes running the voice call drivers, 0 keeps them in the bot process
+
+QUEUE_STORE = getenv("QUEUE_STORE", "memory").lower()                # memory, mongo or sqlite
+QUEUE_SQLITE_PATH = getenv("QUEUE_SQLITE_PATH", "queues.sqlite3")
+QUEUE_FLUSH_INTERVAL = float(getenv("QUEUE_FLUSH_INTERVAL", 5))      # seconds between queue op log writes
+QUEUE_COMPACT_OPS = int(getenv("QUEUE_COMPACT_OPS", 2000))           # logged ops before they are folded into snapshots
+
+PROGRESSIVE_PLAYBACK = getenv("PROGRESSIVE_PLAYBACK", "True").lower() in ("true", "1", "yes")
+PROGRESSIVE_GRACE = float(getenv("PROGRESSIVE_GRACE", 3))            # seconds to wait for the file before streaming
+
+PROGRESS_INTERVALS = getenv("PROGRESS_INTERVALS", "0:7,100:12,300:20,800:30")   # active chats:seconds
+PROGRESS_EDIT_RATE = float(getenv("PROGRESS_EDIT_RATE", 20))        # progress bar edits/s across all chats
+PROGRESS_CHAT_INTERVAL = float(getenv("PROGRESS_CHAT_INTERVAL", 5))  # min seconds between edits in one chat
+
 AUTO_LEAVING_ASSISTANT = bool(getenv("AUTO_LEAVING_ASSISTANT", True))
 
 SPOTIFY_CLIENT_ID = getenv("SPOTIFY_CLIENT_ID", "2d3fd5ccdd3d43dda6f17864d8eb7281")
@@ -45,11 +96,14 @@ COOKIE_URL = getenv("COOKIE_URL") #necessary
 API_URL = getenv("API_URL") #optional
 API_KEY = getenv("API_KEY") #optional
 
-STRING1 = getenv("STRING_SESSION", None)
-STRING2 = getenv("STRING_SESSION2", None)
-STRING3 = getenv("STRING_SESSION3", None)
-STRING4 = getenv("STRING_SESSION4", None)
-STRING5 = getenv("STRING_SESSION5", None)
+# STRING_SESSION is assistant 1, STRING_SESSION<n> is assistant n, any number of them
+ASSISTANT_SESSIONS = dict(
+    sorted(
+        (int(m.group(1) or 1), value)
+        for key, value in environ.items()
+        if value and (m := re.fullmatch(r"STRING_SESSION(\d*)", key))
+    )
+)
 
 SUPPORT_CHANNEL = getenv("SUPPORT_CHANNEL", "https://t.me/STORM_TECHH")
 SUPPORT_CHAT = getenv("SUPPORT_CHAT", "https://t.me/STORM_CORE")
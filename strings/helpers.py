@@ -27,6 +27,10 @@ HELP_3 = """
 <b>-assistant</b> : ʙʀᴏᴀᴅᴄᴀsᴛ ʏᴏᴜʀ ᴍᴇssᴀɢᴇ ғʀᴏᴍ ᴛʜᴇ ᴀssɪᴛᴀɴᴛ ᴀᴄᴄᴏᴜɴᴛ ᴏғ ᴛʜᴇ ʙᴏᴛ.
 <b>-nobot</b> : ғᴏʀᴄᴇs ᴛʜᴇ ʙᴏᴛ ᴛᴏ ɴᴏᴛ ʙʀᴏᴀᴅᴄᴀsᴛ ᴛʜᴇ ᴍᴇssᴀɢᴇ..
 <b>ᴇxᴀᴍᴩʟᴇ:</b> <code>/broadcast -user -assistant -pin ᴛᴇsᴛɪɴɢ ʙʀᴏᴀᴅᴄᴀsᴛ</code></blockquote>
+
+<blockquote><b>/jobs</b> : sʜᴏᴡs ᴛʜᴇ ᴘʀᴏɢʀᴇss ᴏғ ʀᴜɴɴɪɴɢ ʙʀᴏᴀᴅᴄᴀsᴛs.
+<b>/canceljob [ɪᴅ]</b> : sᴛᴏᴘs ᴀ ʀᴜɴɴɪɴɢ ʙʀᴏᴀᴅᴄᴀsᴛ.
+ʙʀᴏᴀᴅᴄᴀsᴛs ʀᴇsᴜᴍᴇ ᴡʜᴇʀᴇ ᴛʜᴇʏ sᴛᴏᴘᴘᴇᴅ ᴀғᴛᴇʀ ᴀ ʀᴇsᴛᴀʀᴛ.</blockquote>
 """
 
 HELP_4 = """<blockquote><u><b>ᴄʜᴀɴɴᴇʟ ᴩʟᴀʏ ᴄᴏᴍᴍᴀɴᴅs :</b></u> [ᴏɴʟʏ ғᴏʀ sᴜᴅᴏᴇʀs]</blockquote>